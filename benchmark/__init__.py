@@ -0,0 +1,9 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+
+from .corpus import SIZES, QUICK_SIZES, CONTENT_KINDS, generate_image
+from .runner import run_case, run_suite, compare
+
+__all__ = ['SIZES', 'QUICK_SIZES', 'CONTENT_KINDS', 'generate_image', 'run_case', 'run_suite', 'compare']
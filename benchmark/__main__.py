@@ -0,0 +1,84 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+import argparse
+import json
+import sys
+from typing import Dict
+
+from .corpus import SIZES, QUICK_SIZES, CONTENT_KINDS
+from .runner import LEGACY_MAX_PIXELS, run_suite, compare
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command-line arguments.
+
+    Returns:
+        Parsed arguments namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the JPEG encoder/decoder stages against OpenCV on a deterministic corpus",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-s", "--sizes", nargs="+", choices=list(SIZES), default=list(QUICK_SIZES),
+                        help="Image sizes to run")
+    parser.add_argument("--full", action="store_true", help="Run every size up to 50 MP")
+    parser.add_argument("-k", "--kinds", nargs="+", choices=CONTENT_KINDS, default=list(CONTENT_KINDS),
+                        help="Image content kinds to run")
+    parser.add_argument("-n", "--repeats", type=int, default=3, help="Timed runs per measurement")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("-p", "--precision", choices=["float32", "float64"], default="float32",
+                        help="Floating-point precision of the pixel pipeline")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON output file")
+    parser.add_argument("-c", "--compare", metavar="JSON", help="Previous results to compare against")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc allocation runs")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Run all cases in this process (peak RSS then covers the whole run)")
+    parser.add_argument("--legacy-max-pixels", type=int, default=LEGACY_MAX_PIXELS,
+                        help="Largest image on which the legacy deinterleave stage is timed")
+    return parser.parse_args()
+
+
+def print_case(case: Dict) -> None:
+    """Print a one-screen summary of a benchmark case."""
+    rss = case["peak_rss_mb"]
+    print(f"\n{case['image']} ({case['width']}x{case['height']}, {case['megapixels']:.2f} MP), "
+          f"bytes/pixel ours {case['bytes_per_pixel']['ours']:.3f} / cv2 {case['bytes_per_pixel']['cv2']:.3f}, "
+          f"block reuse {case.get('block_reuse_rate', 0.0):.1%}, "
+          f"peak RSS {'n/a' if rss is None else f'{rss:.0f} MB'}")
+    for group in ("stages", "pipeline", "baseline"):
+        for name, timing in case[group].items():
+            if "error" in timing:
+                print(f"  {group:>8} {name:>22}: failed ({timing['error']})")
+                continue
+            alloc = timing.get("peak_alloc_mb")
+            print(f"  {group:>8} {name:>22}: {timing['seconds_median'] * 1e3:10.2f} ms "
+                  f"{timing['mp_per_s']:9.2f} MP/s" + ("" if alloc is None else f"  alloc {alloc:8.1f} MB"))
+
+
+def main() -> int:
+    """Run the benchmark suite and write the JSON report."""
+    args = parse_arguments()
+    sizes = list(SIZES) if args.full else args.sizes
+
+    report = run_suite(args.kinds, sizes, repeats=args.repeats, seed=args.seed, float_dtype=args.precision,
+                       memory=not args.no_memory, isolate=not args.no_isolate,
+                       legacy_max_pixels=args.legacy_max_pixels, progress=print_case)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\nMedian times relative to {args.compare}:")
+        for line in compare(report, previous):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
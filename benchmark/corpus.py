@@ -0,0 +1,91 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from pathlib import Path
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+# Named image sizes (width, height), from thumbnail to 50 MP camera frames
+SIZES: Dict[str, Tuple[int, int]] = {
+    "64x64": (64, 64),
+    "256x256": (256, 256),
+    "1MP": (1024, 1024),
+    "4MP": (2304, 1728),
+    "12MP": (4032, 3024),
+    "50MP": (8192, 6144),
+}
+
+# Sizes run by default; the larger ones are opt-in (--sizes / --full)
+QUICK_SIZES = ("64x64", "256x256", "1MP", "4MP")
+
+CONTENT_KINDS = ("photo", "noise", "flat", "screenshot")
+
+_PHOTO_SOURCE = Path(__file__).resolve().parent.parent / "test-img" / "monkey.tiff"
+
+
+def _photo(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    source = cv2.imread(str(_PHOTO_SOURCE))
+    if source is None:
+        raise FileNotFoundError(f"Photo corpus source {_PHOTO_SOURCE} is missing")
+    image = cv2.resize(cv2.cvtColor(source, cv2.COLOR_BGR2RGB), (width, height), interpolation=cv2.INTER_CUBIC)
+    # Mild sensor-like noise keeps upscaled photos from being unrealistically smooth
+    noise = rng.normal(0.0, 2.0, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def _noise(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def _flat(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    return np.full((height, width, 3), rng.integers(0, 256, 3), dtype=np.uint8)
+
+
+def _screenshot(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    image = np.full((height, width, 3), 240, dtype=np.uint8)
+    scale = max(width, height) / 1024
+    # Window panels with flat fills
+    for _ in range(12):
+        x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x1, y1 = x0 + int(rng.integers(width // 8, width // 2 + 1)), y0 + int(rng.integers(height // 8, height // 2 + 1))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(image, (x0, y0), (x1, y1), color, thickness=-1)
+    # Lines of dark text on top
+    line_height = max(int(18 * scale), 8)
+    for y in range(line_height, height, line_height * 2):
+        text = "".join(chr(c) for c in rng.integers(65, 91, 60))
+        cv2.putText(image, text, (int(rng.integers(0, 32)), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5 * scale, (20, 20, 20), max(int(scale), 1), cv2.LINE_AA)
+    return image
+
+
+_GENERATORS = {
+    "photo": _photo,
+    "noise": _noise,
+    "flat": _flat,
+    "screenshot": _screenshot,
+}
+
+
+def generate_image(kind: str, size: str, seed: int = 0) -> np.ndarray:
+    """
+    Generate a deterministic RGB uint8 test image.
+
+    Args:
+        kind: One of CONTENT_KINDS
+        size: Key of SIZES
+        seed: Random seed; equal arguments always give identical images
+
+    Returns:
+        Image array of shape (height, width, 3)
+    """
+    if kind not in _GENERATORS:
+        raise ValueError(f"Unknown content kind '{kind}', expected one of {CONTENT_KINDS}")
+    if size not in SIZES:
+        raise ValueError(f"Unknown size '{size}', expected one of {tuple(SIZES)}")
+    width, height = SIZES[size]
+    rng = np.random.default_rng([seed, CONTENT_KINDS.index(kind), width, height])
+    return _GENERATORS[kind](width, height, rng)
@@ -0,0 +1,251 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+import logging
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage
+    resource = None
+
+from util import logger, rgb_to_ycbcr, ycbcr_to_rgb
+from util.huffman_tables import STANDARD_TABLES
+from util.dct_basis import resolve_float_dtype
+from util.quantization_tables import quantization_table_lum, quantization_table_chrom
+from encoder import encode
+from encoder.block_reuse import find_block_reuse
+from encoder.partitioning import partition
+from encoder.transform import transform
+from encoder.quantization import quantize
+from encoder.run_length_encoding import rle_encode_packed
+from encoder.scan_writer import build_scan_bytes_444
+from decoder import decode_jpeg, Decoder
+from decoder.huffman_decode import deinterleave
+from decoder.idct import IDCT
+from decoder.jpeg_parser import remove_FF00_stuffing
+from decoder.mcu_reconstruction import mcus_to_ycbcr_array
+from decoder.quantization_decode import dequantize
+from .corpus import SIZES, generate_image
+
+# cv2 settings matching this encoder: Annex K tables (quality 50) and no chroma subsampling
+CV2_ENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 50,
+                     cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444]
+
+# The staged-pipeline deinterleaver is only timed up to this many pixels by default
+LEGACY_MAX_PIXELS = 512 * 512
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where getrusage is unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1 << 20) if platform.system() == "Darwin" else peak / 1024
+
+
+def measure(fn: Callable[[], object], pixels: int, repeats: int, memory: bool = True) -> Dict:
+    """
+    Time fn repeats times and return seconds (min/median), MP/s and the peak traced allocation.
+
+    A warm-up call runs first for images below 4 MP; the allocation peak is taken
+    from a separate tracemalloc run so tracing does not distort the timings.
+    """
+    if pixels < 4_000_000:
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    result = {
+        "seconds_min": min(timings),
+        "seconds_median": median,
+        "mp_per_s": pixels / 1e6 / median if median > 0 else None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_alloc_mb"] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_case(kind: str, size: str, repeats: int = 3, seed: int = 0, float_dtype=None,
+             memory: bool = True, legacy_max_pixels: int = LEGACY_MAX_PIXELS) -> Dict:
+    """Benchmark every stage, the end-to-end pipeline and the cv2 baseline on one corpus image."""
+    logger.setLevel(logging.WARNING)
+    rgb = generate_image(kind, size, seed)
+    height, width, _ = rgb.shape
+    pixels = width * height
+    float_dtype = resolve_float_dtype(float_dtype, debug=False)
+
+    # One full encode provides the inputs of every stage
+    ycbcr = rgb_to_ycbcr(rgb, float_dtype)
+    channels = [np.ascontiguousarray(ycbcr[:, :, c]) for c in range(3)]
+    result = encode(*channels, width, height, float_dtype=float_dtype)
+    jpeg_bytes = result.jpeg_bitstream
+    mcus = [result.mcus_y, result.mcus_cb, result.mcus_cr]
+    dcts = [result.dct_y, result.dct_cb, result.dct_cr]
+    quants = [result.quant_y, result.quant_cb, result.quant_cr]
+    acs = [result.ac_y, result.ac_cb, result.ac_cr]
+    huff_tables = STANDARD_TABLES
+    reuse = result.block_reuse.values()
+    block_reuse_rate = 1.0 - sum(r["distinct_blocks"] for r in reuse) / sum(r["blocks"] for r in reuse)
+    scan_args = (result.dpcm_y, result.rle_y, result.dpcm_cb, result.rle_cb, result.dpcm_cr, result.rle_cr)
+    dequantized = dequantize(*quants, quantization_table_lum, quantization_table_chrom, float_dtype)
+    idct_input = np.stack(dequantized, axis=1)
+    idct_output = IDCT(idct_input, float_dtype)
+
+    stages = {
+        "partition": lambda: [partition(channel) for channel in channels],
+        "block_reuse": lambda: [find_block_reuse(m) for m in mcus],
+        "transform": lambda: [transform(m, float_dtype) for m in mcus],
+        "quantize": lambda: (quantize(dcts[0], quantization_table_lum),
+                             quantize(dcts[1], quantization_table_chrom),
+                             quantize(dcts[2], quantization_table_chrom)),
+        "rle_encode_mcus": lambda: [rle_encode_packed(ac) for ac in acs],
+        "build_scan_bytes_444": lambda: build_scan_bytes_444(*scan_args, huff_tables),
+        "IDCT": lambda: IDCT(idct_input, float_dtype),
+        "mcus_to_ycbcr_array": lambda: mcus_to_ycbcr_array(idct_output[:, 0] + 128, idct_output[:, 1] + 128,
+                                                           idct_output[:, 2] + 128, width, height),
+    }
+    if pixels <= legacy_max_pixels:
+        scan = np.frombuffer(remove_FF00_stuffing(result.huffman_scan_bytes), dtype=np.uint8)
+        bitstream = (scan, np.array([0, 8 * len(scan)], dtype=np.int64))
+        stages["deinterleave"] = lambda: deinterleave(bitstream, len(mcus[0]))
+
+    decoder = Decoder(float_dtype=float_dtype)
+    decoded = decoder.decode(jpeg_bytes)
+    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    _, cv2_jpeg = cv2.imencode(".jpg", bgr, CV2_ENCODE_PARAMS)
+
+    def encode_rgb():
+        image = rgb_to_ycbcr(rgb, float_dtype)
+        return encode(image[:, :, 0], image[:, :, 1], image[:, :, 2], width, height, float_dtype=float_dtype)
+
+    pipeline = {
+        "encode": encode_rgb,
+        "decode_jpeg": lambda: ycbcr_to_rgb(decode_jpeg(jpeg_bytes, float_dtype=float_dtype)),
+        "Decoder.decode": lambda: decoder.decode(jpeg_bytes, out=decoded),
+    }
+    baseline = {
+        "cv2_imencode": lambda: cv2.imencode(".jpg", bgr, CV2_ENCODE_PARAMS),
+        "cv2_imdecode": lambda: cv2.imdecode(cv2_jpeg, cv2.IMREAD_COLOR),
+    }
+
+    def run_group(group: Dict[str, Callable]) -> Dict:
+        timings = {}
+        for name, fn in group.items():
+            try:
+                timings[name] = measure(fn, pixels, repeats, memory)
+            except Exception as e:
+                # A failing stage (e.g. a legacy path that cannot handle this content) must not end the run
+                timings[name] = {"error": f"{type(e).__name__}: {e}"}
+        return timings
+
+    return {
+        "image": f"{kind}-{size}",
+        "content": kind,
+        "size": size,
+        "width": width,
+        "height": height,
+        "megapixels": pixels / 1e6,
+        "float_dtype": float_dtype.name,
+        "bytes_per_pixel": {"ours": len(jpeg_bytes) / pixels, "cv2": len(cv2_jpeg) / pixels},
+        "block_reuse_rate": block_reuse_rate,
+        "stages": run_group(stages),
+        "pipeline": run_group(pipeline),
+        "baseline": run_group(baseline),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(kinds: Iterable[str], sizes: Iterable[str], repeats: int = 3, seed: int = 0,
+              float_dtype=None, memory: bool = True, isolate: bool = True,
+              legacy_max_pixels: int = LEGACY_MAX_PIXELS,
+              progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Run run_case for every (kind, size) pair.
+
+    With isolate each case runs in a fresh process, so peak_rss_mb is the peak of
+    that case alone rather than of the whole run.
+
+    Returns:
+        {"meta": {...}, "results": [run_case(...), ...]} ready for json.dump
+    """
+    kinds = list(kinds)
+    sizes = list(sizes)
+    for size in sizes:
+        if size not in SIZES:
+            raise ValueError(f"Unknown size '{size}', expected one of {tuple(SIZES)}")
+
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "repeats": repeats,
+        "seed": seed,
+    }
+
+    results: List[Dict] = []
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        for kind in kinds:
+            args = (kind, size, repeats, seed, float_dtype, memory, legacy_max_pixels)
+            if isolate:
+                with context.Pool(1) as pool:
+                    case = pool.apply(run_case, args)
+            else:
+                case = run_case(*args)
+            results.append(case)
+            if progress is not None:
+                progress(case)
+    return {"meta": meta, "results": results}
+
+
+def compare(current: Dict, previous: Dict) -> List[str]:
+    """Format the median-time speedup of every timing in current relative to a previous run."""
+    previous_cases = {case["image"]: case for case in previous["results"]}
+    lines = []
+    for case in current["results"]:
+        old_case = previous_cases.get(case["image"])
+        if old_case is None:
+            continue
+        for group in ("stages", "pipeline", "baseline"):
+            for name, timing in case[group].items():
+                old_timing = old_case.get(group, {}).get(name)
+                if old_timing is None or "error" in old_timing or "error" in timing:
+                    continue
+                speedup = old_timing["seconds_median"] / timing["seconds_median"]
+                lines.append(f"{case['image']:>22} {name:>22}: {old_timing['seconds_median'] * 1e3:10.2f} ms -> "
+                             f"{timing['seconds_median'] * 1e3:10.2f} ms ({speedup:5.2f}x)")
+    return lines
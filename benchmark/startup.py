@@ -0,0 +1,97 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Cold-start benchmark: time fresh interpreters importing and using the package.
+
+Usage:
+    python -m benchmark.startup [-n RUNS] [-o startup.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules the encode/decode entry points must not load (CLI, image I/O, staged debug mode, compilers)
+HEAVY_MODULES = ("bitstring", "cv2", "scipy", "argparse", "subprocess", "hashlib", "json", "tracemalloc")
+
+_FIRST_CALL = """
+import numpy as np
+from encoder import encode
+from decoder import decode_jpeg
+y = np.full((16, 16), 128, dtype=np.uint8)
+decode_jpeg(encode(y, y, y, 16, 16).jpeg_bitstream)
+"""
+
+# name -> Python source run in a fresh interpreter
+STARTUP_TARGETS = {
+    "interpreter": "pass",
+    "import": "import encoder, decoder",
+    "first_call": _FIRST_CALL,
+}
+
+
+def _run(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def loaded_heavy_modules(code: str) -> List[str]:
+    """HEAVY_MODULES present in sys.modules after running code in a fresh interpreter."""
+    probe = code + f"\nimport sys\nprint('HEAVY:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("HEAVY:"))
+    return [m for m in line[len("HEAVY:"):].split(",") if m]
+
+
+def measure_startup(runs: int = 10) -> Dict:
+    """
+    Time every STARTUP_TARGETS entry in runs fresh interpreters.
+
+    Returns:
+        {name: {"seconds_min", "seconds_median", "heavy_modules"}}
+    """
+    results = {}
+    for name, code in STARTUP_TARGETS.items():
+        _run(code)  # warm the OS file cache
+        timings = [_run(code) for _ in range(runs)]
+        results[name] = {
+            "seconds_min": min(timings),
+            "seconds_median": statistics.median(timings),
+            "heavy_modules": loaded_heavy_modules(code),
+        }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the encoder/decoder packages")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Fresh interpreters per target")
+    parser.add_argument("-o", "--output", help="Optional JSON output file")
+    args = parser.parse_args()
+
+    results = measure_startup(args.runs)
+    base = results["interpreter"]["seconds_median"]
+    for name, result in results.items():
+        extra = "" if name == "interpreter" else f"  (+{(result['seconds_median'] - base) * 1e3:7.1f} ms)"
+        heavy = ", ".join(result["heavy_modules"]) or "-"
+        print(f"{name:>12}: {result['seconds_median'] * 1e3:8.1f} ms{extra}  heavy modules: {heavy}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    # Fail if an entry point pulled in an optional dependency
+    return 1 if any(result["heavy_modules"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
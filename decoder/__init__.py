@@ -3,6 +3,14 @@ Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
 
-from .decode import decode
+from .decode import decode, decode_jpeg, decode_async
+from .stream_decode import iter_decode_rows, decode_into
+from .jpeg_decoder import Decoder
+from .probe import probe, JpegInfo, DecodeLimits, JpegLimitError
+from .progressive import ScanProgress
+from .batch import decode_batch
+from .coefficients import decode_coefficients, JpegCoefficients
 
-__all__ = ['decode']
+__all__ = ['decode', 'decode_jpeg', 'decode_async', 'iter_decode_rows', 'decode_into', 'Decoder',
+           'probe', 'JpegInfo', 'DecodeLimits', 'JpegLimitError', 'ScanProgress', 'decode_batch',
+           'decode_coefficients', 'JpegCoefficients']
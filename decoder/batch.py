@@ -0,0 +1,195 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Batch decoding into a preallocated NHWC tensor, for ML data loaders.
+
+Every image is decoded straight into its slice of the batch. Each worker
+thread keeps one Decoder (scan decoder, coefficient and IDCT buffers) and one
+scratch image per geometry, so a steady stream of batches allocates nothing
+per image. Images larger than the target are decoded with the scaled IDCT
+(1/2, 1/4 or 1/8) at the smallest scale that still covers it, resized the
+rest of the way with OpenCV, and converted to float32 with the mean/std
+normalisation fused into that one pass.
+"""
+import threading
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from util.dct_basis import scaled_idct_size
+from .jpeg_decoder import Decoder
+from .jpeg_parser import parse_jpeg_header
+from .jpeg_source import JpegSource, open_jpeg_source
+from .probe import DecodeLimits, check_limits
+from .upsample import is_fancy
+
+BATCH_DTYPES = (np.uint8, np.float32)
+
+# Per channel value, or one value for all three channels
+ChannelValues = Union[float, Sequence[float]]
+
+_local = threading.local()
+_MAX_SCRATCH = 8
+
+
+class _MemmapSpec(NamedTuple):
+    """How a process pool worker reopens the np.memmap batch."""
+    filename: str
+    offset: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def decode_batch(
+    buffers: Sequence[JpegSource],
+    out: Optional[np.ndarray] = None,
+    size: Optional[Tuple[int, int]] = None,
+    dtype=np.uint8,
+    mean: Optional[ChannelValues] = None,
+    std: Optional[ChannelValues] = None,
+    executor=None,
+    upsampling: str = "fancy",
+    limits: Optional[DecodeLimits] = None,
+    chunk_size: Optional[int] = None
+) -> np.ndarray:
+    """
+    Decode JPEGs into one RGB tensor of shape (N, height, width, 3).
+
+    Args:
+        buffers: JPEGs as bytes, mmap, file paths or buffer-protocol objects
+        out: Preallocated C-contiguous uint8 or float32 array of shape (N, height, width, 3);
+            an np.memmap is required with a process pool
+        size: Target (width, height); default: the size of out, else of the first image.
+            Images of another size are stretched to it
+        dtype: uint8 or float32 when out is not given
+        mean: Subtracted per channel, in pixel units (float32 only)
+        std: Divides per channel after the mean, in pixel units (float32 only)
+        executor: Optional concurrent.futures thread or process pool decoding chunks in parallel
+            (the Huffman decoder, IDCT and colour conversion release the GIL)
+        upsampling: Chroma upsampling ("fancy" or "nearest")
+        limits: DecodeLimits checked against every header (default: probe.default_limits)
+        chunk_size: Images per executor task (default: spread evenly over 4 tasks per worker)
+
+    Returns:
+        out, filled
+    """
+    is_fancy(upsampling)
+    count = len(buffers)
+    if out is not None:
+        if out.ndim != 4 or out.shape[0] != count or out.shape[3] != 3 or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous array of shape ({count}, height, width, 3), "
+                             f"got {out.shape}")
+        dtype = out.dtype
+        if size is None:
+            size = (out.shape[2], out.shape[1])
+        elif out.shape[1:3] != (size[1], size[0]):
+            raise ValueError(f"out has shape {out.shape}, which does not match size {size}")
+    dtype = np.dtype(dtype)
+    if dtype not in BATCH_DTYPES:
+        raise ValueError(f"Unsupported batch dtype {dtype}, expected uint8 or float32")
+    if dtype == np.uint8 and (mean is not None or std is not None):
+        raise ValueError("mean/std normalisation needs a float32 batch")
+    scale, offset = _normalisation(mean, std)
+
+    if size is None:
+        if not count:
+            raise ValueError("size is required for an empty batch without out")
+        header = parse_jpeg_header(open_jpeg_source(buffers[0]))
+        size = (header.width, header.height)
+    width, height = size
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Batch size must be positive, got {size}")
+    if out is None:
+        out = np.empty((count, height, width, 3), dtype=dtype)
+
+    options = (upsampling, limits, scale, offset)
+    if executor is None:
+        _decode_range(buffers, 0, out, options)
+        return out
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    if chunk_size is None:
+        workers = getattr(executor, "_max_workers", 1)
+        chunk_size = max(-(-count // (4 * workers)), 1)
+    target = out
+    if isinstance(executor, ProcessPoolExecutor):
+        if not isinstance(out, np.memmap) or out.filename is None:
+            raise ValueError("A process pool needs out to be an np.memmap backed by a file")
+        out.flush()
+        target = _MemmapSpec(out.filename, out.offset, out.shape, out.dtype.str)
+    futures = [executor.submit(_decode_range, list(buffers[start:start + chunk_size]), start, target, options)
+               for start in range(0, count, chunk_size)]
+    for future in futures:
+        future.result()
+    return out
+
+
+def _normalisation(mean, std) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """(x - mean) / std as x * scale + offset, per channel; (None, None) without normalisation."""
+    if mean is None and std is None:
+        return None, None
+    mean = np.broadcast_to(np.asarray(0.0 if mean is None else mean, dtype=np.float64), (3,))
+    std = np.broadcast_to(np.asarray(1.0 if std is None else std, dtype=np.float64), (3,))
+    if np.any(std == 0):
+        raise ValueError("std must be non-zero")
+    return (1.0 / std).astype(np.float32), (-mean / std).astype(np.float32)
+
+
+def _decode_range(buffers, start: int, target, options) -> None:
+    """Decode buffers into out[start:start + len(buffers)] (target is out, or a _MemmapSpec in a worker)."""
+    if isinstance(target, _MemmapSpec):
+        target = np.memmap(target.filename, dtype=np.dtype(target.dtype), mode="r+",
+                           offset=target.offset, shape=target.shape)
+    upsampling, limits, scale, offset = options
+    decoder = getattr(_local, "decoder", None)
+    if decoder is None:
+        decoder = _local.decoder = Decoder()
+        _local.scratch = {}
+    decoder.limits = limits
+    decoder.fancy = is_fancy(upsampling)
+    for index, source in enumerate(buffers, start):
+        _decode_one(decoder, source, target[index], scale, offset)
+    if isinstance(target, np.memmap):
+        target.flush()
+
+
+def _decode_one(decoder: Decoder, source: JpegSource, out: np.ndarray, scale, offset) -> None:
+    """Decode one JPEG into its (height, width, 3) slice of the batch."""
+    data = open_jpeg_source(source)
+    header = parse_jpeg_header(data)
+    check_limits(header, len(data), decoder.limits)
+    height, width = out.shape[:2]
+    idct_size = scaled_idct_size(header.width, header.height, width, height)
+    decoded_shape = ((header.height * idct_size + 7) // 8, (header.width * idct_size + 7) // 8, 3)
+
+    if decoded_shape == out.shape and out.dtype == np.uint8:
+        decoder.decode(data, out=out, size=idct_size)
+        return
+    rgb = _scratch(decoded_shape, np.uint8)
+    decoder.decode(data, out=rgb, size=idct_size)
+
+    if decoded_shape != out.shape:
+        import cv2  # only needed when the scaled IDCT does not hit the size exactly
+
+        if out.dtype == np.uint8:
+            cv2.resize(rgb, (width, height), dst=out, interpolation=cv2.INTER_AREA)
+            return
+        rgb = cv2.resize(rgb, (width, height), dst=_scratch(out.shape, np.uint8), interpolation=cv2.INTER_AREA)
+    if scale is None:
+        np.copyto(out, rgb)
+    else:
+        np.multiply(rgb, scale, out=out, dtype=np.float32)
+        out += offset
+
+
+def _scratch(shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """Per-thread scratch image, reused across images and batches of the same geometry."""
+    key = (shape, dtype)
+    buffer = _local.scratch.get(key)
+    if buffer is None:
+        if len(_local.scratch) >= _MAX_SCRATCH:
+            _local.scratch.clear()  # datasets of mixed sizes: do not keep one buffer per geometry
+        buffer = _local.scratch[key] = np.empty(shape, dtype=dtype)
+    return buffer
@@ -0,0 +1,113 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Decoding to quantized DCT coefficients, for compressed-domain consumers.
+
+Only the entropy decoding runs (the table-driven baseline scan decoder, or
+the progressive scan decoder); dequantization, IDCT, upsampling and colour
+conversion are skipped. In zigzag order the returned arrays are views of the
+decoder output, natural order costs one gather per component.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from .jpeg_parser import _DEZIGZAG_INDEX, parse_jpeg_header
+from .jpeg_source import JpegSource, open_jpeg_source
+from .probe import DecodeLimits, check_limits
+from .progressive import decode_progressive_coefficients
+from .scan_decode import component_size, decode_scan, mcu_grid
+
+COEFFICIENT_LAYOUTS = ("flat", "blocks")
+
+
+@dataclass
+class JpegCoefficients:
+    """
+    Result of decode_coefficients().
+
+    Attributes:
+        width, height: Image size in pixels
+        coefficients: Quantized DCT coefficients per component in SOF order, int16 of shape
+            (block_rows, block_cols, 64) or (block_rows, block_cols, 8, 8); the grid covers whole
+            MCUs, blocks beyond component_sizes are padding
+        quant_tables: Quantization table (8x8, natural order) per component
+        sampling_factors: (h, v) per component
+        component_sizes: (width, height) in samples per component
+        zigzag: True if the 64 coefficients of a block are in zigzag order, False for natural (row-major) order
+        progressive: True for progressive (SOF2) files
+    """
+    width: int
+    height: int
+    coefficients: List[np.ndarray]
+    quant_tables: List[np.ndarray]
+    sampling_factors: List[Tuple[int, int]]
+    component_sizes: List[Tuple[int, int]]
+    zigzag: bool
+    progressive: bool
+
+
+def decode_coefficients(source: JpegSource, layout: str = "flat", zigzag: bool = False,
+                        limits: Optional[DecodeLimits] = None,
+                        instrumentation: Optional[Instrumentation] = None) -> JpegCoefficients:
+    """
+    Entropy decode a JPEG to its quantized DCT coefficients without reconstructing pixels.
+
+    Args:
+        source: JPEG as bytes, mmap, file path or any buffer-protocol object
+        layout: "flat" for (block_rows, block_cols, 64), "blocks" for (block_rows, block_cols, 8, 8)
+        zigzag: Keep the zigzag order of the file ("flat" layout only; no reordering copy)
+        limits: DecodeLimits checked against the header (default: probe.default_limits)
+        instrumentation: Times the header parsing and entropy decoding
+
+    Returns:
+        JpegCoefficients with the coefficients, quantization tables and sampling of every component
+    """
+    if layout not in COEFFICIENT_LAYOUTS:
+        raise ValueError(f"Unknown coefficient layout '{layout}', expected one of {COEFFICIENT_LAYOUTS}")
+    if zigzag and layout == "blocks":
+        raise ValueError("The 8x8 block layout needs natural order (zigzag=False)")
+
+    data = open_jpeg_source(source)
+    instrumentation = active_instrumentation(instrumentation)
+    with measure_pipeline(instrumentation, "decode_coefficients") as stats:
+        with measure_stage(instrumentation, "parse_header"):
+            header = parse_jpeg_header(data)
+            check_limits(header, len(data), limits)
+        stats.set_pixels(header.width * header.height)
+
+        with measure_stage(instrumentation, "entropy_decode") as record:
+            if header.progressive:
+                blocks = decode_progressive_coefficients(data, header)
+            else:
+                blocks = decode_scan(data, header)
+            record.set_output(blocks)
+
+        mcus_x, mcus_y = mcu_grid(header)
+        coefficients = []
+        quant_tables = []
+        with measure_stage(instrumentation, "reorder") as record:
+            for component, zigzag_blocks in zip(header.components, blocks):
+                quant_table = header.quant_tables.get(component.quant_table_id)
+                if quant_table is None:
+                    raise ValueError(f"Missing quantization table {component.quant_table_id}")
+                quant_tables.append(quant_table.reshape(8, 8))
+                if not zigzag:
+                    zigzag_blocks = np.take(zigzag_blocks, _DEZIGZAG_INDEX, axis=1)
+                grid = (mcus_y * component.v, mcus_x * component.h)
+                coefficients.append(zigzag_blocks.reshape(grid + ((64,) if layout == "flat" else (8, 8))))
+            record.set_output(*coefficients)
+
+    return JpegCoefficients(
+        width=header.width,
+        height=header.height,
+        coefficients=coefficients,
+        quant_tables=quant_tables,
+        sampling_factors=[(component.h, component.v) for component in header.components],
+        component_sizes=[component_size(header, component) for component in header.components],
+        zigzag=zigzag,
+        progressive=header.progressive,
+    )
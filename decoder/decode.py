@@ -3,9 +3,13 @@ Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
 
+from typing import Callable, Optional, Tuple
 import numpy as np
 
 from util import EncodingResult, logger, huffman_tables
+from util.dct_basis import resolve_float_dtype
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from util.executor import run_in_executor
 from util.encoding_stages import (
     STAGE_JPEG, STAGE_INTERLEAVER, STAGE_AC, STAGE_DC, STAGE_RLE, STAGE_DPCM,
     STAGE_ZIGZAG, STAGE_QUANT, STAGE_DCT, STAGE_MCUS
@@ -15,13 +19,146 @@ from .rle_decode import rle_decode_mcus
 from .dezigzag import dezigzag
 from .quantization_decode import dequantize
 from .idct import IDCT
-from .mcu_reconstruction import mcus_to_ycbcr_array, detect_errors
+from .mcu_reconstruction import mcus_to_ycbcr_array, blocks_to_plane, planes_to_ycbcr_array, detect_errors
 from .huffman_decode import deinterleave, huffman_decode_dc, huffman_decode_ac
-from .jpeg_parser import parse_jpeg_bitstream
+from .jpeg_parser import JpegHeader, parse_jpeg_header
+from .jpeg_source import JpegSource, open_jpeg_source
+from .probe import DecodeLimits, check_limits
+from .scan_decode import (check_frame, decode_scan, mcu_grid, max_sampling, chroma_ratios, component_size,
+                          region_mcu_window, window_blocks)
+from .upsample import is_fancy
+from .progressive import ScanProgress, decode_progressive_coefficients
+
+# Pixel window (x, y, width, height)
+Region = Tuple[int, int, int, int]
+
+
+def _decode_jpeg(data, region: Optional[Region] = None,
+                 limits: Optional[DecodeLimits] = None,
+                 float_dtype=np.float32, upsampling: str = "fancy",
+                 on_scan: Optional[Callable[[ScanProgress], None]] = None,
+                 instrumentation: Optional[Instrumentation] = None) -> Tuple[np.ndarray, JpegHeader]:
+    """Decode a JPEG byte view, returning the YCbCr image (or region) and the parsed header."""
+    fancy = is_fancy(upsampling)
+    logger.info("Parsing JPEG header...")
+    with measure_pipeline(instrumentation, "decode") as stats:
+        with measure_stage(instrumentation, "parse_header"):
+            header = parse_jpeg_header(data)
+            check_limits(header, len(data), limits)
+        stats.set_pixels(header.width * header.height if region is None else region[2] * region[3])
+        return _decode_frame(data, header, region, float_dtype, fancy, on_scan, instrumentation)
+
+
+def _decode_frame(data, header: JpegHeader, region: Optional[Region], float_dtype, fancy: bool,
+                  on_scan: Optional[Callable[[ScanProgress], None]],
+                  instrumentation: Optional[Instrumentation]) -> Tuple[np.ndarray, JpegHeader]:
+    """_decode_jpeg() after the header: entropy decoding, IDCT and colour reconstruction."""
+    check_frame(header)
+    mcus_x, mcus_y = mcu_grid(header)
+    ratios = chroma_ratios(header)
+    if region is None:
+        mcu_window = (0, mcus_y, 0, mcus_x)
+    else:
+        mcu_window = region_mcu_window(header, region)
+        if fancy and ratios != (1, 1):
+            # The triangle filter reads chroma one sample beyond the region: decode one extra MCU around it
+            row_start, row_stop, col_start, col_stop = mcu_window
+            mcu_window = (max(row_start - 1, 0), min(row_stop + 1, mcus_y),
+                          max(col_start - 1, 0), min(col_stop + 1, mcus_x))
+    row_start, row_stop, col_start, col_stop = mcu_window
+
+    with measure_stage(instrumentation, "entropy_decode") as record:
+        if header.progressive:
+            logger.info("Entropy decoding progressive scans...")
+            coefficients = window_blocks(header, decode_progressive_coefficients(data, header, on_scan),
+                                         mcu_window)
+        else:
+            logger.info("Entropy decoding scan...")
+            coefficients = decode_scan(data, header, mcu_window)
+        record.set_output(coefficients)
+
+    logger.info("Dequantization and inverse DCT...")
+    planes = []
+    with measure_stage(instrumentation, "idct") as record:
+        for component, zigzag_blocks in zip(header.components, coefficients):
+            quant_table = header.quant_tables.get(component.quant_table_id)
+            if quant_table is None:
+                raise ValueError(f"Missing quantization table {component.quant_table_id}")
+            dct_blocks = np.multiply(dezigzag(zigzag_blocks), quant_table, dtype=float_dtype)
+            plane = blocks_to_plane(IDCT(dct_blocks, float_dtype), (col_stop - col_start) * component.h)
+            plane += 128
+            planes.append(plane)
+        record.set_output(planes)
+
+    logger.info("Reconstructing image from component planes...")
+    h_max, v_max = max_sampling(header)
+    x_start = col_start * 8 * h_max
+    y_start = row_start * 8 * v_max
+    window_width = min((col_stop - col_start) * 8 * h_max, header.width - x_start)
+    window_height = min((row_stop - row_start) * 8 * v_max, header.height - y_start)
+    chroma_width, chroma_height = component_size(header, header.components[1])
+    chroma_x_start = x_start // ratios[0]
+    with measure_stage(instrumentation, "color_reconstruct") as record:
+        window = planes_to_ycbcr_array(planes, window_width, window_height, ratios, fancy,
+                                       row_offset=y_start, chroma_row_start=y_start // ratios[1],
+                                       chroma_size=(min(chroma_width - chroma_x_start, planes[1].shape[1]),
+                                                    chroma_height))
+        record.set_output(window)
+    if region is None:
+        return window, header
+
+    x, y, w, h = region
+    return window[y - y_start:y - y_start + h, x - x_start:x - x_start + w], header
+
+
+def decode_jpeg(source: JpegSource, region: Optional[Region] = None,
+                limits: Optional[DecodeLimits] = None, float_dtype=np.float32,
+                upsampling: str = "fancy",
+                on_scan: Optional[Callable[[ScanProgress], None]] = None,
+                instrumentation: Optional[Instrumentation] = None) -> np.ndarray:
+    """
+    Decode a JPEG given as file path, mmap or buffer-protocol object to a YCbCr image array.
+
+    With region = (x, y, w, h) only the MCUs covering that window are dequantized,
+    inverse transformed and reconstructed, and the scan is read only up to the
+    last MCU row of the window. The returned array has shape (h, w, 3).
+    Images exceeding limits (default: probe.default_limits) raise JpegLimitError
+    before anything is allocated. The pixel pipeline and the returned array use
+    float_dtype (float32 or float64). 4:2:2 and 4:2:0 chroma is upsampled with
+    the triangle filter ("fancy", as libjpeg) or by replication ("nearest").
+    Progressive files are decoded scan by scan; on_scan receives a ScanProgress
+    after each completed scan, whose render() gives a (scaled) RGB preview.
+    With instrumentation (or inside collect_stats()) the stages are timed and
+    recorded as a "decode" PipelineStats (instrumentation.last).
+    """
+    ycbcr_array, _ = _decode_jpeg(open_jpeg_source(source), region, limits,
+                                  resolve_float_dtype(float_dtype, debug=False), upsampling, on_scan,
+                                  active_instrumentation(instrumentation))
+    return ycbcr_array
+
+
+async def decode_async(source: JpegSource, executor=None, **kwargs) -> np.ndarray:
+    """
+    decode_jpeg() on an executor, for asyncio applications.
+
+    executor defaults to util.executor.set_default_executor() or else the event
+    loop's thread pool. The Huffman decoder, IDCT and upsampling kernels release
+    the GIL, so concurrent calls on a thread pool overlap. kwargs are passed to
+    decode_jpeg().
+    """
+    return await run_in_executor(decode_jpeg, source, executor=executor, **kwargs)
 
 
-def decode(encoding_result: EncodingResult, last_encoding_stage: str) -> np.ndarray:
-    """Decode JPEG-encoded data back to YCbCr image array."""
+def decode(encoding_result: EncodingResult, last_encoding_stage: str, float_dtype=None,
+           instrumentation: Optional[Instrumentation] = None) -> np.ndarray:
+    """
+    Decode JPEG-encoded data back to YCbCr image array.
+
+    float_dtype selects the IDCT precision; by default float32 for complete JPEGs
+    and float64 when decoding an intermediate (debug) stage. instrumentation
+    times the stages of complete JPEG decodes (see decode_jpeg()).
+    """
+    float_dtype = resolve_float_dtype(float_dtype, last_encoding_stage != STAGE_JPEG)
     img_width = encoding_result.img_width
     img_height = encoding_result.img_height
 
@@ -41,10 +178,20 @@ def decode(encoding_result: EncodingResult, last_encoding_stage: str) -> np.ndar
     mcu_rows = (img_height + 7) // 8
     num_mcus = mcu_cols * mcu_rows
 
+    # Reverse Steps 11-1: complete JPEG files take the direct scan decoding path
+    if last_encoding_stage == STAGE_JPEG:
+        if encoding_result.jpeg_bitstream is None:
+            raise ValueError("JPEG stage requires jpeg_bitstream in encoding_result")
+
+        ycbcr_array, header = _decode_jpeg(open_jpeg_source(encoding_result.jpeg_bitstream),
+                                         float_dtype=float_dtype,
+                                         instrumentation=active_instrumentation(instrumentation))
+        encoding_result.quantization_table_lum = header.quant_tables.get(0)
+        encoding_result.quantization_table_chrom = header.quant_tables.get(1)
+        return ycbcr_array
+
     # Define which modes skip which steps (steps that weren't performed by encoder)
     # If the mode is in the list, the step was NOT performed by the encoder, so skip it
-    SKIP_JPEG_PARSING = [STAGE_INTERLEAVER, STAGE_AC, STAGE_DC, STAGE_RLE, STAGE_DPCM,
-                         STAGE_ZIGZAG, STAGE_QUANT, STAGE_DCT, STAGE_MCUS]
     SKIP_DEINTERLEAVE = [STAGE_AC, STAGE_DC, STAGE_RLE, STAGE_DPCM,
                          STAGE_ZIGZAG, STAGE_QUANT, STAGE_DCT, STAGE_MCUS]
     SKIP_HUFFMAN_AC_DECODE = [STAGE_DC, STAGE_RLE, STAGE_DPCM, STAGE_ZIGZAG, STAGE_QUANT, STAGE_DCT, STAGE_MCUS]
@@ -59,19 +206,6 @@ def decode(encoding_result: EncodingResult, last_encoding_stage: str) -> np.ndar
     encoded_dc_y = encoded_dc_cb = encoded_dc_cr = None
     encoded_ac_y = encoded_ac_cb = encoded_ac_cr = None
 
-    # Reverse Step 11: Parse JPEG bitstream
-    if last_encoding_stage not in SKIP_JPEG_PARSING:
-        if encoding_result.jpeg_bitstream is None:
-            raise ValueError("JPEG stage requires jpeg_bitstream in encoding_result")
-
-        logger.info("Reverse Step 11: Parsing JPEG bitstream...")
-        huffman_bitstream, quant_lum, quant_chrom = parse_jpeg_bitstream(
-            encoding_result.jpeg_bitstream
-        )
-
-        encoding_result.quantization_table_lum = quant_lum
-        encoding_result.quantization_table_chrom = quant_chrom
-
     # Reverse Step 10: Deinterleave (separate Huffman-encoded DC and AC for each MCU)
     if last_encoding_stage not in SKIP_DEINTERLEAVE:
         if huffman_bitstream is None:
@@ -196,7 +330,8 @@ def decode(encoding_result: EncodingResult, last_encoding_stage: str) -> np.ndar
         dct_y, dct_cb, dct_cr = dequantize(
             quant_y, quant_cb, quant_cr,
             encoding_result.quantization_table_lum,
-            encoding_result.quantization_table_chrom
+            encoding_result.quantization_table_chrom,
+            float_dtype
         )
     else:
         # Load from encoding result
@@ -212,8 +347,8 @@ def decode(encoding_result: EncodingResult, last_encoding_stage: str) -> np.ndar
 
         logger.info("Reverse Step 2: Applying inverse DCT...")
         num_mcus = len(dct_y)
-        mcus_dct = np.array([[dct_y[i], dct_cb[i], dct_cr[i]] for i in range(num_mcus)])
-        mcus_idct = IDCT(mcus_dct)
+        mcus_dct = np.stack([dct_y, dct_cb, dct_cr], axis=1).reshape(num_mcus, 3, 8, 8)
+        mcus_idct = IDCT(mcus_dct, float_dtype)
 
         mcus_y = mcus_idct[:, 0] + 128
         mcus_cb = mcus_idct[:, 1] + 128
@@ -3,17 +3,19 @@ Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
 from decoder.huffman_decode_cy import (
-    decode_dc_value,
-    decode_ac_tuple,
     deinterleave,
     huffman_decode_dc,
     huffman_decode_ac,
+    ScanDecoderCy,
+    ProgressiveScanDecoderCy,
+    find_scan_end,
 )
 
 __all__ = [
-    'decode_dc_value',
-    'decode_ac_tuple',
     'deinterleave',
     'huffman_decode_dc',
     'huffman_decode_ac',
+    'ScanDecoderCy',
+    'ProgressiveScanDecoderCy',
+    'find_scan_end',
 ]
@@ -2,249 +2,780 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
-from typing import List, Tuple, Dict
-from bitstring import BitArray
+from libc.string cimport memset
+import numpy as np
 
 from util import huffman_tables
 
-# Cache reverse tables for performance
-_DC_Y_REV = {v: k for k, v in huffman_tables.DC_Y.items()}
-_DC_CBCR_REV = {v: k for k, v in huffman_tables.DC_CbCr.items()}
-_AC_Y_REV = {v: k for k, v in huffman_tables.AC_Y.items()}
-_AC_CBCR_REV = {v: k for k, v in huffman_tables.AC_CbCr.items()}
 
-
-def _decode_dc_value(bitstream: BitArray, reverse_table: Dict, pos: int) -> Tuple[int, int]:
-    """Internal DC value decoder with cached reverse table."""
-    cdef int size = 0
-    cdef int value = 0
-    cdef int start_pos = pos
-    cdef str code_str = ""
-
-    while pos < len(bitstream):
-        code_str += "1" if bitstream[pos] else "0"
-        if code_str in reverse_table:
-            size = reverse_table[code_str]
-
-            if size == 0:
-                return 0, pos + 1
-
-            value_bits = bitstream[pos + 1:pos + 1 + size]
-            pos += 1 + size
-
-            value = int(value_bits.bin, 2)
-
-            if not value_bits[0]:
-                value = value - (1 << size) + 1
-
-            return value, pos
-
-        pos += 1
-
-    raise ValueError(f"Could not decode DC value starting at position {start_pos}")
-
-
-def _decode_ac_tuple(bitstream: BitArray, reverse_table: Dict, pos: int) -> Tuple[Tuple[int, int], int]:
-    """Internal AC tuple decoder with cached reverse table."""
-    cdef int run_size = 0
-    cdef int run = 0
-    cdef int size = 0
-    cdef int value = 0
-    cdef int start_pos = pos
-    cdef str code_str = ""
-
-    while pos < len(bitstream):
-        code_str += "1" if bitstream[pos] else "0"
-        if code_str in reverse_table:
-            run_size = reverse_table[code_str]
-
-            if run_size == 0:
-                return (0, 0), pos + 1
-
-            run = run_size >> 4
-            size = run_size & 0x0F
-
-            if size == 0:
-                if run == 15:
-                    return (15, 0), pos + 1
+# ---------------------------------------------------------------------------
+# Table-driven scan decoder working directly on the (still stuffed) JPEG bytes
+# ---------------------------------------------------------------------------
+
+cdef enum:
+    LOOKAHEAD_BITS = 9
+    LOOKAHEAD_SIZE = 512
+    MAX_SCAN_COMPONENTS = 4
+    MAX_DC_CATEGORY = 11    # Largest DC magnitude category of 8-bit scans
+
+cdef struct HuffLookup:
+    int maxcode[18]             # Largest code of each length, -1 if none
+    int valoffset[18]           # Symbol index = valoffset[l] + code
+    unsigned char huffval[256]
+    unsigned char look_len[LOOKAHEAD_SIZE]  # Code length for a 9-bit prefix, 0 = longer code
+    unsigned char look_sym[LOOKAHEAD_SIZE]
+
+
+cdef int build_lookup(HuffLookup* table, bytes counts, bytes symbols, bint dc=False) except -1:
+    """
+    Build canonical decoding tables (JPEG Annex F.2.2.3) plus a 9-bit lookahead.
+
+    Over-subscribed code lengths are rejected before any table entry is written, so a
+    corrupt DHT segment cannot index past the lookahead arrays. DC tables (dc=True) may
+    only hold magnitude categories 0-11.
+    """
+    cdef int code = 0
+    cdef int k = 0
+    cdef int length, i, j, n, prefix, fill
+
+    if len(counts) != 16 or len(symbols) != sum(counts) or len(symbols) > 256:
+        raise ValueError("Invalid Huffman table specification")
+    if dc and any(symbol > MAX_DC_CATEGORY for symbol in symbols):
+        raise ValueError(f"Invalid DC Huffman table: symbol above {MAX_DC_CATEGORY}")
+
+    memset(table.look_len, 0, LOOKAHEAD_SIZE)
+    for length in range(1, 17):
+        n = counts[length - 1]
+        if code + n > (1 << length):
+            raise ValueError("Invalid Huffman table: too many codes")
+        table.valoffset[length] = k - code
+        for i in range(n):
+            table.huffval[k] = symbols[k]
+            if length <= LOOKAHEAD_BITS:
+                prefix = code << (LOOKAHEAD_BITS - length)
+                fill = 1 << (LOOKAHEAD_BITS - length)
+                for j in range(fill):
+                    table.look_len[prefix + j] = length
+                    table.look_sym[prefix + j] = symbols[k]
+            code += 1
+            k += 1
+        table.maxcode[length] = code - 1 if n else -1
+        code <<= 1
+    return 0
+
+
+cdef class ScanDecoderCy:
+    """
+    Decode a baseline scan into zigzag-ordered int16 coefficients.
+
+    Reads straight from the JPEG buffer: 0xFF00 stuffing is removed and RST markers
+    are consumed while the bit buffer is refilled, so the scan is never copied.
+    Blocks are written MCU row by MCU row, which allows decoding in bands.
+    sampling gives (h, v) per scan component: each MCU then holds h x v blocks of
+    that component, stored in raster order of the component's block grid.
+    The decode loops run without the GIL, so separate decoders can work in
+    parallel threads.
+    """
+    cdef const unsigned char[:] data
+    cdef Py_ssize_t pos
+    cdef Py_ssize_t end
+    cdef unsigned long long acc
+    cdef int nbits
+    cdef int marker
+    cdef int num_components
+    cdef HuffLookup dc_tables[MAX_SCAN_COMPONENTS]
+    cdef HuffLookup ac_tables[MAX_SCAN_COMPONENTS]
+    cdef int pred[MAX_SCAN_COMPONENTS]
+    cdef int h[MAX_SCAN_COMPONENTS]
+    cdef int v[MAX_SCAN_COMPONENTS]
+    cdef Py_ssize_t mcus_x
+    cdef Py_ssize_t mcus_y
+    cdef Py_ssize_t mcus_done
+    cdef int restart_interval
+
+    def __cinit__(self, data, Py_ssize_t offset, list dc_specs, list ac_specs,
+                  Py_ssize_t mcus_x, Py_ssize_t mcus_y, int restart_interval=0, list sampling=None):
+        cdef int c
+        self.data = data
+        self.pos = offset
+        self.end = len(data)
+        self.acc = 0
+        self.nbits = 0
+        self.marker = -1
+        self.num_components = len(dc_specs)
+        if not 0 < self.num_components <= MAX_SCAN_COMPONENTS or len(ac_specs) != self.num_components:
+            raise ValueError(f"Unsupported number of scan components: {self.num_components}")
+        for c in range(self.num_components):
+            # Progressive scans only use one of the two tables, the other spec is None
+            if dc_specs[c] is not None:
+                build_lookup(&self.dc_tables[c], dc_specs[c][0], dc_specs[c][1], True)
+            if ac_specs[c] is not None:
+                build_lookup(&self.ac_tables[c], ac_specs[c][0], ac_specs[c][1])
+            self.pred[c] = 0
+            self.h[c], self.v[c] = sampling[c] if sampling is not None else (1, 1)
+            if not (1 <= self.h[c] <= 4 and 1 <= self.v[c] <= 4):
+                raise ValueError(f"Invalid sampling factors {self.h[c]}x{self.v[c]}")
+        # rows_done and the row loops divide by the grid width (compiled with cdivision)
+        if mcus_x <= 0 or mcus_y <= 0:
+            raise ValueError(f"Invalid MCU grid {mcus_x}x{mcus_y}")
+        self.mcus_x = mcus_x
+        self.mcus_y = mcus_y
+        self.mcus_done = 0
+        self.restart_interval = restart_interval
+
+    def reset(self, data, Py_ssize_t offset, int restart_interval=0):
+        """Start over on a new scan that uses the same Huffman tables and MCU grid."""
+        cdef int c
+        self.data = data
+        self.pos = offset
+        self.end = len(data)
+        self.acc = 0
+        self.nbits = 0
+        self.marker = -1
+        for c in range(self.num_components):
+            self.pred[c] = 0
+        self.mcus_done = 0
+        self.restart_interval = restart_interval
+
+    @property
+    def position(self):
+        """Byte offset of the next unread scan byte."""
+        return self.pos
+
+    @property
+    def rows_done(self):
+        """Number of fully decoded MCU rows."""
+        return self.mcus_done // self.mcus_x
+
+    cdef inline void _fill(self) noexcept nogil:
+        cdef unsigned int byte, next_byte
+        while self.nbits <= 56:
+            if self.marker >= 0 or self.pos >= self.end:
+                # Past a marker or the end of data: feed zeros (corrupt/truncated scans decode as gray)
+                self.acc <<= 8
+                self.nbits += 8
+                continue
+            byte = self.data[self.pos]
+            if byte == 0xFF:
+                next_byte = self.data[self.pos + 1] if self.pos + 1 < self.end else 0xD9
+                if next_byte == 0x00:
+                    self.pos += 2
+                elif next_byte == 0xFF:
+                    self.pos += 1
+                    continue
                 else:
-                    raise ValueError(f"Invalid AC coefficient: run={run}, size=0")
-
-            value_bits = bitstream[pos + 1:pos + 1 + size]
-            pos += 1 + size
-
-            value = int(value_bits.bin, 2)
-
-            if not value_bits[0]:
-                value = value - (1 << size) + 1
-
-            return (run, value), pos
-
-        pos += 1
-
-    raise ValueError(f"Could not decode AC tuple starting at position {start_pos}")
-
-
-def decode_dc_value(bitstream: BitArray, huffman_table: Dict[int, str], pos: int) -> Tuple[int, int]:
-    """Decode a single DC coefficient from the bitstream."""
-    cdef int size = 0
-    cdef int value = 0
-    cdef int start_pos = pos
-    cdef str code_str = ""
-
-    reverse_table = {v: k for k, v in huffman_table.items()}
-
-    while pos < len(bitstream):
-        code_str += "1" if bitstream[pos] else "0"
-        if code_str in reverse_table:
-            size = reverse_table[code_str]
-
-            if size == 0:
-                return 0, pos + 1
-
-            value_bits = bitstream[pos + 1:pos + 1 + size]
-            pos += 1 + size
-
-            value = int(value_bits.bin, 2)
-
-            if not value_bits[0]:
-                value = value - (1 << size) + 1
-
-            return value, pos
-
-        pos += 1
-
-    raise ValueError(f"Could not decode DC value starting at position {start_pos}")
-
-
-def decode_ac_tuple(bitstream: BitArray, huffman_table: Dict[int, str], pos: int) -> Tuple[Tuple[int, int], int]:
-    """Decode a single AC coefficient tuple from the bitstream."""
-    cdef int run_size = 0
-    cdef int run = 0
-    cdef int size = 0
-    cdef int value = 0
-    cdef int start_pos = pos
-    cdef str code_str = ""
-
-    reverse_table = {v: k for k, v in huffman_table.items()}
-
-    while pos < len(bitstream):
-        code_str += "1" if bitstream[pos] else "0"
-        if code_str in reverse_table:
-            run_size = reverse_table[code_str]
-
-            if run_size == 0:
-                return (0, 0), pos + 1
-
-            run = run_size >> 4
-            size = run_size & 0x0F
-
+                    self.marker = next_byte
+                    continue
+            else:
+                self.pos += 1
+            self.acc = (self.acc << 8) | byte
+            self.nbits += 8
+
+    cdef inline int _get_bits(self, int n) noexcept nogil:
+        if self.nbits < n:
+            self._fill()
+        self.nbits -= n
+        return <int>((self.acc >> self.nbits) & ((1ULL << n) - 1))
+
+    cdef inline int _receive_extend(self, int size) noexcept nogil:
+        cdef int value = self._get_bits(size)
+        if value < (1 << (size - 1)):
+            value -= (1 << size) - 1
+        return value
+
+    cdef inline int _decode_symbol(self, HuffLookup* table) except -1 nogil:
+        cdef int look, length, code
+        if self.nbits < 16:
+            self._fill()
+        look = <int>((self.acc >> (self.nbits - LOOKAHEAD_BITS)) & (LOOKAHEAD_SIZE - 1))
+        length = table.look_len[look]
+        if length:
+            self.nbits -= length
+            return table.look_sym[look]
+
+        length = LOOKAHEAD_BITS + 1
+        code = <int>((self.acc >> (self.nbits - length)) & ((1 << length) - 1))
+        while length <= 16 and code > table.maxcode[length]:
+            length += 1
+            code = <int>((self.acc >> (self.nbits - length)) & ((1 << length) - 1))
+        if length > 16:
+            with gil:
+                raise ValueError(f"Invalid Huffman code near byte {self.pos}")
+        self.nbits -= length
+        return table.huffval[table.valoffset[length] + code]
+
+    cdef int _decode_block(self, short* out, int c) except -1 nogil:
+        cdef int symbol, run, size, k
+        memset(out, 0, 64 * sizeof(short))
+
+        size = self._decode_symbol(&self.dc_tables[c])
+        if size:
+            self.pred[c] += self._receive_extend(size)
+        out[0] = <short>self.pred[c]
+
+        k = 1
+        while k < 64:
+            symbol = self._decode_symbol(&self.ac_tables[c])
+            run = symbol >> 4
+            size = symbol & 0x0F
             if size == 0:
                 if run == 15:
-                    return (15, 0), pos + 1
-                else:
-                    raise ValueError(f"Invalid AC coefficient: run={run}, size=0")
-
-            value_bits = bitstream[pos + 1:pos + 1 + size]
-            pos += 1 + size
-
-            value = int(value_bits.bin, 2)
-
-            if not value_bits[0]:
-                value = value - (1 << size) + 1
-
-            return (run, value), pos
-
-        pos += 1
-
-    raise ValueError(f"Could not decode AC tuple starting at position {start_pos}")
-
-
-def deinterleave(
-    huffman_bitstream: BitArray,
-    num_mcus: int
-) -> Tuple[List[BitArray], List[BitArray], List[BitArray], List[BitArray], List[BitArray], List[BitArray]]:
-    """Deinterleave bitstream into separate DC and AC bitstreams for each MCU."""
-    encoded_dc_y = []
-    encoded_dc_cb = []
-    encoded_dc_cr = []
-    encoded_ac_y = []
-    encoded_ac_cb = []
-    encoded_ac_cr = []
-
-    cdef int pos = 0
-    cdef int mcu_idx = 0
-    cdef int start_pos = 0
-    cdef tuple ac_tuple
-
-    for mcu_idx in range(num_mcus):
-        start_pos = pos
-        dc_value, pos = _decode_dc_value(huffman_bitstream, _DC_Y_REV, pos)
-        encoded_dc_y.append(huffman_bitstream[start_pos:pos])
-
-        start_pos = pos
-        while True:
-            ac_tuple, pos = _decode_ac_tuple(huffman_bitstream, _AC_Y_REV, pos)
-            if ac_tuple == (0, 0):
+                    k += 16
+                    continue
                 break
-        encoded_ac_y.append(huffman_bitstream[start_pos:pos])
-
-        start_pos = pos
-        dc_value, pos = _decode_dc_value(huffman_bitstream, _DC_CBCR_REV, pos)
-        encoded_dc_cb.append(huffman_bitstream[start_pos:pos])
-
-        start_pos = pos
-        while True:
-            ac_tuple, pos = _decode_ac_tuple(huffman_bitstream, _AC_CBCR_REV, pos)
-            if ac_tuple == (0, 0):
+            k += run
+            if k > 63:
+                with gil:
+                    raise ValueError(f"AC coefficient index out of range near byte {self.pos}")
+            out[k] = <short>self._receive_extend(size)
+            k += 1
+        return 0
+
+    cdef int _restart(self) except -1 nogil:
+        cdef int c
+        # Remaining bits are padding in front of the RST marker
+        self.acc = 0
+        self.nbits = 0
+        while self.pos < self.end and self.data[self.pos] == 0xFF and self.pos + 1 < self.end \
+                and self.data[self.pos + 1] == 0xFF:
+            self.pos += 1
+        if self.pos + 1 >= self.end or self.data[self.pos] != 0xFF \
+                or not 0xD0 <= self.data[self.pos + 1] <= 0xD7:
+            with gil:
+                raise ValueError(f"Expected RST marker at byte {self.pos}")
+        self.pos += 2
+        self.marker = -1
+        for c in range(self.num_components):
+            self.pred[c] = 0
+        return 0
+
+    def decode_rows(self, list coefficients, Py_ssize_t row_count,
+                    Py_ssize_t col_start=0, Py_ssize_t col_stop=-1):
+        """
+        Decode the next row_count MCU rows.
+
+        coefficients holds one C-contiguous int16 array of shape
+        (>= row_count * v * (col_stop - col_start) * h, 64) per scan component; the
+        first stored block goes to index 0. Blocks outside [col_start, col_stop) are
+        entropy decoded (the scan has to be walked) but not stored.
+        """
+        cdef short* ptrs[MAX_SCAN_COMPONENTS]
+        cdef Py_ssize_t strides[MAX_SCAN_COMPONENTS]
+        cdef short scratch[64]
+        cdef short[:, ::1] view
+        cdef Py_ssize_t row, col, idx, window
+        cdef int c, i, j
+
+        if col_stop < 0:
+            col_stop = self.mcus_x
+        if not 0 <= col_start < col_stop <= self.mcus_x:
+            raise ValueError(f"Invalid MCU column window [{col_start}, {col_stop})")
+        window = col_stop - col_start
+        if len(coefficients) != self.num_components:
+            raise ValueError("One coefficient array per scan component is required")
+        if row_count > self.mcus_y - self.rows_done:
+            raise ValueError("Requested more MCU rows than remain in the scan")
+        for c in range(self.num_components):
+            view = coefficients[c]
+            # Blocks per row of the component's block grid inside the window
+            strides[c] = window * self.h[c]
+            if view.shape[0] < row_count * self.v[c] * strides[c] or view.shape[1] != 64:
+                raise ValueError("Coefficient array too small for the requested rows")
+            ptrs[c] = &view[0, 0]
+
+        with nogil:
+            for row in range(row_count):
+                for col in range(self.mcus_x):
+                    if self.restart_interval and self.mcus_done \
+                            and self.mcus_done % self.restart_interval == 0:
+                        self._restart()
+                    if col_start <= col < col_stop:
+                        for c in range(self.num_components):
+                            for j in range(self.v[c]):
+                                idx = (row * self.v[c] + j) * strides[c] + (col - col_start) * self.h[c]
+                                for i in range(self.h[c]):
+                                    self._decode_block(ptrs[c] + (idx + i) * 64, c)
+                    else:
+                        for c in range(self.num_components):
+                            for i in range(self.h[c] * self.v[c]):
+                                self._decode_block(scratch, c)
+                    self.mcus_done += 1
+
+    def skip_rows(self, Py_ssize_t row_count):
+        """Entropy decode the next row_count MCU rows without storing any coefficients."""
+        cdef short scratch[64]
+        cdef Py_ssize_t i
+        cdef int c, k
+
+        if row_count > self.mcus_y - self.rows_done:
+            raise ValueError("Requested more MCU rows than remain in the scan")
+        with nogil:
+            for i in range(row_count * self.mcus_x):
+                if self.restart_interval and self.mcus_done \
+                        and self.mcus_done % self.restart_interval == 0:
+                    self._restart()
+                for c in range(self.num_components):
+                    for k in range(self.h[c] * self.v[c]):
+                        self._decode_block(scratch, c)
+                self.mcus_done += 1
+
+
+def find_scan_end(const unsigned char[:] data, Py_ssize_t pos):
+    """Return the offset of the first marker at or after pos that ends a scan (not stuffing or RST), or -1."""
+    cdef Py_ssize_t end = data.shape[0]
+    cdef unsigned char next_byte
+    while pos + 1 < end:
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        next_byte = data[pos + 1]
+        if next_byte == 0xFF:
+            pos += 1
+        elif next_byte == 0x00 or 0xD0 <= next_byte <= 0xD7:
+            pos += 2
+        else:
+            return pos
+    return -1
+
+
+cdef class ProgressiveScanDecoderCy(ScanDecoderCy):
+    """
+    Decode one scan of a progressive JPEG into persistent zigzag-ordered int16 coefficients.
+
+    Handles DC first/refinement scans (interleaved or not) and AC spectral band
+    first/refinement scans (single component), including end-of-band runs.
+    Coefficient arrays span the full interleaved block grid; blocks_x gives the
+    number of blocks per row of each array.
+    """
+    cdef int eobrun
+
+    cdef int _decode_dc_first(self, short* block, int c, int al) except -1 nogil:
+        cdef int size = self._decode_symbol(&self.dc_tables[c])
+        if size:
+            self.pred[c] += self._receive_extend(size)
+        block[0] = <short>(self.pred[c] * (1 << al))
+        return 0
+
+    cdef int _decode_dc_refine(self, short* block, int al) except -1 nogil:
+        if self._get_bits(1):
+            block[0] |= <short>(1 << al)
+        return 0
+
+    cdef int _decode_ac_first(self, short* block, int ss, int se, int al) except -1 nogil:
+        cdef int k, symbol, run, size
+        if self.eobrun > 0:
+            self.eobrun -= 1
+            return 0
+        k = ss
+        while k <= se:
+            symbol = self._decode_symbol(&self.ac_tables[0])
+            run = symbol >> 4
+            size = symbol & 0x0F
+            if size:
+                k += run
+                if k > 63:
+                    with gil:
+                        raise ValueError(f"AC coefficient index out of range near byte {self.pos}")
+                block[k] = <short>(self._receive_extend(size) * (1 << al))
+            elif run == 15:
+                k += 15
+            else:
+                self.eobrun = 1 << run
+                if run:
+                    self.eobrun += self._get_bits(run)
+                self.eobrun -= 1
                 break
-        encoded_ac_cb.append(huffman_bitstream[start_pos:pos])
-
-        start_pos = pos
-        dc_value, pos = _decode_dc_value(huffman_bitstream, _DC_CBCR_REV, pos)
-        encoded_dc_cr.append(huffman_bitstream[start_pos:pos])
-
-        start_pos = pos
-        while True:
-            ac_tuple, pos = _decode_ac_tuple(huffman_bitstream, _AC_CBCR_REV, pos)
-            if ac_tuple == (0, 0):
+            k += 1
+        return 0
+
+    cdef inline int _refine_bit(self, short* coefficient, int p1) noexcept nogil:
+        # Correction bit of an already nonzero coefficient: 1 = grow its magnitude by p1
+        if self._get_bits(1) and (coefficient[0] & p1) == 0:
+            if coefficient[0] >= 0:
+                coefficient[0] += p1
+            else:
+                coefficient[0] -= p1
+        return 0
+
+    cdef int _decode_ac_refine(self, short* block, int ss, int se, int al) except -1 nogil:
+        cdef int k = ss
+        cdef int symbol, run, size, value
+        cdef int p1 = 1 << al
+
+        if self.eobrun == 0:
+            while k <= se:
+                symbol = self._decode_symbol(&self.ac_tables[0])
+                run = symbol >> 4
+                size = symbol & 0x0F
+                value = 0
+                if size:
+                    value = p1 if self._get_bits(1) else -p1
+                elif run != 15:
+                    self.eobrun = 1 << run
+                    if run:
+                        self.eobrun += self._get_bits(run)
+                    break
+                # Skip run zero-history coefficients, refining the nonzero ones passed on the way
+                while k <= se:
+                    if block[k] != 0:
+                        self._refine_bit(&block[k], p1)
+                    else:
+                        if run == 0:
+                            break
+                        run -= 1
+                    k += 1
+                if value:
+                    if k > 63:
+                        with gil:
+                            raise ValueError(f"AC coefficient index out of range near byte {self.pos}")
+                    block[k] = <short>value
+                k += 1
+
+        if self.eobrun > 0:
+            while k <= se:
+                if block[k] != 0:
+                    self._refine_bit(&block[k], p1)
+                k += 1
+            self.eobrun -= 1
+        return 0
+
+    def decode_scan(self, list coefficients, list blocks_x, int ss, int se, int ah, int al):
+        """
+        Decode the whole scan with spectral selection ss..se and successive approximation ah/al.
+
+        The MCU grid and sampling passed to the constructor describe the scan:
+        the interleaved grid for multi-component DC scans, the component's own
+        block grid with 1x1 sampling for single-component scans.
+        """
+        cdef short* ptrs[MAX_SCAN_COMPONENTS]
+        cdef Py_ssize_t strides[MAX_SCAN_COMPONENTS]
+        cdef Py_ssize_t rows[MAX_SCAN_COMPONENTS]
+        cdef short[:, ::1] view
+        cdef Py_ssize_t row, col, idx
+        cdef short* block
+        cdef int c, i, j
+        cdef bint dc_scan = ss == 0
+
+        if dc_scan and se != 0 or not dc_scan and (se < ss or se > 63 or self.num_components != 1):
+            raise ValueError(f"Invalid progressive scan: Ss={ss}, Se={se}, {self.num_components} components")
+        if ah and ah - 1 != al:
+            raise ValueError(f"Invalid successive approximation: Ah={ah}, Al={al}")
+        if len(coefficients) != self.num_components or len(blocks_x) != self.num_components:
+            raise ValueError("One coefficient array per scan component is required")
+        for c in range(self.num_components):
+            view = coefficients[c]
+            strides[c] = blocks_x[c]
+            if view.shape[1] != 64 or strides[c] < self.mcus_x * self.h[c] \
+                    or view.shape[0] < self.mcus_y * self.v[c] * strides[c]:
+                raise ValueError("Coefficient array too small for the scan")
+            ptrs[c] = &view[0, 0]
+
+        self.eobrun = 0
+        with nogil:
+            for row in range(self.mcus_y):
+                for col in range(self.mcus_x):
+                    if self.restart_interval and self.mcus_done \
+                            and self.mcus_done % self.restart_interval == 0:
+                        self._restart()
+                        self.eobrun = 0
+                    for c in range(self.num_components):
+                        for j in range(self.v[c]):
+                            idx = (row * self.v[c] + j) * strides[c] + col * self.h[c]
+                            for i in range(self.h[c]):
+                                block = ptrs[c] + (idx + i) * 64
+                                if not dc_scan:
+                                    if ah:
+                                        self._decode_ac_refine(block, ss, se, al)
+                                    else:
+                                        self._decode_ac_first(block, ss, se, al)
+                                elif ah:
+                                    self._decode_dc_refine(block, al)
+                                else:
+                                    self._decode_dc_first(block, c, al)
+                    self.mcus_done += 1
+
+
+# ---------------------------------------------------------------------------
+# Packed Huffman stages of the staged (debug) pipeline
+# ---------------------------------------------------------------------------
+# A stage is one uint8 bit buffer (MSB first, no byte stuffing) plus int64 bit
+# offsets, block i owning bits offsets[i]:offsets[i + 1] (see encoder.scan_writer_cy).
+
+cdef enum:
+    DEINTERLEAVE_STREAMS = 6    # DC Y, AC Y, DC Cb, AC Cb, DC Cr, AC Cr (MCU order)
+
+
+cdef struct PackedSink:
+    unsigned char* out
+    Py_ssize_t pos
+    unsigned long long buf
+    int nbits
+
+
+def _table_spec(dict huffman_table):
+    """(counts, symbols) of a code table given as {symbol: code string}; the codes must be canonical."""
+    ordered = sorted(huffman_table.items(), key=lambda item: (len(item[1]), item[1]))
+    counts = [0] * 16
+    code = 0
+    length = 1
+    for symbol, bits in ordered:
+        while length < len(bits):
+            code <<= 1
+            length += 1
+        if int(bits, 2) != code:
+            raise ValueError("Huffman table codes are not canonical")
+        counts[length - 1] += 1
+        code += 1
+    return bytes(counts), bytes(symbol for symbol, _ in ordered)
+
+
+cdef int _build_table(HuffLookup* table, dict huffman_table, bint dc=False) except -1:
+    counts, symbols = _table_spec(huffman_table)
+    return build_lookup(table, counts, symbols, dc)
+
+
+cdef inline unsigned int _peek(const unsigned char* data, Py_ssize_t nbytes, Py_ssize_t pos, int n) noexcept nogil:
+    """Next n (1..24) bits at bit position pos, zeros past the end."""
+    cdef Py_ssize_t byte = pos >> 3
+    cdef unsigned int word = 0
+    cdef int k
+    for k in range(4):
+        word <<= 8
+        if byte + k < nbytes:
+            word |= data[byte + k]
+    return (word << (pos & 7)) >> (32 - n)
+
+
+cdef inline int _packed_symbol(const HuffLookup* table, const unsigned char* data, Py_ssize_t nbytes,
+                               Py_ssize_t* pos) noexcept nogil:
+    """Decode one Huffman symbol at pos (advanced past it); -1 for an invalid code."""
+    cdef unsigned int window = _peek(data, nbytes, pos[0], 16)
+    cdef int length = table.look_len[window >> (16 - LOOKAHEAD_BITS)]
+    cdef int code
+    if length:
+        pos[0] += length
+        return table.look_sym[window >> (16 - LOOKAHEAD_BITS)]
+    for length in range(LOOKAHEAD_BITS + 1, 17):
+        code = <int>(window >> (16 - length))
+        if code <= table.maxcode[length]:
+            pos[0] += length
+            return table.huffval[table.valoffset[length] + code]
+    return -1
+
+
+cdef inline int _packed_value(const unsigned char* data, Py_ssize_t nbytes, Py_ssize_t* pos, int size) noexcept nogil:
+    """Read and sign-extend a size-bit magnitude (JPEG F.2.2.1)."""
+    if not size:
+        return 0
+    cdef int value = <int>_peek(data, nbytes, pos[0], size)
+    pos[0] += size
+    if value < (1 << (size - 1)):
+        value -= (1 << size) - 1
+    return value
+
+
+cdef inline int _skip_ac_block(const HuffLookup* table, const unsigned char* data, Py_ssize_t nbytes,
+                               Py_ssize_t* pos) noexcept nogil:
+    """Skip the AC symbols of one block: up to EOB, or 63 coefficients (no EOB is coded then)."""
+    cdef int coefficient = 0
+    cdef int symbol
+    while coefficient < 63:
+        symbol = _packed_symbol(table, data, nbytes, pos)
+        if symbol < 0:
+            return -1
+        if symbol == 0:
+            break
+        coefficient += (symbol >> 4) + 1
+        pos[0] += symbol & 15
+    return 0
+
+
+cdef inline void _write_bits(PackedSink* sink, unsigned int code, int length) noexcept nogil:
+    sink.buf = (sink.buf << length) | code
+    sink.nbits += length
+    while sink.nbits >= 8:
+        sink.nbits -= 8
+        sink.out[sink.pos] = (sink.buf >> sink.nbits) & 0xFF
+        sink.pos += 1
+
+
+cdef inline void _copy_bits(PackedSink* sink, const unsigned char* data, Py_ssize_t nbytes,
+                            Py_ssize_t start, Py_ssize_t stop) noexcept nogil:
+    cdef int n
+    while start < stop:
+        n = 16 if stop - start > 16 else <int>(stop - start)
+        _write_bits(sink, _peek(data, nbytes, start, n), n)
+        start += n
+
+
+def _packed(stage):
+    """Contiguous (bits, offsets) arrays of a packed stage."""
+    bits, offsets = stage
+    return np.ascontiguousarray(bits, dtype=np.uint8), np.ascontiguousarray(offsets, dtype=np.int64)
+
+
+def deinterleave(huffman_bitstream, Py_ssize_t num_mcus):
+    """
+    Split a packed interleaved 4:4:4 stream into the packed DC and AC stages of each component.
+
+    Args:
+        huffman_bitstream: Packed (bits, offsets) stream, as interleave_mcus() produces
+        num_mcus: Number of MCUs in the stream
+
+    Returns:
+        (encoded_dc_y, encoded_dc_cb, encoded_dc_cr, encoded_ac_y, encoded_ac_cb, encoded_ac_cr),
+        each a packed (bits, offsets) stage
+    """
+    cdef HuffLookup dc_y, ac_y, dc_c, ac_c
+    _build_table(&dc_y, huffman_tables.DC_Y, True)
+    _build_table(&ac_y, huffman_tables.AC_Y)
+    _build_table(&dc_c, huffman_tables.DC_CbCr, True)
+    _build_table(&ac_c, huffman_tables.AC_CbCr)
+    cdef const HuffLookup* dc_tables[3]
+    cdef const HuffLookup* ac_tables[3]
+    dc_tables[0] = &dc_y
+    dc_tables[1] = &dc_c
+    dc_tables[2] = &dc_c
+    ac_tables[0] = &ac_y
+    ac_tables[1] = &ac_c
+    ac_tables[2] = &ac_c
+
+    bits, _ = _packed(huffman_bitstream)
+    cdef const unsigned char[::1] bit_view = bits
+    cdef const unsigned char* data = &bit_view[0] if bits.shape[0] else NULL
+    cdef Py_ssize_t nbytes = bits.shape[0]
+    # Stream s of MCU i covers bits bounds[i * 6 + s]:bounds[i * 6 + s + 1]
+    bounds = np.empty(num_mcus * DEINTERLEAVE_STREAMS + 1, dtype=np.int64)
+    cdef long long[::1] bound_view = bounds
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t i = 0, k
+    cdef int c, symbol, failed = 0
+    with nogil:
+        k = 0
+        for i in range(num_mcus):
+            for c in range(3):
+                bound_view[k] = pos
+                symbol = _packed_symbol(dc_tables[c], data, nbytes, &pos)
+                if symbol < 0:
+                    failed = 1
+                    break
+                pos += symbol
+                bound_view[k + 1] = pos
+                if _skip_ac_block(ac_tables[c], data, nbytes, &pos) < 0:
+                    failed = 1
+                    break
+                k += 2
+            if failed:
+                break
+        bound_view[k] = pos
+    if failed or pos > nbytes * 8:
+        raise ValueError(f"Could not deinterleave MCU {i} at bit {pos}")
+
+    streams = []
+    cdef PackedSink sink
+    cdef unsigned char[::1] out_view
+    cdef long long[::1] offset_view
+    cdef int s
+    for s in range(DEINTERLEAVE_STREAMS):
+        offsets = np.zeros(num_mcus + 1, dtype=np.int64)
+        np.cumsum(bounds[s + 1::DEINTERLEAVE_STREAMS] - bounds[s:len(bounds) - 1:DEINTERLEAVE_STREAMS],
+                  out=offsets[1:])
+        out = np.zeros(int(offsets[num_mcus]) // 8 + 8, dtype=np.uint8)
+        out_view = out
+        offset_view = offsets
+        sink.out = &out_view[0]
+        sink.pos = 0
+        sink.buf = 0
+        sink.nbits = 0
+        with nogil:
+            for i in range(num_mcus):
+                _copy_bits(&sink, data, nbytes, bound_view[i * DEINTERLEAVE_STREAMS + s],
+                           bound_view[i * DEINTERLEAVE_STREAMS + s + 1])
+            if sink.nbits & 7:
+                _write_bits(&sink, 0, 8 - (sink.nbits & 7))
+        streams.append((out[:sink.pos].copy(), offsets))
+    dc_y_stage, ac_y_stage, dc_cb_stage, ac_cb_stage, dc_cr_stage, ac_cr_stage = streams
+    return dc_y_stage, dc_cb_stage, dc_cr_stage, ac_y_stage, ac_cb_stage, ac_cr_stage
+
+
+def huffman_decode_dc(encoded_dc, dict huffman_table):
+    """
+    Huffman decode a packed DC stage.
+
+    Returns:
+        int32 array of the DPCM differences, one per block
+    """
+    cdef HuffLookup table
+    _build_table(&table, huffman_table, True)
+    bits, offsets = _packed(encoded_dc)
+    cdef const unsigned char[::1] bit_view = bits
+    cdef const long long[::1] offset_view = offsets
+    cdef const unsigned char* data = &bit_view[0] if bits.shape[0] else NULL
+    cdef Py_ssize_t nbytes = bits.shape[0]
+    cdef Py_ssize_t n = offsets.shape[0] - 1
+    dpcm = np.empty(n, dtype=np.int32)
+    cdef int[::1] dpcm_view = dpcm
+    cdef Py_ssize_t i = 0, pos
+    cdef int size, failed = 0
+    with nogil:
+        for i in range(n):
+            pos = offset_view[i]
+            size = _packed_symbol(&table, data, nbytes, &pos)
+            if size < 0 or size > 16:
+                failed = 1
+                break
+            dpcm_view[i] = _packed_value(data, nbytes, &pos, size)
+            if pos > offset_view[i + 1]:
+                failed = 1
                 break
-        encoded_ac_cr.append(huffman_bitstream[start_pos:pos])
-
-    return encoded_dc_y, encoded_dc_cb, encoded_dc_cr, encoded_ac_y, encoded_ac_cb, encoded_ac_cr
-
-
-def huffman_decode_dc(
-    encoded_dc_list: List[BitArray],
-    huffman_table: Dict[int, str]
-) -> List[int]:
-    """Huffman decode a list of DC coefficients."""
-    dpcm_values = []
-    for encoded_dc in encoded_dc_list:
-        dc_value, _ = decode_dc_value(encoded_dc, huffman_table, 0)
-        dpcm_values.append(dc_value)
-    return dpcm_values
-
-
-def huffman_decode_ac(
-    encoded_ac_list: List,
-    huffman_table: Dict[int, str]
-) -> List[List[Tuple[int, int]]]:
-    """Huffman decode a list of AC coefficients."""
-    rle_list = []
-    for encoded_ac in encoded_ac_list:
-        if isinstance(encoded_ac, list):
-            concatenated = BitArray()
-            for bit_array in encoded_ac:
-                concatenated += bit_array
-            encoded_ac = concatenated
-
-        ac_tuples = []
-        pos = 0
-        while pos < len(encoded_ac):
-            ac_tuple, pos = decode_ac_tuple(encoded_ac, huffman_table, pos)
-            ac_tuples.append(ac_tuple)
-            if ac_tuple == (0, 0):
+    if failed:
+        raise ValueError(f"Could not decode DC value of block {i}")
+    return dpcm
+
+
+def huffman_decode_ac(encoded_ac, dict huffman_table):
+    """
+    Huffman decode a packed AC stage.
+
+    Returns:
+        Packed RLE (pairs, offsets) as rle_encode_packed produces
+    """
+    cdef HuffLookup table
+    _build_table(&table, huffman_table)
+    bits, offsets = _packed(encoded_ac)
+    cdef const unsigned char[::1] bit_view = bits
+    cdef const long long[::1] offset_view = offsets
+    cdef const unsigned char* data = &bit_view[0] if bits.shape[0] else NULL
+    cdef Py_ssize_t nbytes = bits.shape[0]
+    cdef Py_ssize_t n = offsets.shape[0] - 1
+    # At most 63 coefficients and an EOB per block
+    pairs = np.empty((n * 64, 2), dtype=np.int16)
+    rle_offsets = np.empty(n + 1, dtype=np.intp)
+    cdef short[:, ::1] pair_view = pairs
+    cdef Py_ssize_t[::1] rle_view = rle_offsets
+    cdef Py_ssize_t i = 0, p = 0, pos, stop
+    cdef int symbol, run, size, failed = 0
+    with nogil:
+        for i in range(n):
+            rle_view[i] = p
+            pos = offset_view[i]
+            stop = offset_view[i + 1]
+            while pos < stop:
+                symbol = _packed_symbol(&table, data, nbytes, &pos)
+                run = symbol >> 4
+                size = symbol & 15
+                if symbol < 0 or (size == 0 and run != 0 and run != 15) or p - rle_view[i] == 64:
+                    failed = 1
+                    break
+                pair_view[p, 0] = run
+                pair_view[p, 1] = _packed_value(data, nbytes, &pos, size)
+                p += 1
+                if symbol == 0:
+                    break
+            if failed or pos > stop:
+                failed = 1
                 break
-        rle_list.append(ac_tuples)
-    return rle_list
+        rle_view[n] = p
+    if failed:
+        raise ValueError(f"Could not decode AC coefficients of block {i}")
+    return pairs[:p].copy(), rle_offsets
@@ -4,14 +4,45 @@ Copyright (c) 2026 Huy Hiep Nguyen
 """
 
 import numpy as np
-from scipy.fft import idct
 
+from util.dct_basis import SCALED_IDCT_SIZES, dct_matrices
 
-def IDCT(dct_MCUs: np.ndarray) -> np.ndarray:
-    """Apply Inverse Discrete Cosine Transform to MCUs."""
-    idct_MCUs = np.zeros_like(dct_MCUs)
-    for i, MCU in enumerate(dct_MCUs):
-        for j, component in enumerate(MCU):
-            idct_MCUs[i, j] = idct(idct(component, axis=0, norm='ortho'),
-                                   axis=1, norm='ortho')
-    return idct_MCUs
+
+def IDCT(dct_MCUs: np.ndarray, float_dtype=None) -> np.ndarray:
+    """Apply Inverse Discrete Cosine Transform to MCUs.
+
+    Works on any (..., 8, 8) array in float_dtype (default: the input dtype if it
+    is floating point, else float64).
+    """
+    if float_dtype is None:
+        float_dtype = dct_MCUs.dtype if np.issubdtype(dct_MCUs.dtype, np.floating) else np.float64
+    return idct_blocks(dct_MCUs.astype(float_dtype, copy=False))
+
+
+def idct_blocks(dct_blocks: np.ndarray, out: np.ndarray = None, work: np.ndarray = None) -> np.ndarray:
+    """Inverse DCT of (..., 8, 8) float blocks as C^T @ X @ C; out and work may be preallocated (out may be a strided view)."""
+    matrix, matrix_t = dct_matrices(dct_blocks.dtype)
+    work = np.matmul(matrix_t, dct_blocks, out=work)
+    return np.matmul(work, matrix, out=out)
+
+
+def idct_scaled(dct_blocks: np.ndarray, size: int, width: int = None) -> np.ndarray:
+    """
+    Inverse DCT of (..., 8, 8) blocks straight to size x size pixels (size in 1, 2, 4, 8).
+
+    Only the low-frequency size x size coefficients are used, which gives a
+    1/8, 1/4 or 1/2 scale image at a fraction of the cost of a full IDCT.
+    width gives the blocks a different horizontal size (size rows x width columns),
+    as subsampled chroma needs in 4:2:2.
+    """
+    width = size if width is None else width
+    for n in (size, width):
+        if n not in SCALED_IDCT_SIZES:
+            raise ValueError(f"Unsupported scaled IDCT size {n}, expected one of {SCALED_IDCT_SIZES}")
+    if size == width == 8:
+        return idct_blocks(dct_blocks)
+    # An orthonormal n-point basis sees the 8-point coefficients scaled by sqrt(n / 8) per axis
+    _, rows_t = dct_matrices(dct_blocks.dtype, size)
+    columns, _ = dct_matrices(dct_blocks.dtype, width)
+    low = dct_blocks[..., :size, :width] * dct_blocks.dtype.type(np.sqrt(size * width) / 8)
+    return np.matmul(np.matmul(rows_t, low), columns)
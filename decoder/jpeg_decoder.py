@@ -0,0 +1,152 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from typing import Optional
+import numpy as np
+
+from util.dct_basis import SCALED_IDCT_SIZES, resolve_float_dtype
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from .huffman_decode import ScanDecoderCy
+from .idct import idct_blocks
+from .jpeg_parser import _DEZIGZAG_INDEX, JpegHeader, parse_jpeg_header
+from .jpeg_source import JpegSource, open_jpeg_source
+from .probe import DecodeLimits, check_limits
+from .progressive import decode_progressive_coefficients, render_coefficients
+from .scan_decode import check_frame, chroma_ratios, component_size, mcu_grid, scan_sampling, scan_table_specs
+from .upsample import idct_planes_to_rgb, is_fancy
+
+
+class Decoder:
+    """
+    Reusable JPEG decoder for repeated decoding of same-sized images.
+
+    The scan decoder (bit reader and Huffman lookup tables), the coefficient arrays,
+    the IDCT workspace and the component planes are kept between calls and only
+    reallocated when the image geometry or the Huffman tables change. Subsampled
+    chroma is upsampled ("fancy" or "nearest") inside the colour conversion kernel. Together
+    with out= this makes steady-state decoding of same-sized frames allocation-free.
+    All floating-point workspaces use float_dtype (float32 by default).
+    With instrumentation (or inside collect_stats()) every decode is recorded
+    as a "decode" PipelineStats.
+
+    Example:
+        decoder = Decoder()
+        frame = None
+        for jpeg in frames:
+            frame = decoder.decode(jpeg, out=frame)
+    """
+
+    def __init__(self, limits: Optional[DecodeLimits] = None, float_dtype=np.float32,
+                 upsampling: str = "fancy", instrumentation: Optional[Instrumentation] = None):
+        self.limits = limits
+        self.instrumentation = instrumentation
+        self.float_dtype = resolve_float_dtype(float_dtype, debug=False)
+        self.fancy = is_fancy(upsampling)
+        self._scan_decoder: Optional[ScanDecoderCy] = None
+        self._scan_key = None
+        self._layout = None
+        self._coefficients = None   # per component: (num_blocks, 64) int16, zigzag order
+        self._natural = None        # per component: (num_blocks, 64) int16, natural order
+        self._dequantized = None    # per component: (num_blocks, 64) float_dtype
+        self._work = None           # per component: (num_blocks, 8, 8) float_dtype IDCT workspace
+        self._planes = None         # per component: (padded_height, padded_width) float_dtype
+
+    def _prepare_scan_decoder(self, data, header: JpegHeader) -> None:
+        """Reuse or (re)create the baseline scan decoder for this header."""
+        dc_specs, ac_specs = scan_table_specs(header)
+        mcus_x, mcus_y = mcu_grid(header)
+        sampling = scan_sampling(header)
+
+        scan_key = (mcus_x, mcus_y, tuple(sampling), tuple(dc_specs), tuple(ac_specs))
+        if scan_key == self._scan_key:
+            self._scan_decoder.reset(data, header.scan_offset, header.restart_interval)
+        else:
+            self._scan_decoder = ScanDecoderCy(data, header.scan_offset, dc_specs, ac_specs,
+                                               mcus_x, mcus_y, header.restart_interval, sampling)
+            self._scan_key = scan_key
+
+    def _prepare_buffers(self, header: JpegHeader) -> None:
+        """Reuse or (re)allocate the per-component scratch buffers for this frame."""
+        check_frame(header)
+        mcus_x, mcus_y = mcu_grid(header)
+        sampling = [(component.h, component.v) for component in header.components]
+        layout = (mcus_x, mcus_y, tuple(sampling))
+        if self._layout != layout:
+            block_grids = [(mcus_x * h, mcus_y * v) for h, v in sampling]
+            self._coefficients = [np.empty((bx * by, 64), dtype=np.int16) for bx, by in block_grids]
+            self._natural = [np.empty((bx * by, 64), dtype=np.int16) for bx, by in block_grids]
+            self._dequantized = [np.empty((bx * by, 64), dtype=self.float_dtype) for bx, by in block_grids]
+            self._work = [np.empty((bx * by, 8, 8), dtype=self.float_dtype) for bx, by in block_grids]
+            self._planes = [np.empty((by * 8, bx * 8), dtype=self.float_dtype) for bx, by in block_grids]
+            self._layout = layout
+
+    def decode(self, source: JpegSource, out: Optional[np.ndarray] = None, size: int = 8) -> np.ndarray:
+        """
+        Decode a JPEG to an RGB uint8 image of shape (height, width, 3).
+
+        If out is given it must be a C-contiguous uint8 array of that shape and is filled in place.
+        size 4, 2 or 1 decodes at 1/2, 1/4 or 1/8 scale with the scaled IDCT instead
+        (shape ceil(height * size / 8) x ceil(width * size / 8)).
+        """
+        if size not in SCALED_IDCT_SIZES:
+            raise ValueError(f"Unsupported scaled IDCT size {size}, expected one of {SCALED_IDCT_SIZES}")
+        data = open_jpeg_source(source)
+        instrumentation = active_instrumentation(self.instrumentation)
+        with measure_pipeline(instrumentation, "decode") as stats:
+            with measure_stage(instrumentation, "parse_header"):
+                header = parse_jpeg_header(data)
+                check_limits(header, len(data), self.limits)
+            stats.set_pixels(header.width * header.height)
+
+            shape = ((header.height * size + 7) // 8, (header.width * size + 7) // 8, 3)
+            if out is None:
+                out = np.empty(shape, dtype=np.uint8)
+            elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+                raise ValueError(f"out must be a C-contiguous uint8 array of shape {shape}")
+
+            with measure_stage(instrumentation, "entropy_decode") as record:
+                self._prepare_buffers(header)
+                if header.progressive:
+                    decode_progressive_coefficients(data, header, coefficients=self._coefficients)
+                else:
+                    self._prepare_scan_decoder(data, header)
+                    self._scan_decoder.decode_rows(self._coefficients, self._layout[1])
+                record.set_output(self._coefficients)
+
+            if size < 8:
+                with measure_stage(instrumentation, "idct_scaled") as record:
+                    render_coefficients(header, self._coefficients, size, "fancy" if self.fancy else "nearest",
+                                        self.float_dtype, out)
+                    record.set_output(out)
+                return out
+
+            with measure_stage(instrumentation, "idct") as record:
+                self._inverse_transform(header)
+                record.set_output(self._planes)
+
+            # Colour conversion with chroma upsampling fused in, the chroma planes stay subsampled
+            with measure_stage(instrumentation, "color_reconstruct") as record:
+                h_ratio, v_ratio = chroma_ratios(header)
+                chroma_width, chroma_height = component_size(header, header.components[1])
+                idct_planes_to_rgb(self._planes[0], self._planes[1], self._planes[2], out, h_ratio, v_ratio,
+                                   self.fancy, chroma_height=chroma_height, chroma_width=chroma_width)
+                record.set_output(out)
+        return out
+
+    def _inverse_transform(self, header: JpegHeader) -> None:
+        """Dezigzag, dequantize and inverse DCT straight into the padded component planes."""
+        for index, component in enumerate(header.components):
+            quant_table = header.quant_tables.get(component.quant_table_id)
+            if quant_table is None:
+                raise ValueError(f"Missing quantization table {component.quant_table_id}")
+            natural = self._natural[index]
+            dequantized = self._dequantized[index]
+            plane = self._planes[index]
+            blocks_y = plane.shape[0] // 8
+            blocks_x = plane.shape[1] // 8
+            np.take(self._coefficients[index], _DEZIGZAG_INDEX, axis=1, out=natural, mode="clip")
+            np.multiply(natural, quant_table.reshape(1, 64), out=dequantized)
+            block_view = plane.reshape(blocks_y, 8, blocks_x, 8).transpose(0, 2, 1, 3)
+            idct_blocks(dequantized.reshape(blocks_y, blocks_x, 8, 8),
+                        out=block_view, work=self._work[index].reshape(blocks_y, blocks_x, 8, 8))
@@ -2,85 +2,241 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
-from typing import Tuple
-from bitstring import BitArray
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Tuple
 import numpy as np
 
 from util import logger
 from decoder.dezigzag import dezigzag
 
+if TYPE_CHECKING:
+    from bitstring import BitArray
 
-def remove_FF00_stuffing(image_bytes: bytes) -> bytearray:
-    """Remove byte stuffing (0x00 after 0xFF) from image data."""
-    result = bytearray()
-    i = 0
-    while i < len(image_bytes):
-        result.append(image_bytes[i])
-        if image_bytes[i] == 0xFF and i + 1 < len(image_bytes) and image_bytes[i + 1] == 0x00:
-            i += 2
+# Start-of-frame markers this decoder understands (baseline, extended, progressive)
+SOF_BASELINE = (0xC0, 0xC1)
+SOF_PROGRESSIVE = 0xC2
+# Markers that stand alone without a length field
+STANDALONE_MARKERS = (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8)
+# Gather index from zigzag to natural order, so DQT parsing needs a single fancy-index
+_DEZIGZAG_INDEX = dezigzag(np.arange(64).reshape(1, 64)).ravel()
+
+
+@dataclass
+class FrameComponent:
+    """Component entry of a SOF segment."""
+    component_id: int
+    h: int
+    v: int
+    quant_table_id: int
+
+
+@dataclass
+class ScanComponent:
+    """Component entry of a SOS segment."""
+    component_id: int
+    dc_table_id: int
+    ac_table_id: int
+
+
+@dataclass
+class JpegHeader:
+    """
+    Everything the decoder needs from the segments in front of the first scan.
+
+    Attributes:
+        width, height: Image size in pixels
+        components: Frame components in SOF order
+        quant_tables: Quantization tables (8x8, natural order) by table id
+        huffman_tables: (counts, symbols) by (table class, table id), class 0 = DC, 1 = AC
+        restart_interval: MCUs between RST markers (0 = no restarts)
+        progressive: True for SOF2 files
+        scan_components: Components of the current (first) scan
+        scan_offset: Byte offset of the first entropy-coded byte of the current scan
+        spectral_start, spectral_end: Zigzag coefficient range (Ss, Se) of the current scan
+        approx_high, approx_low: Successive approximation bit positions (Ah, Al) of the current scan
+    """
+    width: int = 0
+    height: int = 0
+    components: List[FrameComponent] = field(default_factory=list)
+    quant_tables: Dict[int, np.ndarray] = field(default_factory=dict)
+    huffman_tables: Dict[Tuple[int, int], Tuple[bytes, bytes]] = field(default_factory=dict)
+    restart_interval: int = 0
+    progressive: bool = False
+    scan_components: List[ScanComponent] = field(default_factory=list)
+    scan_offset: int = 0
+    spectral_start: int = 0
+    spectral_end: int = 63
+    approx_high: int = 0
+    approx_low: int = 0
+
+
+def _read_u16(data, pos: int) -> int:
+    return (data[pos] << 8) | data[pos + 1]
+
+
+def _parse_dqt(data, pos: int, end: int, header: JpegHeader) -> None:
+    while pos < end:
+        precision = data[pos] >> 4
+        table_id = data[pos] & 0x0F
+        pos += 1
+        if precision:
+            table_array = np.frombuffer(data[pos:pos + 128], dtype=">u2").astype(np.int32)
+            pos += 128
         else:
-            i += 1
-    return result
+            table_array = np.frombuffer(data[pos:pos + 64], dtype=np.uint8).astype(np.int32)
+            pos += 64
+        header.quant_tables[table_id] = table_array[_DEZIGZAG_INDEX].reshape(1, 8, 8)
 
 
-def parse_jpeg_bitstream(
-    jpeg_bitstream: bytes
-) -> Tuple[BitArray, np.ndarray, np.ndarray]:
-    """Parse JPEG bitstream to extract Huffman data and quantization tables."""
-    pos = 0
-    quant_lum = None
-    quant_chrom = None
-    image_data = None
+def _parse_dht(data, pos: int, end: int, header: JpegHeader) -> None:
+    while pos < end:
+        table_class = data[pos] >> 4
+        table_id = data[pos] & 0x0F
+        counts = bytes(data[pos + 1:pos + 17])
+        num_symbols = sum(counts)
+        symbols = bytes(data[pos + 17:pos + 17 + num_symbols])
+        header.huffman_tables[(table_class, table_id)] = (counts, symbols)
+        pos += 17 + num_symbols
+
+
+def _parse_sof(data, pos: int, end: int, header: JpegHeader) -> None:
+    if header.components:
+        raise ValueError("Invalid JPEG: more than one SOF segment")
+    if end - pos < 6:
+        raise ValueError("Invalid JPEG: truncated SOF segment")
+    if data[pos] != 8:
+        raise ValueError(f"Unsupported sample precision: {data[pos]} bits")
+    header.height = _read_u16(data, pos + 1)
+    header.width = _read_u16(data, pos + 3)
+    num_components = data[pos + 5]
+    if end - pos != 6 + 3 * num_components:
+        raise ValueError(f"Invalid JPEG: SOF length {end - pos + 2} does not match {num_components} components")
+    if header.width == 0 or header.height == 0:
+        # A zero height would be defined by a DNL segment, which is not supported
+        raise ValueError(f"Invalid image size {header.width}x{header.height}")
+    if num_components == 0:
+        raise ValueError("Invalid JPEG: SOF without components")
+    pos += 6
+    for _ in range(num_components):
+        header.components.append(FrameComponent(
+            component_id=data[pos],
+            h=data[pos + 1] >> 4,
+            v=data[pos + 1] & 0x0F,
+            quant_table_id=data[pos + 2],
+        ))
+        pos += 3
 
-    if jpeg_bitstream[pos:pos + 2] != bytes.fromhex("FF D8"):
+
+def _parse_sos(data, pos: int, end: int, header: JpegHeader) -> None:
+    num_components = data[pos] if pos < end else 0
+    if end - pos != 4 + 2 * num_components or num_components == 0:
+        raise ValueError(f"Invalid JPEG: SOS length {end - pos + 2} does not match {num_components} components")
+    pos += 1
+    header.scan_components = []
+    for _ in range(num_components):
+        header.scan_components.append(ScanComponent(
+            component_id=data[pos],
+            dc_table_id=data[pos + 1] >> 4,
+            ac_table_id=data[pos + 1] & 0x0F,
+        ))
+        pos += 2
+    header.spectral_start = data[pos]
+    header.spectral_end = data[pos + 1]
+    header.approx_high = data[pos + 2] >> 4
+    header.approx_low = data[pos + 2] & 0x0F
+
+
+def parse_jpeg_header(data) -> JpegHeader:
+    """Walk the JPEG segments by offset up to the first SOS, without copying the payload."""
+    header = JpegHeader()
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
         raise ValueError("Invalid JPEG: Missing SOI marker")
-    pos += 2
+    if not parse_next_scan(data, 2, header):
+        raise ValueError("No image data found in JPEG")
+    return header
 
-    while pos < len(jpeg_bitstream) - 2:
-        if jpeg_bitstream[pos] != 0xFF:
-            raise ValueError(f"Expected marker at position {pos}")
 
-        marker = jpeg_bitstream[pos + 1]
+def parse_next_scan(data, pos: int, header: JpegHeader, allow_truncated: bool = False) -> bool:
+    """
+    Parse the segments from pos up to the next SOS into header.
+
+    Tables and the restart interval are updated in place and the scan fields
+    describe the new scan. Returns False at EOI or the end of data, and also for
+    a truncated segment if allow_truncated is set (partially received files).
+    """
+    size = len(data)
+
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            raise ValueError(f"Expected marker at position {pos}")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte in front of a marker
+            pos += 1
+            continue
         pos += 2
 
+        if marker in STANDALONE_MARKERS:
+            continue
         if marker == 0xD9:
-            break
+            return False
 
-        if marker == 0xDA:
-            length = int.from_bytes(jpeg_bitstream[pos:pos + 2], 'big')
-            pos += length
-            eoi_pos = jpeg_bitstream.find(bytes.fromhex("FF D9"), pos)
-            if eoi_pos == -1:
-                raise ValueError("No EOI marker found")
-            image_data = jpeg_bitstream[pos:eoi_pos]
-            break
+        length = _read_u16(data, pos)
+        segment_start = pos + 2
+        segment_end = pos + length
+        if length < 2 or segment_end > size:
+            if allow_truncated:
+                return False
+            raise ValueError(f"Truncated segment 0x{marker:02X} at position {pos - 2}")
 
         if marker == 0xDB:
-            length = int.from_bytes(jpeg_bitstream[pos:pos + 2], 'big')
-            pos += 2
-            table_info = jpeg_bitstream[pos]
-            table_id = table_info & 0x0F
-            pos += 1
-            table_data = jpeg_bitstream[pos:pos + 64]
-            pos += 64
-            table_array = np.frombuffer(table_data, dtype=np.uint8).astype(np.int32)
-            table_8x8 = dezigzag(np.expand_dims(table_array, axis=0))
-            if table_id == 0:
-                quant_lum = table_8x8
-            elif table_id == 1:
-                quant_chrom = table_8x8
-            continue
+            _parse_dqt(data, segment_start, segment_end, header)
+        elif marker == 0xC4:
+            _parse_dht(data, segment_start, segment_end, header)
+        elif marker in SOF_BASELINE or marker == SOF_PROGRESSIVE:
+            _parse_sof(data, segment_start, segment_end, header)
+            header.progressive = marker == SOF_PROGRESSIVE
+        elif 0xC3 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            raise ValueError(f"Unsupported JPEG process (SOF marker 0x{marker:02X})")
+        elif marker == 0xDD:
+            header.restart_interval = _read_u16(data, segment_start)
+        elif marker == 0xDA:
+            if not header.components:
+                raise ValueError("Invalid JPEG: SOS before SOF")
+            _parse_sos(data, segment_start, segment_end, header)
+            header.scan_offset = segment_end
+            return True
 
-        if marker not in [0xD8, 0xD9, 0x01]:
-            length = int.from_bytes(jpeg_bitstream[pos:pos + 2], 'big')
-            pos += length
+        pos = segment_end
 
-    if image_data is None:
-        raise ValueError("No image data found in JPEG")
+    return False
+
+
+def remove_FF00_stuffing(image_bytes: bytes) -> bytes:
+    """Remove byte stuffing (0x00 after 0xFF) from image data."""
+    return bytes(image_bytes).replace(b"\xff\x00", b"\xff")
+
+
+def parse_jpeg_bitstream(
+    jpeg_bitstream: bytes
+) -> Tuple["BitArray", np.ndarray, np.ndarray]:
+    """Parse JPEG bitstream to extract Huffman data and quantization tables."""
+    from bitstring import BitArray  # only needed by the staged (debug) decoder
+
+    data = memoryview(jpeg_bitstream)
+    header = parse_jpeg_header(data)
+
+    quant_lum = header.quant_tables.get(0)
+    quant_chrom = header.quant_tables.get(1)
     if quant_lum is None or quant_chrom is None:
         raise ValueError("Missing quantization tables")
 
-    image_data_unstuffed = remove_FF00_stuffing(image_data)
-    huffman_bitstream = BitArray(bytes=bytes(image_data_unstuffed))
+    eoi_pos = bytes(data[header.scan_offset:]).find(b"\xff\xd9")
+    if eoi_pos == -1:
+        raise ValueError("No EOI marker found")
+    image_data = data[header.scan_offset:header.scan_offset + eoi_pos]
+    logger.debug(f"Scan data: {len(image_data)} bytes at offset {header.scan_offset}")
+
+    huffman_bitstream = BitArray(bytes=remove_FF00_stuffing(image_data))
 
     return huffman_bitstream, quant_lum, quant_chrom
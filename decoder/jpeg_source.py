@@ -0,0 +1,23 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+import mmap
+import os
+from typing import Union
+
+JpegSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap]
+
+
+def open_jpeg_source(source: JpegSource) -> memoryview:
+    """Return a zero-copy byte view of a JPEG given as path, mmap or buffer."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as jpeg_file:
+            # The mapping stays valid after the file is closed and lives as long as the view
+            mapped = mmap.mmap(jpeg_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped)
+
+    view = memoryview(source)
+    if view.ndim != 1 or view.itemsize != 1:
+        view = view.cast("B")
+    return view
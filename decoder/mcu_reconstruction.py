@@ -5,32 +5,54 @@ Copyright (c) 2026 Huy Hiep Nguyen
 
 import numpy as np
 from util import logger
+from .upsample import upsample_into
+
+
+def blocks_to_plane(blocks: np.ndarray, blocks_x: int) -> np.ndarray:
+    """Arrange (num_blocks, n, m) blocks in raster order into a padded (rows * n, blocks_x * m) plane."""
+    blocks_y = len(blocks) // blocks_x
+    n, m = blocks.shape[-2:]
+    # (rows, cols, n, m) -> (rows, n, cols, m) is the raster layout of the padded plane
+    return blocks.reshape(blocks_y, blocks_x, n, m).transpose(0, 2, 1, 3).reshape(blocks_y * n, blocks_x * m)
 
 
 def mcus_to_ycbcr_array(mcus_y: np.ndarray, mcus_cb: np.ndarray, mcus_cr: np.ndarray,
                         img_width: int, img_height: int) -> np.ndarray:
-    """Convert MCU arrays back to YCbCr image array."""
-    padded_height = ((img_height + 7) // 8) * 8
-    padded_width = ((img_width + 7) // 8) * 8
-
-    Y_channel = np.zeros((padded_height, padded_width))
-    Cb_channel = np.zeros((padded_height, padded_width))
-    Cr_channel = np.zeros((padded_height, padded_width))
-
-    mcu_index = 0
-    for row in range(0, padded_height, 8):
-        for col in range(0, padded_width, 8):
-            if mcu_index < len(mcus_y):
-                Y_channel[row:row + 8, col:col + 8] = mcus_y[mcu_index]
-                Cb_channel[row:row + 8, col:col + 8] = mcus_cb[mcu_index]
-                Cr_channel[row:row + 8, col:col + 8] = mcus_cr[mcu_index]
-                mcu_index += 1
-
-    Y_channel = Y_channel[:img_height, :img_width]
-    Cb_channel = Cb_channel[:img_height, :img_width]
-    Cr_channel = Cr_channel[:img_height, :img_width]
-
-    return np.stack([Y_channel, Cb_channel, Cr_channel], axis=-1)
+    """Convert MCU arrays back to YCbCr image array (in the dtype of the MCUs if floating point)."""
+    mcu_rows = (img_height + 7) // 8
+    mcu_cols = (img_width + 7) // 8
+    if len(mcus_y) != mcu_rows * mcu_cols:
+        raise ValueError(f"Expected {mcu_rows * mcu_cols} MCUs for a {img_width}x{img_height} image, "
+                         f"got {len(mcus_y)}")
+
+    dtype = mcus_y.dtype if np.issubdtype(mcus_y.dtype, np.floating) else np.float64
+    ycbcr_array = np.empty((img_height, img_width, 3), dtype=dtype)
+    for channel, mcus in enumerate((mcus_y, mcus_cb, mcus_cr)):
+        ycbcr_array[:, :, channel] = blocks_to_plane(mcus, mcu_cols)[:img_height, :img_width]
+
+    return ycbcr_array
+
+
+def planes_to_ycbcr_array(planes, img_width: int, img_height: int, ratios=(1, 1), fancy: bool = True,
+                          row_offset: int = 0, chroma_row_start: int = 0,
+                          chroma_size=None) -> np.ndarray:
+    """
+    Assemble a YCbCr image from level-shifted component planes.
+
+    The luma plane is at full resolution, the chroma planes are subsampled by
+    ratios = (horizontal, vertical) and upsampled straight into the output
+    channels. row_offset, chroma_row_start and chroma_size = (width, height) of
+    the chroma component place a band or window of planes in the image (see
+    upsample.upsample_into); by default the planes are the whole image.
+    """
+    y_plane, cb_plane, cr_plane = planes
+    chroma_width, chroma_height = chroma_size or (-1, -1)
+    ycbcr_array = np.empty((img_height, img_width, 3), dtype=y_plane.dtype)
+    ycbcr_array[:, :, 0] = y_plane[:img_height, :img_width]
+    for channel, plane in ((1, cb_plane), (2, cr_plane)):
+        upsample_into(plane, ycbcr_array[:, :, channel], ratios[0], ratios[1], fancy,
+                      row_offset, chroma_row_start, chroma_height, chroma_width)
+    return ycbcr_array
 
 
 def detect_errors(mcus_y: np.ndarray, mcus_cb: np.ndarray, mcus_cr: np.ndarray) -> None:
@@ -0,0 +1,118 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .jpeg_parser import JpegHeader, parse_jpeg_header
+from .jpeg_source import JpegSource, open_jpeg_source
+
+# Default decompression-bomb guard: 2^28 pixels (e.g. 16384 x 16384)
+DEFAULT_MAX_PIXELS = 1 << 28
+
+
+class JpegLimitError(ValueError):
+    """Raised when a JPEG exceeds the configured pixel or byte limits."""
+
+
+@dataclass
+class DecodeLimits:
+    """Upper bounds checked against the header before any decode allocation (None = unlimited)."""
+    max_pixels: Optional[int] = DEFAULT_MAX_PIXELS
+    max_bytes: Optional[int] = None
+
+
+# Limits used by decode_* when no limits are passed explicitly
+default_limits = DecodeLimits()
+
+
+@dataclass
+class JpegInfo:
+    """
+    Result of probe().
+
+    Attributes:
+        width, height: Image size in pixels
+        num_components: Number of frame components
+        sampling_factors: (h, v) per component in SOF order
+        progressive: True for progressive (SOF2) files, False for baseline
+        restart_interval: MCUs between RST markers (0 = none)
+        quant_fingerprint: Digest of all DQT tables (equal tables -> equal fingerprint)
+        huffman_fingerprint: Digest of all DHT tables
+        file_size: Size of the JPEG in bytes
+    """
+    width: int
+    height: int
+    num_components: int
+    sampling_factors: List[Tuple[int, int]]
+    progressive: bool
+    restart_interval: int
+    quant_fingerprint: str
+    huffman_fingerprint: str
+    file_size: int
+
+
+def check_header(header: JpegHeader) -> None:
+    """Raise ValueError for a frame nothing can be decoded from: no pixels or no components."""
+    if header.width <= 0 or header.height <= 0:
+        raise ValueError(f"Invalid image size {header.width}x{header.height}")
+    if not header.components:
+        raise ValueError("Invalid JPEG: frame without components")
+
+
+def check_limits(header: JpegHeader, file_size: int, limits: Optional[DecodeLimits] = None) -> None:
+    """
+    Raise JpegLimitError if the image described by header exceeds limits (default: default_limits).
+
+    Frames without pixels or components raise ValueError (see check_header) first.
+    """
+    check_header(header)
+    limits = default_limits if limits is None else limits
+    num_pixels = header.width * header.height
+    if limits.max_pixels is not None and num_pixels > limits.max_pixels:
+        raise JpegLimitError(f"Image has {num_pixels} pixels ({header.width}x{header.height}), "
+                             f"limit is {limits.max_pixels}")
+    if limits.max_bytes is not None and file_size > limits.max_bytes:
+        raise JpegLimitError(f"JPEG has {file_size} bytes, limit is {limits.max_bytes}")
+
+
+def _fingerprint(parts) -> str:
+    import hashlib
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def probe(source: JpegSource, limits: Optional[DecodeLimits] = None) -> JpegInfo:
+    """
+    Read a JPEG header up to the first SOS without touching the scan data.
+
+    Malformed frames (zero size, component count not matching the SOF
+    length) raise ValueError. If limits are given, JpegLimitError is raised
+    for images exceeding them.
+    """
+    data = open_jpeg_source(source)
+    header = parse_jpeg_header(data)
+    if limits is not None:
+        check_limits(header, len(data), limits)
+    else:
+        check_header(header)
+
+    quant_parts = [bytes([table_id]) + header.quant_tables[table_id].tobytes()
+                   for table_id in sorted(header.quant_tables)]
+    huffman_parts = [bytes(key) + counts + symbols
+                     for key, (counts, symbols) in sorted(header.huffman_tables.items())]
+
+    return JpegInfo(
+        width=header.width,
+        height=header.height,
+        num_components=len(header.components),
+        sampling_factors=[(component.h, component.v) for component in header.components],
+        progressive=header.progressive,
+        restart_interval=header.restart_interval,
+        quant_fingerprint=_fingerprint(quant_parts),
+        huffman_fingerprint=_fingerprint(huffman_parts),
+        file_size=len(data),
+    )
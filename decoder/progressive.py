@@ -0,0 +1,211 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+from util import logger
+from util.dct_basis import SCALED_IDCT_SIZES
+from .huffman_decode import ProgressiveScanDecoderCy, find_scan_end
+from .idct import idct_blocks, idct_scaled
+from .jpeg_parser import _DEZIGZAG_INDEX, JpegHeader, parse_next_scan
+from .mcu_reconstruction import blocks_to_plane
+from .scan_decode import check_frame, chroma_ratios, component_size, mcu_grid
+from .upsample import idct_planes_to_rgb, is_fancy
+
+# Natural (row-major) position of each zigzag index
+_ZIGZAG_NATURAL = np.argsort(_DEZIGZAG_INDEX)
+
+
+def covering_idct_size(last_index: int) -> int:
+    """Smallest scaled IDCT size whose top-left square holds zigzag coefficients 0..last_index."""
+    natural = _ZIGZAG_NATURAL[:max(last_index, 0) + 1]
+    extent = int(np.maximum(natural // 8, natural % 8).max()) + 1
+    return next(size for size in SCALED_IDCT_SIZES if size >= extent)
+
+
+def render_coefficients(header: JpegHeader, coefficients: List[np.ndarray], size: int = 8,
+                        upsampling: str = "fancy", float_dtype=np.float32,
+                        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Render zigzag int16 coefficients (one padded block grid per component) to RGB uint8.
+
+    size selects the scaled IDCT: 8 gives the full image, 4, 2 and 1 give
+    1/2, 1/4 and 1/8 scale images of ceil(width * size / 8) x ceil(height * size / 8).
+    out may be a C-contiguous uint8 array of that shape to render into.
+    """
+    fancy = is_fancy(upsampling)
+    mcus_x, _ = mcu_grid(header)
+    h_ratio, v_ratio = chroma_ratios(header)
+    # Subsampled chroma is inverse transformed at up to h_ratio x v_ratio times the luma scale, as
+    # libjpeg does, so small scales keep its detail; only what remains is left to the upsampling
+    chroma_width_size = min(8, size * h_ratio)
+    chroma_height_size = min(8, size * v_ratio)
+    planes = []
+    for index, (component, zigzag_blocks) in enumerate(zip(header.components, coefficients)):
+        quant_table = header.quant_tables.get(component.quant_table_id)
+        if quant_table is None:
+            raise ValueError(f"Missing quantization table {component.quant_table_id}")
+        rows, columns = (size, size) if index == 0 else (chroma_height_size, chroma_width_size)
+        if rows < 8 or columns < 8:
+            # Only the top-left rows x columns coefficients reach the scaled IDCT
+            natural = _DEZIGZAG_INDEX.reshape(8, 8)[:rows, :columns]
+            dct_blocks = np.multiply(zigzag_blocks[:, natural], quant_table.reshape(8, 8)[:rows, :columns],
+                                     dtype=float_dtype)
+            planes.append(blocks_to_plane(idct_scaled(dct_blocks, rows, columns), mcus_x * component.h))
+        else:
+            # Full size: inverse transform straight into the padded plane, as Decoder does
+            natural = np.take(zigzag_blocks, _DEZIGZAG_INDEX, axis=1)
+            dct_blocks = np.multiply(natural, quant_table.reshape(1, 64), dtype=float_dtype)
+            blocks_x = mcus_x * component.h
+            blocks_y = len(zigzag_blocks) // blocks_x
+            plane = np.empty((blocks_y * 8, blocks_x * 8), dtype=float_dtype)
+            idct_blocks(dct_blocks.reshape(blocks_y, blocks_x, 8, 8),
+                        out=plane.reshape(blocks_y, 8, blocks_x, 8).transpose(0, 2, 1, 3))
+            planes.append(plane)
+
+    chroma_width, chroma_height = component_size(header, header.components[1])
+    shape = ((header.height * size + 7) // 8, (header.width * size + 7) // 8, 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous uint8 array of shape {shape}")
+    idct_planes_to_rgb(planes[0], planes[1], planes[2], out,
+                       size * h_ratio // chroma_width_size, size * v_ratio // chroma_height_size, fancy,
+                       chroma_height=(chroma_height * chroma_height_size + 7) // 8,
+                       chroma_width=(chroma_width * chroma_width_size + 7) // 8)
+    return out
+
+
+@dataclass
+class ScanProgress:
+    """
+    State of a progressive decode after a completed scan, passed to the on_scan callback.
+
+    Attributes:
+        scan_index: Number of completed scans minus one
+        component_ids: Components coded in the scan
+        spectral_start, spectral_end: Zigzag coefficient range of the scan
+        approx_high, approx_low: Successive approximation bit positions of the scan
+        header: Frame header, advanced by later scans (render during the callback)
+        coefficients: Persistent coefficient buffers, updated in place by later scans
+        spectral_extent: Highest zigzag index received so far per component (-1 = none)
+    """
+    scan_index: int
+    component_ids: List[int]
+    spectral_start: int
+    spectral_end: int
+    approx_high: int
+    approx_low: int
+    header: JpegHeader
+    coefficients: List[np.ndarray]
+    spectral_extent: List[int]
+
+    @property
+    def preview_size(self) -> int:
+        """Scaled IDCT size that uses every luma coefficient received so far (1 after DC-only scans)."""
+        return covering_idct_size(self.spectral_extent[0])
+
+    def render(self, size: Optional[int] = None, upsampling: str = "fancy",
+               float_dtype=np.float32) -> np.ndarray:
+        """Render the coefficients received so far to RGB uint8 (default size: preview_size)."""
+        return render_coefficients(self.header, self.coefficients, size or self.preview_size,
+                                   upsampling, float_dtype)
+
+
+def _decode_progressive_scan(data, header: JpegHeader, coefficients: List[np.ndarray],
+                             index_of: Dict[int, int]) -> List[int]:
+    """Decode the current scan of header into coefficients and return the component indices it covered."""
+    try:
+        indices = [index_of[scan_component.component_id] for scan_component in header.scan_components]
+    except KeyError as e:
+        raise ValueError(f"Scan references unknown component {e.args[0]}") from None
+
+    dc_first = header.spectral_start == 0 and header.approx_high == 0
+    ac_scan = header.spectral_start > 0
+    dc_specs = []
+    ac_specs = []
+    try:
+        for scan_component in header.scan_components:
+            dc_specs.append(header.huffman_tables[(0, scan_component.dc_table_id)] if dc_first else None)
+            ac_specs.append(header.huffman_tables[(1, scan_component.ac_table_id)] if ac_scan else None)
+    except KeyError as e:
+        raise ValueError(f"Missing Huffman table {e.args[0]}") from None
+
+    mcus_x, mcus_y = mcu_grid(header)
+    if len(indices) == 1:
+        # Non-interleaved scan: one block per MCU over the component's own (unpadded) block grid
+        width, height = component_size(header, header.components[indices[0]])
+        grid_x, grid_y = (width + 7) // 8, (height + 7) // 8
+        sampling = [(1, 1)]
+    else:
+        grid_x, grid_y = mcus_x, mcus_y
+        sampling = [(header.components[i].h, header.components[i].v) for i in indices]
+
+    scan_decoder = ProgressiveScanDecoderCy(data, header.scan_offset, dc_specs, ac_specs,
+                                            grid_x, grid_y, header.restart_interval, sampling)
+    scan_decoder.decode_scan([coefficients[i] for i in indices],
+                             [mcus_x * header.components[i].h for i in indices],
+                             header.spectral_start, header.spectral_end,
+                             header.approx_high, header.approx_low)
+    return indices
+
+
+def decode_progressive_coefficients(data, header: JpegHeader,
+                                    on_scan: Optional[Callable[[ScanProgress], None]] = None,
+                                    coefficients: Optional[List[np.ndarray]] = None) -> List[np.ndarray]:
+    """
+    Run every scan of a progressive JPEG and return the accumulated coefficients.
+
+    header is the result of parse_jpeg_header() and is advanced scan by scan.
+    The result holds one zigzag int16 (num_blocks, 64) array per component in
+    raster order of its padded block grid, as decode_scan(); preallocated
+    coefficients of that layout are zeroed and reused. on_scan is called after
+    each completed scan. If the data ends inside a scan (file still arriving),
+    decoding stops after the last complete scan.
+    """
+    check_frame(header)
+    mcus_x, mcus_y = mcu_grid(header)
+    num_blocks = [mcus_x * component.h * mcus_y * component.v for component in header.components]
+    if coefficients is None:
+        coefficients = [np.zeros((n, 64), dtype=np.int16) for n in num_blocks]
+    else:
+        for array, n in zip(coefficients, num_blocks):
+            if array.shape != (n, 64) or array.dtype != np.int16:
+                raise ValueError("Preallocated coefficients do not match the frame")
+            array.fill(0)
+
+    index_of = {component.component_id: i for i, component in enumerate(header.components)}
+    spectral_extent = [-1] * len(header.components)
+    scan_index = 0
+    while True:
+        scan_end = find_scan_end(data, header.scan_offset)
+        if scan_end < 0:
+            logger.warning(f"Scan {scan_index} is incomplete, keeping the first {scan_index} scans")
+            break
+
+        indices = _decode_progressive_scan(data, header, coefficients, index_of)
+        if header.approx_high == 0:
+            for i in indices:
+                spectral_extent[i] = max(spectral_extent[i], header.spectral_end)
+        if on_scan is not None:
+            on_scan(ScanProgress(
+                scan_index=scan_index,
+                component_ids=[header.components[i].component_id for i in indices],
+                spectral_start=header.spectral_start,
+                spectral_end=header.spectral_end,
+                approx_high=header.approx_high,
+                approx_low=header.approx_low,
+                header=header,
+                coefficients=coefficients,
+                spectral_extent=list(spectral_extent),
+            ))
+        scan_index += 1
+
+        if not parse_next_scan(data, scan_end, header, allow_truncated=True):
+            break
+
+    logger.info(f"Decoded {scan_index} progressive scans")
+    return coefficients
@@ -10,11 +10,12 @@ def dequantize(quant_y: np.ndarray,
                quant_cb: np.ndarray,
                quant_cr: np.ndarray,
                quantization_table_lum: np.ndarray,
-               quantization_table_chrom: np.ndarray) -> tuple[np.ndarray,
-                                                              np.ndarray,
-                                                              np.ndarray]:
-    """Reverse the quantization process."""
-    dequant_y = quant_y * quantization_table_lum
-    dequant_cb = quant_cb * quantization_table_chrom
-    dequant_cr = quant_cr * quantization_table_chrom
+               quantization_table_chrom: np.ndarray,
+               float_dtype=np.float64) -> tuple[np.ndarray,
+                                                np.ndarray,
+                                                np.ndarray]:
+    """Reverse the quantization process, producing float_dtype DCT coefficients."""
+    dequant_y = np.multiply(quant_y, quantization_table_lum, dtype=float_dtype)
+    dequant_cb = np.multiply(quant_cb, quantization_table_chrom, dtype=float_dtype)
+    dequant_cr = np.multiply(quant_cr, quantization_table_chrom, dtype=float_dtype)
     return dequant_y, dequant_cb, dequant_cr
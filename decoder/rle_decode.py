@@ -2,7 +2,7 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
-from typing import List, Tuple
+from typing import List, Tuple, Union
 import numpy as np
 
 
@@ -19,10 +19,36 @@ def rle_decode(ac_tuples: List[Tuple[int, int]]) -> np.ndarray:
     return np.array(ac[:63])
 
 
-def rle_decode_mcus(rle_data: List[List[Tuple[int, int]]]) -> np.ndarray:
-    """Decode RLE-encoded AC coefficients for multiple MCUs."""
+def rle_decode_mcus(rle_data: Union[List[List[Tuple[int, int]]], Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """Decode RLE-encoded AC coefficients for multiple MCUs (tuple lists or packed (pairs, offsets))."""
+    if isinstance(rle_data, tuple):
+        return rle_decode_packed(*rle_data)
     decoded_acs = []
     for ac_tuples in rle_data:
         decoded_ac = rle_decode(ac_tuples)
         decoded_acs.append(decoded_ac)
     return np.array(decoded_acs)
+
+
+def rle_decode_packed(pairs: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Decode packed RLE (see rle_encode_packed) to AC coefficients of shape (n_mcus, 63).
+
+    Every pair advances the position by run + 1 (a ZRL (15, 0) by 16); nonzero
+    values land at their position within the block, EOB (0, 0) writes nothing.
+    """
+    pairs = np.asarray(pairs)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    num_blocks = len(offsets) - 1
+    ac = np.zeros((num_blocks, 63), dtype=np.int64)
+    if not len(pairs):
+        return ac
+    advance = pairs[:, 0].astype(np.intp) + 1
+    position = np.cumsum(advance)
+    block = np.repeat(np.arange(num_blocks), np.diff(offsets))
+    block_start = np.concatenate(([0], position))[offsets[:-1]]
+    position -= block_start[block] + 1
+    values = pairs[:, 1]
+    nonzero = values != 0
+    ac[block[nonzero], position[nonzero]] = values[nonzero]
+    return ac
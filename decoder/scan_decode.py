@@ -0,0 +1,131 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+
+from .huffman_decode import ScanDecoderCy
+from .jpeg_parser import FrameComponent, JpegHeader
+
+
+def max_sampling(header: JpegHeader) -> Tuple[int, int]:
+    """Return the largest (h, v) sampling factors of the frame, i.e. the MCU size in blocks."""
+    return (max(component.h for component in header.components),
+            max(component.v for component in header.components))
+
+
+def mcu_grid(header: JpegHeader) -> Tuple[int, int]:
+    """Return (mcus_x, mcus_y) of the interleaved scan."""
+    h_max, v_max = max_sampling(header)
+    return (header.width + 8 * h_max - 1) // (8 * h_max), (header.height + 8 * v_max - 1) // (8 * v_max)
+
+
+def component_size(header: JpegHeader, component: FrameComponent) -> Tuple[int, int]:
+    """Return the (width, height) in samples of a possibly subsampled component."""
+    h_max, v_max = max_sampling(header)
+    return ((header.width * component.h + h_max - 1) // h_max,
+            (header.height * component.v + v_max - 1) // v_max)
+
+
+def chroma_ratios(header: JpegHeader) -> Tuple[int, int]:
+    """Return the (horizontal, vertical) chroma subsampling ratio: (1, 1) = 4:4:4, (2, 1) = 4:2:2, (2, 2) = 4:2:0."""
+    luma, cb, cr = header.components
+    h_max, v_max = max_sampling(header)
+    if (luma.h, luma.v) != (h_max, v_max) or (cb.h, cb.v) != (cr.h, cr.v):
+        raise ValueError("Unsupported sampling: luma must have the largest and Cb/Cr equal sampling factors")
+    if h_max % cb.h or v_max % cb.v or h_max // cb.h > 2 or v_max // cb.v > 2:
+        raise ValueError(f"Unsupported chroma subsampling {luma.h}x{luma.v}/{cb.h}x{cb.v}")
+    return h_max // cb.h, v_max // cb.v
+
+
+def scan_sampling(header: JpegHeader) -> List[Tuple[int, int]]:
+    """Return the (h, v) sampling factors of each component of the first scan."""
+    factors = {component.component_id: (component.h, component.v) for component in header.components}
+    try:
+        return [factors[scan_component.component_id] for scan_component in header.scan_components]
+    except KeyError as e:
+        raise ValueError(f"Scan references unknown component {e.args[0]}") from None
+
+
+def check_frame(header: JpegHeader) -> None:
+    """Validate that the frame is a 3-component YCbCr image with supported sampling factors."""
+    if len(header.components) != 3:
+        raise ValueError(f"Unsupported component count {len(header.components)}: "
+                         f"only 3-component (YCbCr) JPEGs are supported")
+    chroma_ratios(header)
+
+
+def scan_table_specs(header: JpegHeader) -> Tuple[list, list]:
+    """Validate the first scan and return its DC and AC Huffman specs, one (counts, symbols) per component."""
+    if header.progressive:
+        raise ValueError("Progressive JPEGs have no single baseline scan, use decode_progressive_coefficients()")
+    check_frame(header)
+    if len(header.scan_components) != 3:
+        raise ValueError("Only 3-component interleaved baseline scans are supported")
+
+    dc_specs = []
+    ac_specs = []
+    for scan_component in header.scan_components:
+        try:
+            dc_specs.append(header.huffman_tables[(0, scan_component.dc_table_id)])
+            ac_specs.append(header.huffman_tables[(1, scan_component.ac_table_id)])
+        except KeyError as e:
+            raise ValueError(f"Missing Huffman table {e.args[0]}") from None
+    return dc_specs, ac_specs
+
+
+def create_scan_decoder(data, header: JpegHeader) -> ScanDecoderCy:
+    """Set up a scan decoder for the first scan described by header."""
+    dc_specs, ac_specs = scan_table_specs(header)
+    mcus_x, mcus_y = mcu_grid(header)
+    return ScanDecoderCy(data, header.scan_offset, dc_specs, ac_specs,
+                         mcus_x, mcus_y, header.restart_interval, scan_sampling(header))
+
+
+def region_mcu_window(header: JpegHeader, region: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+    """Validate a pixel region (x, y, w, h) and return the MCU window (row_start, row_stop, col_start, col_stop) covering it."""
+    x, y, w, h = region
+    if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > header.width or y + h > header.height:
+        raise ValueError(f"Region {region} is outside the {header.width}x{header.height} image")
+    h_max, v_max = max_sampling(header)
+    mcu_width = 8 * h_max
+    mcu_height = 8 * v_max
+    return y // mcu_height, (y + h + mcu_height - 1) // mcu_height, x // mcu_width, (x + w + mcu_width - 1) // mcu_width
+
+
+def decode_scan(data, header: JpegHeader,
+                mcu_window: Optional[Tuple[int, int, int, int]] = None) -> List[np.ndarray]:
+    """
+    Entropy decode the scan into zigzag-ordered int16 coefficients, one (num_blocks, 64) array per component.
+
+    Blocks are in raster order of each component's block grid, which is
+    (col_stop - col_start) * h blocks wide. With mcu_window = (row_start, row_stop,
+    col_start, col_stop) only blocks inside the window are stored and decoding
+    stops after row_stop.
+    """
+    scan_decoder = create_scan_decoder(data, header)
+    mcus_x, mcus_y = mcu_grid(header)
+    row_start, row_stop, col_start, col_stop = mcu_window or (0, mcus_y, 0, mcus_x)
+
+    num_mcus = (row_stop - row_start) * (col_stop - col_start)
+    coefficients = [np.empty((num_mcus * h * v, 64), dtype=np.int16)
+                    for h, v in scan_sampling(header)]
+    scan_decoder.skip_rows(row_start)
+    scan_decoder.decode_rows(coefficients, row_stop - row_start, col_start, col_stop)
+    return coefficients
+
+
+def window_blocks(header: JpegHeader, coefficients: List[np.ndarray],
+                  mcu_window: Tuple[int, int, int, int]) -> List[np.ndarray]:
+    """Cut the blocks of an MCU window out of full-frame coefficients (as returned by decode_scan)."""
+    mcus_x, mcus_y = mcu_grid(header)
+    row_start, row_stop, col_start, col_stop = mcu_window
+    if (row_start, row_stop, col_start, col_stop) == (0, mcus_y, 0, mcus_x):
+        return coefficients
+    windowed = []
+    for component, blocks in zip(header.components, coefficients):
+        grid = blocks.reshape(mcus_y * component.v, mcus_x * component.h, 64)
+        windowed.append(grid[row_start * component.v:row_stop * component.v,
+                             col_start * component.h:col_stop * component.h].reshape(-1, 64))
+    return windowed
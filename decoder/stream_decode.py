@@ -0,0 +1,128 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+
+from util import logger
+from util.dct_basis import resolve_float_dtype
+from .dezigzag import dezigzag
+from .idct import IDCT
+from .jpeg_parser import JpegHeader, parse_jpeg_header
+from .jpeg_source import JpegSource, open_jpeg_source
+from .probe import DecodeLimits, check_limits
+from .mcu_reconstruction import blocks_to_plane, planes_to_ycbcr_array
+from .scan_decode import (check_frame, chroma_ratios, component_size, create_scan_decoder, max_sampling,
+                          mcu_grid, scan_sampling)
+from .upsample import is_fancy
+
+
+def _iter_mcu_row_planes(data, header: JpegHeader, float_dtype) -> Iterator[List[np.ndarray]]:
+    """Yield the level-shifted component planes of each MCU row."""
+    scan_decoder = create_scan_decoder(data, header)
+    mcus_x, mcus_y = mcu_grid(header)
+    sampling = scan_sampling(header)
+
+    quant_tables = []
+    for component in header.components:
+        if component.quant_table_id not in header.quant_tables:
+            raise ValueError(f"Missing quantization table {component.quant_table_id}")
+        quant_tables.append(header.quant_tables[component.quant_table_id])
+
+    # Coefficient buffers for a single MCU row, reused for every row
+    row_coefficients = [np.empty((mcus_x * h * v, 64), dtype=np.int16) for h, v in sampling]
+
+    for _ in range(mcus_y):
+        scan_decoder.decode_rows(row_coefficients, 1)
+        planes = []
+        for coefficients, quant_table, (h, v) in zip(row_coefficients, quant_tables, sampling):
+            dct_blocks = np.multiply(dezigzag(coefficients), quant_table, dtype=float_dtype)
+            plane = blocks_to_plane(IDCT(dct_blocks, float_dtype), mcus_x * h)
+            plane += 128
+            planes.append(plane)
+        yield planes
+
+
+def _iter_rows(data, header: JpegHeader, float_dtype=np.float32,
+               fancy: bool = True) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (first_pixel_row, YCbCr band) for each MCU row of an already parsed JPEG."""
+    check_frame(header)
+    mcus_x, mcus_y = mcu_grid(header)
+    ratios = chroma_ratios(header)
+    band_rows = 8 * max_sampling(header)[1]
+    chroma_size = component_size(header, header.components[1])
+    logger.info(f"Streaming decode of {header.width}x{header.height} in {mcus_y} MCU rows")
+
+    # One MCU row of look-ahead: the chroma triangle filter needs the first chroma row of the next band
+    rows = _iter_mcu_row_planes(data, header, float_dtype)
+    previous = None
+    current = next(rows)
+    for mcu_row in range(mcus_y):
+        following = next(rows, None)
+        y0 = mcu_row * band_rows
+        band_height = min(band_rows, header.height - y0)
+
+        chroma_row_start = y0 // ratios[1]
+        chroma_planes = []
+        for channel in (1, 2):
+            context = [current[channel]]
+            if previous is not None:
+                context.insert(0, previous[channel][-1:])
+            if following is not None:
+                context.append(following[channel][:1])
+            chroma_planes.append(np.concatenate(context) if len(context) > 1 else current[channel])
+        band = planes_to_ycbcr_array([current[0]] + chroma_planes, header.width, band_height, ratios, fancy,
+                                     row_offset=y0,
+                                     chroma_row_start=chroma_row_start - (previous is not None),
+                                     chroma_size=chroma_size)
+        yield y0, band
+        previous, current = current, following
+
+
+def iter_decode_rows(source: JpegSource, limits: Optional[DecodeLimits] = None,
+                     float_dtype=np.float32, upsampling: str = "fancy") -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Decode a JPEG one MCU row at a time.
+
+    Yields (first_pixel_row, band) where band is a YCbCr array of shape
+    (band_height, width, 3) in float_dtype; band_height is the MCU height (8, or 16
+    for vertically subsampled chroma) except for the last row. Only three MCU rows of
+    pixels are held in memory.
+    """
+    float_dtype = resolve_float_dtype(float_dtype, debug=False)
+    fancy = is_fancy(upsampling)
+    data = open_jpeg_source(source)
+    header = parse_jpeg_header(data)
+    check_limits(header, len(data), limits)
+    yield from _iter_rows(data, header, float_dtype, fancy)
+
+
+def decode_into(source: JpegSource, out: np.ndarray, limits: Optional[DecodeLimits] = None,
+                float_dtype=np.float32, upsampling: str = "fancy") -> np.ndarray:
+    """
+    Stream-decode a JPEG into a preallocated (height, width, 3) array, e.g. an np.memmap.
+
+    Integer outputs receive rounded values clipped to the dtype range.
+    """
+    float_dtype = resolve_float_dtype(float_dtype, debug=False)
+    fancy = is_fancy(upsampling)
+    data = open_jpeg_source(source)
+    header = parse_jpeg_header(data)
+    check_limits(header, len(data), limits)
+    if out.shape != (header.height, header.width, 3):
+        raise ValueError(f"Output array of shape {out.shape} does not match the "
+                         f"{header.width}x{header.height} image")
+
+    integer_output = np.issubdtype(out.dtype, np.integer)
+    if integer_output:
+        info = np.iinfo(out.dtype)
+
+    for y0, band in _iter_rows(data, header, float_dtype, fancy):
+        if integer_output:
+            np.clip(np.rint(band), info.min, info.max, out=band)
+        out[y0:y0 + band.shape[0]] = band
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
@@ -0,0 +1,18 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from decoder.upsample_cy import upsample_into, idct_planes_to_rgb
+
+# Chroma upsampling filters: "fancy" (triangle, as libjpeg) or "nearest" (sample replication)
+UPSAMPLING_MODES = ("fancy", "nearest")
+
+
+def is_fancy(upsampling: str) -> bool:
+    """Validate an upsampling mode and return True for the triangle filter."""
+    if upsampling not in UPSAMPLING_MODES:
+        raise ValueError(f"Unknown upsampling mode '{upsampling}', expected one of {UPSAMPLING_MODES}")
+    return upsampling == "fancy"
+
+
+__all__ = ['upsample_into', 'idct_planes_to_rgb', 'UPSAMPLING_MODES', 'is_fancy']
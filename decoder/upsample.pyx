@@ -0,0 +1,182 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from cython cimport floating
+from libc.stdlib cimport malloc, free
+
+
+cdef struct Taps:
+    # Interpolation along one axis: value = weight * s[near] + (1 - weight) * s[far]
+    Py_ssize_t* near
+    Py_ssize_t* far
+    double* weight
+
+
+cdef inline Py_ssize_t _clamp(Py_ssize_t i, Py_ssize_t last) noexcept nogil:
+    if i < 0:
+        return 0
+    if i > last:
+        return last
+    return i
+
+
+cdef int _alloc_taps(Taps* taps, Py_ssize_t n) except -1:
+    taps.near = <Py_ssize_t*>malloc(n * sizeof(Py_ssize_t))
+    taps.far = <Py_ssize_t*>malloc(n * sizeof(Py_ssize_t))
+    taps.weight = <double*>malloc(n * sizeof(double))
+    if taps.near == NULL or taps.far == NULL or taps.weight == NULL:
+        _free_taps(taps)
+        raise MemoryError()
+    return 0
+
+
+cdef void _free_taps(Taps* taps) noexcept:
+    free(taps.near)
+    free(taps.far)
+    free(taps.weight)
+    taps.near = taps.far = NULL
+    taps.weight = NULL
+
+
+cdef int _fill_taps(Taps* taps, Py_ssize_t n, Py_ssize_t first, int ratio, bint fancy,
+                    Py_ssize_t sample_count, Py_ssize_t sample_start, Py_ssize_t available) except -1:
+    """
+    Map output positions first..first+n-1 to chroma samples.
+
+    Positions are global image coordinates; sample indices are clamped to the
+    component size (sample_count), made relative to the sample_start of the
+    buffer and clamped to the available samples (edges of a band or window).
+    """
+    cdef Py_ssize_t i, pos, near, far
+    cdef Py_ssize_t last = min(sample_count, sample_start + available) - 1
+    if available <= 0 or sample_start < 0:
+        raise ValueError("Empty chroma buffer")
+    for i in range(n):
+        pos = first + i
+        if ratio == 1:
+            near = far = _clamp(pos, last)
+            taps.weight[i] = 1.0
+        else:
+            near = _clamp(pos >> 1, last)
+            if fancy:
+                # Triangle filter: 3/4 of the nearer sample, 1/4 of the next one on the same side
+                far = _clamp((pos >> 1) + (1 if pos & 1 else -1), last)
+                taps.weight[i] = 0.75
+            else:
+                far = near
+                taps.weight[i] = 1.0
+        taps.near[i] = max(near, sample_start) - sample_start
+        taps.far[i] = max(far, sample_start) - sample_start
+    return 0
+
+
+cdef int _check_ratio(int h_ratio, int v_ratio) except -1:
+    if h_ratio not in (1, 2) or v_ratio not in (1, 2):
+        raise ValueError(f"Unsupported chroma subsampling ratio {h_ratio}x{v_ratio}")
+    return 0
+
+
+def upsample_into(floating[:, :] src, floating[:, :] out, int h_ratio, int v_ratio, bint fancy=True,
+                  Py_ssize_t row_offset=0, Py_ssize_t src_row_start=0, Py_ssize_t src_height=-1,
+                  Py_ssize_t src_width=-1):
+    """
+    Upsample a chroma plane into out (e.g. one channel of a YCbCr image).
+
+    out row 0 is image row row_offset; src row 0 is chroma row src_row_start of a
+    component that is src_height x src_width samples (default: the src shape).
+    """
+    cdef Taps rows, cols
+    cdef Py_ssize_t r, x, a, b
+    cdef double wy, wx
+    cdef Py_ssize_t out_rows = out.shape[0]
+    cdef Py_ssize_t out_cols = out.shape[1]
+
+    _check_ratio(h_ratio, v_ratio)
+    if src_height < 0:
+        src_height = src_row_start + src.shape[0]
+    if src_width < 0:
+        src_width = src.shape[1]
+
+    rows.near = rows.far = cols.near = cols.far = NULL
+    rows.weight = cols.weight = NULL
+    _alloc_taps(&rows, out_rows)
+    try:
+        _alloc_taps(&cols, out_cols)
+        _fill_taps(&rows, out_rows, row_offset, v_ratio, fancy, src_height, src_row_start, src.shape[0])
+        _fill_taps(&cols, out_cols, 0, h_ratio, fancy, src_width, 0, src.shape[1])
+        with nogil:
+            for r in range(out_rows):
+                a = rows.near[r]
+                b = rows.far[r]
+                wy = rows.weight[r]
+                for x in range(out_cols):
+                    wx = cols.weight[x]
+                    out[r, x] = <floating>(
+                        wy * (wx * src[a, cols.near[x]] + (1.0 - wx) * src[a, cols.far[x]])
+                        + (1.0 - wy) * (wx * src[b, cols.near[x]] + (1.0 - wx) * src[b, cols.far[x]]))
+    finally:
+        _free_taps(&rows)
+        _free_taps(&cols)
+
+
+def idct_planes_to_rgb(floating[:, :] y_plane, floating[:, :] cb_plane, floating[:, :] cr_plane,
+                       unsigned char[:, :, ::1] out, int h_ratio, int v_ratio, bint fancy=True,
+                       Py_ssize_t row_offset=0, Py_ssize_t chroma_row_start=0,
+                       Py_ssize_t chroma_height=-1, Py_ssize_t chroma_width=-1):
+    """
+    Convert IDCT output planes (before the +128 level shift) to RGB uint8 in one pass.
+
+    Chroma is upsampled on the fly, so no full-resolution chroma plane is ever
+    built. Row and chroma geometry arguments are as for upsample_into().
+    """
+    cdef Taps rows, cols
+    cdef Py_ssize_t r, x, a, b, n, f
+    cdef double wy, wx, luma, cb, cr, value
+    cdef Py_ssize_t out_rows = out.shape[0]
+    cdef Py_ssize_t out_cols = out.shape[1]
+
+    _check_ratio(h_ratio, v_ratio)
+    if out.shape[2] != 3:
+        raise ValueError("out must have 3 channels")
+    if y_plane.shape[0] < out_rows or y_plane.shape[1] < out_cols:
+        raise ValueError("Luma plane is smaller than the output")
+    if cb_plane.shape[0] != cr_plane.shape[0] or cb_plane.shape[1] != cr_plane.shape[1]:
+        raise ValueError("Cb and Cr planes must have the same shape")
+    if chroma_height < 0:
+        chroma_height = chroma_row_start + cb_plane.shape[0]
+    if chroma_width < 0:
+        chroma_width = cb_plane.shape[1]
+
+    rows.near = rows.far = cols.near = cols.far = NULL
+    rows.weight = cols.weight = NULL
+    _alloc_taps(&rows, out_rows)
+    try:
+        _alloc_taps(&cols, out_cols)
+        _fill_taps(&rows, out_rows, row_offset, v_ratio, fancy, chroma_height, chroma_row_start,
+                   cb_plane.shape[0])
+        _fill_taps(&cols, out_cols, 0, h_ratio, fancy, chroma_width, 0, cb_plane.shape[1])
+        with nogil:
+            for r in range(out_rows):
+                a = rows.near[r]
+                b = rows.far[r]
+                wy = rows.weight[r]
+                for x in range(out_cols):
+                    n = cols.near[x]
+                    f = cols.far[x]
+                    wx = cols.weight[x]
+                    luma = y_plane[r, x] + 128.0
+                    cb = wy * (wx * cb_plane[a, n] + (1.0 - wx) * cb_plane[a, f]) \
+                        + (1.0 - wy) * (wx * cb_plane[b, n] + (1.0 - wx) * cb_plane[b, f])
+                    cr = wy * (wx * cr_plane[a, n] + (1.0 - wx) * cr_plane[a, f]) \
+                        + (1.0 - wy) * (wx * cr_plane[b, n] + (1.0 - wx) * cr_plane[b, f])
+                    # Same matrix as util.ycbcr_to_rgb, values truncated after clipping
+                    value = luma + 1.402 * cr
+                    out[r, x, 0] = <unsigned char>(0.0 if value < 0.0 else (255.0 if value > 255.0 else value))
+                    value = luma - 0.34414 * cb - 0.71414 * cr
+                    out[r, x, 1] = <unsigned char>(0.0 if value < 0.0 else (255.0 if value > 255.0 else value))
+                    value = luma + 1.772 * cb
+                    out[r, x, 2] = <unsigned char>(0.0 if value < 0.0 else (255.0 if value > 255.0 else value))
+    finally:
+        _free_taps(&rows)
+        _free_taps(&cols)
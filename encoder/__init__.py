@@ -3,6 +3,13 @@ Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
 
-from .encode import encode
+from .encode import encode, encode_async
+from .cache import EncodeCache, CacheStats
+from .ladder import encode_ladder
+from .derive import derive
+from .tiles import encode_pyramid
+from .mjpeg import MJPEGEncoder, MJPEGWriter, encode_mjpeg
+from .coefficients import encode_coefficients
 
-__all__ = ['encode']
+__all__ = ['encode', 'encode_async', 'EncodeCache', 'CacheStats', 'encode_ladder', 'derive', 'encode_pyramid',
+           'MJPEGEncoder', 'MJPEGWriter', 'encode_mjpeg', 'encode_coefficients']
@@ -9,14 +9,22 @@ References:
 - https://yasoob.me/posts/understanding-and-writing-jpeg-decoder-in-python/
 """
 import sys
-from typing import Dict
+from typing import Dict, Optional, Sequence, Tuple, Union
 import numpy as np
-from bitstring import BitArray
 
-from util import logger
-from util.bit_utils import fill_up_last_byte, add_FF00
 from .zigzag import zigzag
 
+# (h, v) sampling factors of Y, Cb and Cr per subsampling mode
+SAMPLING_FACTORS = {
+    "4:4:4": ((1, 1), (1, 1), (1, 1)),
+    "4:2:2": ((2, 1), (1, 1), (1, 1)),
+    "4:2:0": ((2, 2), (1, 1), (1, 1)),
+}
+
+# Mode name or explicit (h, v) per component
+SubsampleMode = Union[str, Sequence[Tuple[int, int]]]
+QUANT_TABLE_IDS = {"lum": 0, "chrom": 1, "cr": 2}
+
 
 def build_header() -> bytes:
     result = bytes()
@@ -30,12 +38,9 @@ def build_quantization_table(table: np.ndarray, table_type: str) -> bytes:
     result = bytes()
     result += bytes.fromhex("FF DB 00 43")
 
-    if table_type == "lum":
-        result += bytes.fromhex("00")
-    elif table_type == "chrom":
-        result += bytes.fromhex("01")
-    else:
+    if table_type not in QUANT_TABLE_IDS:
         sys.exit(f"Error: quantization_table type {table_type} does not exist!")
+    result += QUANT_TABLE_IDS[table_type].to_bytes(1, "big")
 
     zz = zigzag(table.reshape(1, 8, 8))[0]
     for val in zz:
@@ -49,7 +54,8 @@ def build_start_of_frame(
     image_height: int,
     image_width: int,
     color_components: int,
-    sub_sample_mode: str
+    sub_sample_mode: SubsampleMode,
+    quant_table_ids: Sequence[int] = (0, 1, 1)
 ) -> bytes:
     result = bytes()
     result += bytes.fromhex("FF C0 00 11")
@@ -58,14 +64,12 @@ def build_start_of_frame(
     result += image_width.to_bytes(2, "big")
     result += color_components.to_bytes(1, "big")
 
-    if sub_sample_mode == "4:4:4":
-        result += bytes.fromhex("01 11 00")
-        result += bytes.fromhex("02 11 01")
-        result += bytes.fromhex("03 11 01")
-    elif sub_sample_mode == "4:2:0":
-        sys.exit("SOF for 4:2:0 is not yet implemented!")
-    else:
-        sys.exit(f"Error: sub_sampling_mode {sub_sample_mode} is not supported!")
+    if isinstance(sub_sample_mode, str):
+        if sub_sample_mode not in SAMPLING_FACTORS:
+            sys.exit(f"Error: sub_sampling_mode {sub_sample_mode} is not supported!")
+        sub_sample_mode = SAMPLING_FACTORS[sub_sample_mode]
+    for component_id, ((h, v), table_id) in enumerate(zip(sub_sample_mode, quant_table_ids), start=1):
+        result += bytes([component_id, (h << 4) | v, table_id])
 
     return result
 
@@ -74,36 +78,27 @@ def build_huffman_tables(huff_tables: Dict) -> bytes:
     def segment_length(table):
         return 2 + 1 + 16 + len(table)
 
+    # (table class, table id): class 0 = DC, 1 = AC
     ht_info_LUT = {
-        "DC_Y": ("0", "0"),
-        "AC_Y": ("1", "0"),
-        "DC_CbCr": ("0", "1"),
-        "AC_CbCr": ("1", "1")
+        "DC_Y": (0, 0),
+        "AC_Y": (1, 0),
+        "DC_CbCr": (0, 1),
+        "AC_CbCr": (1, 1)
     }
 
     def ht_info(tbl_ctr, table):
-        result = BitArray()
-        result.append("uint:4=" + ht_info_LUT[table][0])
-        result.append("uint:4=" + ht_info_LUT[table][1])
-        return result.bytes
+        table_class, table_id = ht_info_LUT[table]
+        return bytes([(table_class << 4) | table_id])
 
     def number_of_huff_codes(tbl):
-        result = bytes()
-        for length in range(1, 17):
-            total_nr = 0
-            for key, value in tbl.items():
-                if length == len(value):
-                    total_nr += 1
-            result += total_nr.to_bytes(1, "big")
-        return result
+        counts = [0] * 17
+        for value in tbl.values():
+            counts[len(value)] += 1
+        return bytes(counts[1:])
 
     def symbols(tbl):
-        result = bytes()
-        for length in range(1, 17):
-            for key, value in tbl.items():
-                if len(value) == length:
-                    result += key.to_bytes(1, "big")
-        return result
+        # Ordered by code length, in table order within a length (sorted() is stable)
+        return bytes(key for key, _ in sorted(tbl.items(), key=lambda item: len(item[1])))
 
     result = bytes()
     for tbl_ctr, table in enumerate(huff_tables):
@@ -141,22 +136,32 @@ def build_bitstream(
     image_height: int,
     image_width: int,
     huff_tables: Dict,
-    huffman_scan_bytes: bytes
+    huffman_scan_bytes: bytes,
+    sub_sample_mode: SubsampleMode = "4:4:4",
+    quantization_table_cr: Optional[np.ndarray] = None
 ) -> bytes:
+    """
+    Assemble a baseline JFIF file around Huffman coded scan bytes.
+
+    sub_sample_mode is "4:4:4", "4:2:2", "4:2:0" or the (h, v) factors of Y, Cb and Cr.
+    Cr uses the chroma table unless quantization_table_cr gives it its own (table 2).
+    """
     color_depth = 8
     num_color_components = 3
-    sub_sample_mode = "4:4:4"
-
-    bytestream = bytes()
-    bytestream += build_header()
-    bytestream += build_quantization_table(quantization_table_lum, "lum")
-    bytestream += build_quantization_table(quantization_table_chrom, "chrom")
-    bytestream += build_start_of_frame(
-        color_depth, image_height, image_width, num_color_components, sub_sample_mode
-    )
-    bytestream += build_huffman_tables(huff_tables)
-    bytestream += build_start_of_scan(num_color_components)
-    bytestream += build_image_data(huffman_scan_bytes)
-    bytestream += build_end_of_image()
-
-    return bytestream
+    quant_tables = [build_quantization_table(quantization_table_lum, "lum"),
+                    build_quantization_table(quantization_table_chrom, "chrom")]
+    quant_table_ids = (0, 1, 1)
+    if quantization_table_cr is not None:
+        quant_tables.append(build_quantization_table(quantization_table_cr, "cr"))
+        quant_table_ids = (0, 1, 2)
+
+    return b"".join((
+        build_header(),
+        *quant_tables,
+        build_start_of_frame(color_depth, image_height, image_width, num_color_components, sub_sample_mode,
+                             quant_table_ids),
+        build_huffman_tables(huff_tables),
+        build_start_of_scan(num_color_components),
+        build_image_data(huffman_scan_bytes),
+        build_end_of_image(),
+    ))
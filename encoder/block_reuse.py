@@ -0,0 +1,94 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Content-aware block reuse: transform and quantize every distinct 8x8 block once.
+
+Screen content, UI captures and documents are dominated by flat and repeated
+blocks. Flat blocks (min == max) are grouped by their level without hashing;
+the remaining blocks go through a per-image hash table (64-bit hash of the
+block, verified byte by byte). Only one block per group goes through the DCT
+and quantizer; the results are scattered back, so the output is identical to
+transforming every block.
+"""
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+
+# Use Cython optimized version
+from .block_reuse_cy import group_blocks
+
+# Below this share of reusable blocks the full arrays are transformed directly (no gather/scatter)
+MIN_REUSE_RATE = 0.05
+
+
+@dataclass
+class BlockReuse:
+    """
+    Map from every block of a component to the block that is actually transformed.
+
+    Attributes:
+        unique: Indices of the representative blocks, None when every block is transformed
+        inverse: Block i takes the results of representative inverse[i] (None with unique)
+        blocks: Number of blocks
+        flat_blocks: Blocks with min == max
+        repeated_blocks: Non-flat blocks identical to an earlier block
+        distinct_blocks: Distinct blocks found (equal to blocks with no reuse)
+    """
+    unique: np.ndarray
+    inverse: np.ndarray
+    blocks: int
+    flat_blocks: int
+    repeated_blocks: int
+    distinct_blocks: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of blocks whose DCT and quantization were reused instead of computed."""
+        return 1.0 - self.distinct_blocks / self.blocks if self.blocks else 0.0
+
+    def select(self, blocks: np.ndarray) -> np.ndarray:
+        """The representative blocks (all blocks if nothing is reused)."""
+        return blocks if self.unique is None else blocks[self.unique]
+
+    def expand(self, per_representative: np.ndarray) -> np.ndarray:
+        """Scatter per-representative results back to every block."""
+        return per_representative if self.inverse is None else per_representative[self.inverse]
+
+    def to_dict(self) -> Dict:
+        return {
+            "blocks": self.blocks,
+            "flat_blocks": self.flat_blocks,
+            "repeated_blocks": self.repeated_blocks,
+            "distinct_blocks": self.distinct_blocks,
+            "hit_rate": self.hit_rate,
+        }
+
+
+def find_block_reuse(blocks: np.ndarray, min_reuse_rate: float = MIN_REUSE_RATE) -> BlockReuse:
+    """
+    Group identical blocks of one component.
+
+    Args:
+        blocks: (n, 8, 8) int16 blocks from partition()
+        min_reuse_rate: Below this hit rate reuse is not worth the gather and scatter
+            (checked on the first quarter of the blocks, then on all of them)
+
+    Returns:
+        BlockReuse; unique/inverse are None when reuse is not applied (counts are
+        then only filled in if the whole image was scanned)
+    """
+    n = blocks.shape[0]
+    if n == 0 or blocks.dtype != np.int16:
+        return BlockReuse(None, None, n, 0, 0, n)
+
+    groups = group_blocks(blocks, min_reuse_rate)
+    if groups is None:
+        return BlockReuse(None, None, n, 0, 0, n)
+    first, inverse, flat_blocks, flat_levels = groups
+    distinct = len(first)
+    reuse = BlockReuse(first, inverse, n, flat_blocks, (n - flat_blocks) - (distinct - flat_levels), distinct)
+    if reuse.hit_rate < min_reuse_rate:
+        reuse.unique = reuse.inverse = None
+    return reuse
@@ -0,0 +1,124 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+"""
+Cython-optimized grouping of identical 8x8 blocks
+
+One pass over the blocks without the GIL: flat blocks (all 64 samples equal)
+are looked up by level in a direct table, the others in an open-addressing
+hash table keyed by a 64-bit hash of the block and verified with memcmp.
+"""
+
+import numpy as np
+cimport numpy as np
+cimport cython
+from libc.stdint cimport uint64_t
+from libc.string cimport memcmp
+
+ctypedef np.int16_t INT16
+
+cdef enum:
+    LEVELS = 65536      # int16 sample values
+    WORDS = 16          # 64 int16 samples = 16 x 64-bit words
+
+
+cdef inline uint64_t _hash_block(const uint64_t* words) noexcept nogil:
+    cdef uint64_t h = 0x9E3779B97F4A7C15ULL
+    cdef int i
+    for i in range(WORDS):
+        h = (h ^ words[i]) * 0xBF58476D1CE4E5B9ULL
+        h ^= h >> 31
+    return h
+
+
+cdef Py_ssize_t _group(const INT16[:, ::1] rows, Py_ssize_t[::1] first, Py_ssize_t[::1] inverse,
+                       Py_ssize_t[::1] by_level, Py_ssize_t[::1] slots, uint64_t[::1] hashes,
+                       Py_ssize_t* flat_blocks, Py_ssize_t* flat_levels,
+                       Py_ssize_t probe, Py_ssize_t min_hits) noexcept nogil:
+    cdef Py_ssize_t n = rows.shape[0]
+    cdef Py_ssize_t mask = slots.shape[0] - 1
+    cdef Py_ssize_t distinct = 0
+    cdef Py_ssize_t i, slot, rep
+    cdef const INT16* block
+    cdef uint64_t h
+    cdef int k
+    cdef bint flat
+
+    for i in range(n):
+        if i == probe and i - distinct < min_hits:
+            return -1  # too few repeats in the first blocks: not worth it
+        block = &rows[i, 0]
+        flat = True
+        for k in range(1, 64):
+            if block[k] != block[0]:
+                flat = False
+                break
+
+        if flat:
+            flat_blocks[0] += 1
+            rep = by_level[block[0] + 32768]
+            if rep < 0:
+                flat_levels[0] += 1
+                rep = distinct
+                by_level[block[0] + 32768] = rep
+                first[distinct] = i
+                distinct += 1
+            inverse[i] = rep
+            continue
+
+        h = _hash_block(<const uint64_t*>block)
+        slot = <Py_ssize_t>(h & <uint64_t>mask)
+        while True:
+            rep = slots[slot]
+            if rep < 0:
+                # New distinct block
+                rep = distinct
+                slots[slot] = rep
+                hashes[slot] = h
+                first[distinct] = i
+                distinct += 1
+                break
+            if hashes[slot] == h and memcmp(&rows[first[rep], 0], block, 64 * sizeof(INT16)) == 0:
+                break
+            slot = (slot + 1) & mask
+        inverse[i] = rep
+    return distinct
+
+
+def group_blocks(blocks, double min_reuse_rate=0.0):
+    """
+    Group identical blocks of an (n, 64) or (n, 8, 8) int16 array.
+
+    If fewer than min_reuse_rate of the first quarter of the blocks repeat an
+    earlier block, grouping stops early and None is returned.
+
+    Returns:
+        (first, inverse, flat_blocks, flat_levels): first[g] is the first block of
+        group g (len = number of distinct blocks), block i belongs to group
+        inverse[i]; flat_blocks counts constant blocks, flat_levels their distinct levels
+    """
+    cdef const INT16[:, ::1] rows = np.ascontiguousarray(blocks, dtype=np.int16).reshape(-1, 64)
+    cdef Py_ssize_t n = rows.shape[0]
+    cdef Py_ssize_t capacity = 16
+    while capacity < 2 * n:
+        capacity <<= 1
+
+    first = np.empty(n, dtype=np.intp)
+    inverse = np.empty(n, dtype=np.intp)
+    by_level = np.full(LEVELS, -1, dtype=np.intp)
+    slots = np.full(capacity, -1, dtype=np.intp)
+    hashes = np.empty(capacity, dtype=np.uint64)
+    cdef Py_ssize_t[::1] first_view = first
+    cdef Py_ssize_t[::1] inverse_view = inverse
+    cdef Py_ssize_t[::1] level_view = by_level
+    cdef Py_ssize_t[::1] slot_view = slots
+    cdef uint64_t[::1] hash_view = hashes
+    cdef Py_ssize_t flat_blocks = 0
+    cdef Py_ssize_t flat_levels = 0
+    cdef Py_ssize_t probe = n // 4 if min_reuse_rate > 0 else -1
+    cdef Py_ssize_t min_hits = <Py_ssize_t>(min_reuse_rate * probe)
+    cdef Py_ssize_t distinct
+    with nogil:
+        distinct = _group(rows, first_view, inverse_view, level_view, slot_view, hash_view,
+                          &flat_blocks, &flat_levels, probe, min_hits)
+    if distinct < 0:
+        return None
+    return first[:distinct], inverse, flat_blocks, flat_levels
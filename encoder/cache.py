@@ -0,0 +1,283 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Content-addressed cache of encoded JPEGs.
+
+The key hashes the input planes (bytes, shape, dtype) together with every
+parameter that changes the output: quantization tables, Huffman tables,
+chroma sampling and DCT precision. A hit returns the stored JPEG without
+running any pipeline stage.
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Bump when a change to the encoder alters its output for the same input
+CACHE_FORMAT_VERSION = 1
+
+_SUFFIX = ".jpg"
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of an EncodeCache.
+
+    Attributes:
+        memory_hits: Lookups served from the in-memory tier
+        disk_hits: Lookups served from the disk tier (and promoted to memory)
+        misses: Lookups that had to run the encoder
+        stores: Encoded outputs added to the cache
+        memory_evictions: Entries dropped from memory to stay within max_memory_bytes
+        disk_evictions: Files deleted to stay within max_disk_bytes
+        memory_bytes: Current size of the in-memory tier
+        memory_entries: Current number of in-memory entries
+        disk_bytes: Current size of the disk tier (as tracked by this process)
+    """
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+    memory_bytes: int = 0
+    memory_entries: int = 0
+    disk_bytes: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["hits"] = self.hits
+        data["hit_rate"] = self.hit_rate
+        return data
+
+
+class EncodeCache:
+    """
+    Two-tier cache of encoded JPEG bytes: an LRU in memory and an optional directory on disk.
+
+    Both tiers have a byte budget. Disk files are written atomically (temporary
+    file + rename), so several processes can share a directory; the least
+    recently used files (by modification time, refreshed on every hit) are
+    deleted when the directory grows past max_disk_bytes. Safe to use from
+    several threads.
+
+    Pass the cache to encode(..., cache=cache).
+    """
+
+    def __init__(self, max_memory_bytes: int = 64 << 20, directory: Optional[str] = None,
+                 max_disk_bytes: int = 1 << 30):
+        if max_memory_bytes < 0 or max_disk_bytes < 0:
+            raise ValueError("Cache budgets must not be negative")
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes replacing, counting and evicting disk files, so the tracked size stays exact
+        self._disk_lock = threading.Lock()
+        self._stats = CacheStats()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._stats.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @property
+    def stats(self) -> CacheStats:
+        """Snapshot of the counters."""
+        with self._lock:
+            return CacheStats(**asdict(self._stats))
+
+    def key(self, planes: Iterable[np.ndarray], width: int, height: int, **params) -> str:
+        """
+        Content hash of the input planes plus the encoding parameters.
+
+        Args:
+            planes: Input channels (their bytes, shape and dtype are hashed)
+            width: Image width
+            height: Image height
+            **params: Every other setting that affects the output (tables, sampling, precision, ...)
+
+        Returns:
+            Hex digest (32 characters)
+        """
+        import hashlib
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"v{CACHE_FORMAT_VERSION}:{width}x{height}".encode())
+        for plane in planes:
+            plane = np.ascontiguousarray(plane)
+            digest.update(f"|{plane.dtype.str}{plane.shape}".encode())
+            digest.update(memoryview(plane).cast("B"))
+        for name in sorted(params):
+            value = params[name]
+            if isinstance(value, np.ndarray):
+                value = f"{value.dtype.str}{value.shape}{value.tobytes().hex()}"
+            digest.update(f"|{name}={value!r}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached JPEG for key, or None (counted as a miss)."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats.memory_hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self._stats.misses += 1
+                return None
+            self._stats.disk_hits += 1
+            self._store_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an encoded JPEG in both tiers."""
+        data = bytes(data)
+        with self._lock:
+            self._stats.stores += 1
+            self._store_memory(key, data)
+        if self.directory is not None:
+            self._write_disk(key, data)
+
+    def clear(self) -> None:
+        """Drop every entry of both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._stats.memory_bytes = 0
+            self._stats.memory_entries = 0
+        if self.directory is None:
+            return
+        with self._disk_lock:
+            for path, _, _ in self._disk_entries():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._stats.disk_bytes = 0
+
+    def render(self) -> str:
+        """Counters in the Prometheus text exposition format."""
+        stats = self.stats
+        lines = [
+            "# TYPE jpeg_encode_cache_hits_total counter",
+            f'jpeg_encode_cache_hits_total{{tier="memory"}} {stats.memory_hits}',
+            f'jpeg_encode_cache_hits_total{{tier="disk"}} {stats.disk_hits}',
+            "# TYPE jpeg_encode_cache_misses_total counter",
+            f"jpeg_encode_cache_misses_total {stats.misses}",
+            "# TYPE jpeg_encode_cache_evictions_total counter",
+            f'jpeg_encode_cache_evictions_total{{tier="memory"}} {stats.memory_evictions}',
+            f'jpeg_encode_cache_evictions_total{{tier="disk"}} {stats.disk_evictions}',
+            "# TYPE jpeg_encode_cache_bytes gauge",
+            f'jpeg_encode_cache_bytes{{tier="memory"}} {stats.memory_bytes}',
+            f'jpeg_encode_cache_bytes{{tier="disk"}} {stats.disk_bytes}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    # Memory tier (callers hold self._lock)
+
+    def _store_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._stats.memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._stats.memory_bytes += len(data)
+        while self._stats.memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._stats.memory_bytes -= len(evicted)
+            self._stats.memory_evictions += 1
+        self._stats.memory_entries = len(self._memory)
+
+    # Disk tier
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _disk_entries(self):
+        """(path, size, mtime) of every cache file in the directory."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # evicted by another process
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # recently used: evicted last
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        import tempfile
+
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            with self._disk_lock:
+                try:
+                    previous = os.path.getsize(path)
+                except FileNotFoundError:
+                    previous = 0
+                os.replace(temp_path, path)
+                with self._lock:
+                    self._stats.disk_bytes += len(data) - previous
+                    over_budget = self._stats.disk_bytes > self.max_disk_bytes
+                if over_budget:
+                    self._evict_disk()
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _evict_disk(self) -> None:
+        """Delete the least recently used files until the directory fits max_disk_bytes (holding _disk_lock)."""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._stats.disk_bytes = total
+            self._stats.disk_evictions += evicted
@@ -0,0 +1,193 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Encoding from quantized DCT coefficients, the mirror of decoder.decode_coefficients().
+
+The pipeline starts after quantization: zigzag, DPCM, RLE, the scan writer
+and build_bitstream. Coefficients are read straight from the int16 block
+arrays; the zigzag reordering (and, for subsampled components, the regrouping
+of blocks into MCU order) is a single gather, and zigzag-ordered 4:4:4 input
+is encoded without any copy.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from util.huffman_tables import STANDARD_TABLES
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from .bitstream_builder import SAMPLING_FACTORS, SubsampleMode, build_bitstream
+from .huffman_optimize import ac_symbol_counts, dc_symbol_counts, optimized_table
+from .run_length_encoding import rle_encode_packed
+from .scan_writer import build_scan_bytes
+from .zigzag import ZIGZAG_ORDER
+
+HUFFMAN_MODES = ("standard", "optimized")
+
+# Largest DPCM difference and AC value the baseline Huffman symbols can code (categories 11 and 10)
+_MAX_DC_DIFF = 2047
+_MAX_AC_VALUE = 1023
+# Most blocks per MCU of an interleaved scan (ITU T.81 B.2.3)
+_MAX_MCU_BLOCKS = 10
+
+
+def encode_coefficients(
+    components: Sequence[np.ndarray],
+    quant_tables: Sequence[np.ndarray],
+    sampling: SubsampleMode = "4:4:4",
+    huffman: str = "standard",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    zigzag: bool = False,
+    instrumentation: Optional[Instrumentation] = None
+) -> bytes:
+    """
+    Encode quantized DCT coefficients of Y, Cb and Cr to a baseline JPEG.
+
+    Args:
+        components: int16 coefficients of Y, Cb and Cr, shape (block_rows, block_cols, 64) or
+            (block_rows, block_cols, 8, 8); each grid covers whole MCUs (as from decode_coefficients)
+        quant_tables: Quantization table (8x8, natural order, 1-255) per component; the coefficients
+            are written as given, the tables only go into the file for decoders
+        sampling: "4:4:4", "4:2:2", "4:2:0" or (h, v) per component
+        huffman: "standard" (Annex K tables) or "optimized" (tables built from this image's symbols)
+        width, height: Image size in pixels (default: the full MCU grid)
+        zigzag: The 64 coefficients of a block are already in zigzag order ((…, 64) layout only)
+        instrumentation: Times every stage
+
+    Returns:
+        JPEG bytes
+    """
+    if huffman not in HUFFMAN_MODES:
+        raise ValueError(f"Unknown Huffman mode '{huffman}', expected one of {HUFFMAN_MODES}")
+    if len(components) != 3 or len(quant_tables) != 3:
+        raise ValueError(f"Expected Y, Cb and Cr coefficients and quantization tables, "
+                         f"got {len(components)} and {len(quant_tables)}")
+    factors = _sampling_factors(sampling)
+    h_max = max(h for h, _ in factors)
+    v_max = max(v for _, v in factors)
+    luma_rows, luma_cols = components[0].shape[:2]
+    if width is None:
+        width = luma_cols // factors[0][0] * 8 * h_max
+    if height is None:
+        height = luma_rows // factors[0][1] * 8 * v_max
+    if not 0 < width < 65536 or not 0 < height < 65536:
+        raise ValueError(f"Image size must be 1-65535 pixels, got {width}x{height}")
+    mcus_x = -(-width // (8 * h_max))
+    mcus_y = -(-height // (8 * v_max))
+    tables = [_quant_table(table) for table in quant_tables]
+
+    instrumentation = active_instrumentation(instrumentation)
+    with measure_pipeline(instrumentation, "encode_coefficients", width * height):
+        with measure_stage(instrumentation, "zigzag") as record:
+            scan_blocks = [_scan_order(blocks, h, v, mcus_x, mcus_y, zigzag)
+                           for blocks, (h, v) in zip(components, factors)]
+            record.set_output(*scan_blocks)
+
+        scan, huff_tables = entropy_code(scan_blocks, [h * v for h, v in factors], huffman, instrumentation)
+
+        with measure_stage(instrumentation, "build_bitstream") as record:
+            # Cb and Cr share table 1 unless they differ
+            table_cr = None if np.array_equal(tables[1], tables[2]) else tables[2]
+            jpeg_bitstream = build_bitstream(tables[0], tables[1], height, width, huff_tables, scan,
+                                             factors, table_cr)
+            record.set_output(jpeg_bitstream)
+    return jpeg_bitstream
+
+
+def entropy_code(scan_blocks: Sequence[np.ndarray], blocks_per_mcu: Sequence[int] = (1, 1, 1),
+                 huffman: str = "standard",
+                 instrumentation: Optional[Instrumentation] = None) -> Tuple[bytes, Dict[str, dict]]:
+    """
+    DPCM, RLE and Huffman code zigzag-ordered coefficients of Y, Cb and Cr into scan bytes.
+
+    Args:
+        scan_blocks: Zigzag int16/int32 coefficients per component, shape (num_blocks, 64), the
+            blocks_per_mcu blocks of every MCU consecutive (rows may be strided, nothing is copied)
+        blocks_per_mcu: Blocks of each component per MCU (1, 1, 1 for 4:4:4)
+        huffman: "standard" or "optimized", see encode_coefficients()
+        instrumentation: Times every stage
+
+    Returns:
+        (scan bytes, the Huffman tables they are coded with, for build_bitstream)
+    """
+    with measure_stage(instrumentation, "dpcm_encode") as record:
+        dpcm = [np.diff(blocks[:, 0].astype(np.int32), prepend=0) for blocks in scan_blocks]
+        record.set_output(*dpcm)
+    if any(len(diffs) and np.abs(diffs).max() > _MAX_DC_DIFF for diffs in dpcm):
+        raise ValueError(f"DC differences must be within ±{_MAX_DC_DIFF}")
+
+    with measure_stage(instrumentation, "rle_encode_mcus") as record:
+        rle = [rle_encode_packed(blocks[:, 1:]) for blocks in scan_blocks]
+        record.set_output(*(pairs for pairs, _ in rle))
+    if any(len(pairs) and (pairs[:, 1].min() < -_MAX_AC_VALUE or pairs[:, 1].max() > _MAX_AC_VALUE)
+           for pairs, _ in rle):
+        raise ValueError(f"AC coefficients must be within ±{_MAX_AC_VALUE}")
+
+    with measure_stage(instrumentation, "huffman_tables"):
+        huff_tables = _huffman_tables(huffman, dpcm, rle)
+
+    with measure_stage(instrumentation, "build_scan_bytes") as record:
+        scan = build_scan_bytes(dpcm, rle, blocks_per_mcu, huff_tables)
+        record.set_output(scan)
+    return scan, huff_tables
+
+
+def _sampling_factors(sampling: SubsampleMode) -> List[tuple]:
+    """(h, v) of Y, Cb and Cr for a mode name or explicit factors."""
+    if isinstance(sampling, str):
+        if sampling not in SAMPLING_FACTORS:
+            raise ValueError(f"Unknown sampling '{sampling}', expected one of {tuple(SAMPLING_FACTORS)} "
+                             f"or (h, v) per component")
+        return list(SAMPLING_FACTORS[sampling])
+    factors = [(int(h), int(v)) for h, v in sampling]
+    if len(factors) != 3 or not all(1 <= h <= 4 and 1 <= v <= 4 for h, v in factors):
+        raise ValueError(f"Sampling must give (h, v) in 1-4 for Y, Cb and Cr, got {sampling}")
+    if sum(h * v for h, v in factors) > _MAX_MCU_BLOCKS:
+        raise ValueError(f"Sampling {factors} needs more than {_MAX_MCU_BLOCKS} blocks per MCU")
+    return factors
+
+
+def _quant_table(table) -> np.ndarray:
+    """Validated 8x8 quantization table."""
+    table = np.asarray(table)
+    if table.size != 64:
+        raise ValueError(f"Quantization tables must have 64 entries, got shape {table.shape}")
+    if table.min() < 1 or table.max() > 255:
+        raise ValueError("Quantization table entries must be within 1-255 (8-bit precision)")
+    return table.reshape(8, 8)
+
+
+def _scan_order(blocks: np.ndarray, h: int, v: int, mcus_x: int, mcus_y: int, zigzag: bool) -> np.ndarray:
+    """Zigzag-ordered (num_blocks, 64) int16 coefficients, the h x v blocks of every MCU consecutive."""
+    if blocks.dtype != np.int16:
+        raise ValueError(f"Coefficients must be int16, got {blocks.dtype}")
+    grid = (mcus_y * v, mcus_x * h)
+    if blocks.shape not in (grid + (64,), grid + (8, 8)):
+        raise ValueError(f"Coefficients of a component with sampling ({h}, {v}) must have shape "
+                         f"{grid + (64,)} or {grid + (8, 8)}, got {blocks.shape}")
+    if zigzag and blocks.ndim != 3:
+        raise ValueError("Zigzag-ordered coefficients need the (block_rows, block_cols, 64) layout")
+    if zigzag and h == v == 1:
+        return blocks.reshape(-1, 64)
+
+    mcu_blocks = blocks.reshape(mcus_y, v, mcus_x, h, 64)
+    scan = np.empty((mcus_y, mcus_x, v, h, 64), dtype=np.int16)
+    target = scan.transpose(0, 2, 1, 3, 4)
+    if zigzag:
+        np.copyto(target, mcu_blocks)
+    else:
+        np.take(mcu_blocks, ZIGZAG_ORDER, axis=4, out=target, mode="clip")
+    return scan.reshape(-1, 64)
+
+
+def _huffman_tables(huffman: str, dpcm, rle) -> dict:
+    """DC/AC code tables of luma and chroma: the Annex K tables, or built from the symbol counts."""
+    if huffman == "standard":
+        return STANDARD_TABLES
+    return {
+        "DC_Y": optimized_table(dc_symbol_counts(dpcm[0])),
+        "AC_Y": optimized_table(ac_symbol_counts(rle[0])),
+        "DC_CbCr": optimized_table(dc_symbol_counts(dpcm[1]) + dc_symbol_counts(dpcm[2])),
+        "AC_CbCr": optimized_table(ac_symbol_counts(rle[1]) + ac_symbol_counts(rle[2])),
+    }
@@ -0,0 +1,146 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Derivatives: several downscaled JPEGs from one entropy decode of an uploaded JPEG.
+
+The scan is entropy decoded once. Every requested size is rendered with the
+scaled IDCT (1/8, 1/4, 1/2 or full size, whichever is the smallest that still
+covers it) or taken from an already rendered scale at most twice as large,
+resized the rest of the way with OpenCV's area filter and encoded. Small
+derivatives therefore never reconstruct the full-resolution image. The
+quantization tables are set up once for all derivatives and each is encoded
+like a pyramid tile (encoder.tiles.encode_with_header), without encode()'s
+per-call setup.
+"""
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from util.dct_basis import resolve_float_dtype, scaled_idct_size
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from util.quantization_tables import get_quantization_tables
+from .tiles import encode_with_header, jpeg_header
+
+# Longest side in pixels, or an exact (width, height)
+DerivativeSize = Union[int, Tuple[int, int]]
+
+
+def target_size(width: int, height: int, size: DerivativeSize) -> Tuple[int, int]:
+    """
+    Output (width, height) of a derivative.
+
+    Args:
+        width: Source width
+        height: Source height
+        size: Longest side (aspect ratio kept, never upscaled) or an exact (width, height)
+
+    Returns:
+        (width, height)
+    """
+    if isinstance(size, (int, np.integer)):
+        if size <= 0:
+            raise ValueError(f"Derivative size must be positive, got {size}")
+        longest = max(width, height)
+        if size >= longest:
+            return width, height
+        scale = size / longest
+        return max(round(width * scale), 1), max(round(height * scale), 1)
+    target_width, target_height = size
+    if target_width <= 0 or target_height <= 0:
+        raise ValueError(f"Derivative size must be positive, got {size}")
+    return target_width, target_height
+
+
+def derive_rgb(jpeg_bytes, sizes: Sequence[DerivativeSize], upsampling: str = "fancy", limits=None,
+               instrumentation: Optional[Instrumentation] = None) -> List[np.ndarray]:
+    """
+    RGB uint8 derivatives of a JPEG, entropy decoded once.
+
+    Args:
+        jpeg_bytes: JPEG as bytes, mmap, file path or any buffer-protocol object
+        sizes: Longest side or exact (width, height) per derivative
+        upsampling: Chroma upsampling ("fancy" or "nearest")
+        limits: DecodeLimits checked against the header (default: decoder.probe.default_limits)
+        instrumentation: Times the decode, IDCT and resize stages
+
+    Returns:
+        One array of shape (height, width, 3) per size
+    """
+    from decoder.jpeg_parser import parse_jpeg_header
+    from decoder.jpeg_source import open_jpeg_source
+    from decoder.probe import check_limits
+    from decoder.progressive import decode_progressive_coefficients, render_coefficients
+    from decoder.scan_decode import decode_scan
+
+    instrumentation = active_instrumentation(instrumentation)
+    with measure_pipeline(instrumentation, "derive"):
+        with measure_stage(instrumentation, "parse_header"):
+            data = open_jpeg_source(jpeg_bytes)
+            header = parse_jpeg_header(data)
+            check_limits(header, len(data), limits)
+        targets = [target_size(header.width, header.height, size) for size in sizes]
+
+        with measure_stage(instrumentation, "entropy_decode") as record:
+            if header.progressive:
+                coefficients = decode_progressive_coefficients(data, header)
+            else:
+                coefficients = decode_scan(data, header)
+            record.set_output(coefficients)
+
+        # Largest first, so smaller derivatives can be resized from an image that is already rendered
+        order = sorted(range(len(targets)), key=lambda index: -targets[index][0] * targets[index][1])
+        rendered = {}
+        sources = [None] * len(targets)
+        with measure_stage(instrumentation, "idct") as record:
+            for index in order:
+                target_width, target_height = targets[index]
+                scale = scaled_idct_size(header.width, header.height, target_width, target_height)
+                # Smallest rendered scale that covers the target, unless it has over 4x the pixels of this scale
+                source = min((larger for larger in rendered if scale <= larger <= 2 * scale), default=None)
+                if source is None:
+                    rendered[scale] = render_coefficients(header, coefficients, scale, upsampling)
+                    source = scale
+                sources[index] = source
+            record.set_output(*rendered.values())
+
+        derivatives = []
+        with measure_stage(instrumentation, "resize") as record:
+            for (target_width, target_height), source in zip(targets, sources):
+                rgb = rendered[source]
+                if rgb.shape[:2] != (target_height, target_width):
+                    import cv2  # only needed when the scaled IDCT does not hit the size exactly
+                    rgb = cv2.resize(rgb, (target_width, target_height), interpolation=cv2.INTER_AREA)
+                derivatives.append(rgb)
+            record.set_output(*derivatives)
+    return derivatives
+
+
+def derive(jpeg_bytes, sizes: Sequence[DerivativeSize], quality: Optional[int] = None,
+           upsampling: str = "fancy", float_dtype=None, executor=None, limits=None,
+           instrumentation: Optional[Instrumentation] = None) -> List[bytes]:
+    """
+    Encode downscaled derivatives of a JPEG.
+
+    Args:
+        jpeg_bytes: JPEG as bytes, mmap, file path or any buffer-protocol object
+        sizes: Longest side or exact (width, height) per derivative
+        quality: JPEG quality 1-100 of the derivatives (see encode())
+        upsampling: Chroma upsampling of the source ("fancy" or "nearest")
+        float_dtype: Colour conversion and DCT precision of the derivatives
+        executor: Optional concurrent.futures executor to encode the derivatives in parallel
+        limits: DecodeLimits checked against the source header
+        instrumentation: Times the decode and resize stages
+
+    Returns:
+        JPEG bytes per size, in the order of sizes
+    """
+    quantization_tables = get_quantization_tables(quality)
+    float_dtype = resolve_float_dtype(float_dtype, False)
+    derivatives = derive_rgb(jpeg_bytes, sizes, upsampling, limits, instrumentation)
+    jobs = [(rgb, jpeg_header(rgb.shape[1], rgb.shape[0], quantization_tables)) for rgb in derivatives]
+    if executor is None:
+        return [encode_with_header(rgb, header, quantization_tables, float_dtype) for rgb, header in jobs]
+    futures = [executor.submit(encode_with_header, rgb, header, quantization_tables, float_dtype)
+               for rgb, header in jobs]
+    return [future.result() for future in futures]
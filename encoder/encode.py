@@ -2,23 +2,32 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
+from typing import Optional
 import numpy as np
 from .scan_writer import build_scan_bytes_444
 from util import print_3x3_mcus, EncodingResult, logger
-from util.quantization_tables import quantization_table_lum, quantization_table_chrom
-from util import huffman_tables
+from util.quantization_tables import get_quantization_tables
+from util.huffman_tables import STANDARD_TABLES
+from util.dct_basis import resolve_float_dtype
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from util.executor import run_in_executor
 from util.encoding_stages import (
     STAGE_JPEG, STAGE_INTERLEAVER, STAGE_AC, STAGE_DC,
     STAGE_RLE, STAGE_DPCM, STAGE_ZIGZAG, STAGE_QUANT,
     STAGE_DCT, STAGE_MCUS
 )
 from .partitioning import partition
+from .block_reuse import find_block_reuse
 from .transform import transform
 from .quantization import quantize
 from .zigzag import zigzag
 from .dpcm import dpcm_encode
-from .run_length_encoding import rle_encode_mcus
+from .run_length_encoding import rle_encode_mcus, rle_encode_packed
+from .encode_dc import encode_dc_coefficients
+from .encode_ac import encode_ac_coefficients
+from .interleave import interleave_mcus
 from .bitstream_builder import build_bitstream
+from .cache import EncodeCache
 
 
 def encode(
@@ -28,28 +37,126 @@ def encode(
     img_width: int,
     img_height: int,
     last_encoding_stage: str = STAGE_JPEG,
-    verbose: bool = False
+    verbose: bool = False,
+    float_dtype=None,
+    instrumentation: Optional[Instrumentation] = None,
+    cache: Optional[EncodeCache] = None,
+    quality: Optional[int] = None
 ) -> EncodingResult:
-    """Run JPEG encoding pipeline up to specified stage."""
-    logger.info("Starting JPEG encoding pipeline")
+    """
+    Run JPEG encoding pipeline up to specified stage.
+
+    float_dtype selects the DCT precision; by default float32 for complete JPEG
+    encodes and float64 for verbose or staged (debug) runs. With instrumentation
+    (or inside util.instrumentation.collect_stats()) every stage is timed and the
+    summary is attached as result.stats.
+
+    With a cache, complete non-verbose encodes are looked up by content first; a
+    hit returns a result holding only jpeg_bitstream and the quantization tables.
+
+    quality (1-100) scales the Annex K quantization tables with the IJG formula;
+    None (and 50) use them unscaled.
+    """
+    instrumentation = active_instrumentation(instrumentation)
+    quantization_table_lum, quantization_table_chrom = get_quantization_tables(quality)
+    with measure_pipeline(instrumentation, "encode", img_width * img_height) as stats:
+        result = key = None
+        if cache is not None and last_encoding_stage == STAGE_JPEG and not verbose:
+            with measure_stage(instrumentation, "cache_lookup"):
+                key = _cache_key(cache, y_channel, cb_channel, cr_channel, img_width, img_height, float_dtype,
+                                 quantization_table_lum, quantization_table_chrom)
+                jpeg_bitstream = cache.get(key)
+            if jpeg_bitstream is not None:
+                result = EncodingResult(img_width=img_width, img_height=img_height,
+                                        quantization_table_lum=quantization_table_lum,
+                                        quantization_table_chrom=quantization_table_chrom,
+                                        jpeg_bitstream=jpeg_bitstream)
+        if result is None:
+            result = _encode(y_channel, cb_channel, cr_channel, img_width, img_height,
+                             last_encoding_stage, verbose, float_dtype, instrumentation,
+                             quantization_table_lum, quantization_table_chrom)
+            if key is not None:
+                cache.put(key, result.jpeg_bitstream)
+    if instrumentation is not None:
+        result.stats = stats
+    return result
+
+
+def _cache_key(cache: EncodeCache, y_channel, cb_channel, cr_channel, img_width, img_height, float_dtype,
+               quantization_table_lum, quantization_table_chrom) -> str:
+    """Cache key of a complete encode: the planes plus every table and setting that shapes the output."""
+    return cache.key(
+        (y_channel, cb_channel, cr_channel), img_width, img_height,
+        quantization_table_lum=quantization_table_lum,
+        quantization_table_chrom=quantization_table_chrom,
+        huffman=STANDARD_TABLES,
+        sampling="4:4:4",
+        float_dtype=resolve_float_dtype(float_dtype, False).name,
+    )
+
+
+async def encode_async(
+    y_channel: np.ndarray,
+    cb_channel: np.ndarray,
+    cr_channel: np.ndarray,
+    img_width: int,
+    img_height: int,
+    executor=None,
+    **kwargs
+) -> EncodingResult:
+    """
+    encode() on an executor, for asyncio applications.
+
+    executor defaults to util.executor.set_default_executor() or else the event
+    loop's thread pool. The DCT, RLE and scan writer kernels release the GIL,
+    so concurrent calls on a thread pool overlap. kwargs are passed to encode().
+    """
+    return await run_in_executor(encode, y_channel, cb_channel, cr_channel, img_width, img_height,
+                                 executor=executor, **kwargs)
+
+
+def _encode(y_channel, cb_channel, cr_channel, img_width, img_height, last_encoding_stage,
+            verbose, float_dtype, instrumentation, quantization_table_lum,
+            quantization_table_chrom) -> EncodingResult:
+    """encode() body; stages are measured when instrumentation is not None."""
+    float_dtype = resolve_float_dtype(float_dtype, verbose or last_encoding_stage != STAGE_JPEG)
+    logger.info(f"Starting JPEG encoding pipeline ({float_dtype.name})")
     result = EncodingResult(img_width=img_width, img_height=img_height)
 
     # Step 1: Partition into MCUs
     logger.info("Partitioning channels into MCUs...")
-    result.mcus_y = partition(y_channel)
-    result.mcus_cb = partition(cb_channel)
-    result.mcus_cr = partition(cr_channel)
+    with measure_stage(instrumentation, "partition") as record:
+        result.mcus_y = partition(y_channel)
+        result.mcus_cb = partition(cb_channel)
+        result.mcus_cr = partition(cr_channel)
+        record.set_output(result.mcus_y, result.mcus_cb, result.mcus_cr)
     if verbose:
         print_3x3_mcus(result.mcus_y, result.mcus_cb, result.mcus_cr, "creating MCUs")
 
     if last_encoding_stage == STAGE_MCUS:
         return result
 
+    # Flat and repeated blocks: their DCT, quantization and zigzag are computed once
+    with measure_stage(instrumentation, "block_reuse"):
+        reuse_y, reuse_cb, reuse_cr = (find_block_reuse(result.mcus_y), find_block_reuse(result.mcus_cb),
+                                       find_block_reuse(result.mcus_cr))
+    result.block_reuse = {"y": reuse_y.to_dict(), "cb": reuse_cb.to_dict(), "cr": reuse_cr.to_dict()}
+    blocks = reuse_y.blocks + reuse_cb.blocks + reuse_cr.blocks
+    reused = blocks - reuse_y.distinct_blocks - reuse_cb.distinct_blocks - reuse_cr.distinct_blocks
+    logger.info(f"Block reuse: {reused / max(blocks, 1):.1%} of blocks "
+                f"({reuse_y.flat_blocks + reuse_cb.flat_blocks + reuse_cr.flat_blocks} flat, "
+                f"{reuse_y.repeated_blocks + reuse_cb.repeated_blocks + reuse_cr.repeated_blocks} repeated)")
+
     # Step 2: DCT
     logger.info("Applying DCT...")
-    result.dct_y = transform(result.mcus_y)
-    result.dct_cb = transform(result.mcus_cb)
-    result.dct_cr = transform(result.mcus_cr)
+    with measure_stage(instrumentation, "transform") as record:
+        dct_y = transform(reuse_y.select(result.mcus_y), float_dtype)
+        dct_cb = transform(reuse_cb.select(result.mcus_cb), float_dtype)
+        dct_cr = transform(reuse_cr.select(result.mcus_cr), float_dtype)
+        result.dct_y = reuse_y.expand(dct_y)
+        result.dct_cb = reuse_cb.expand(dct_cb)
+        result.dct_cr = reuse_cr.expand(dct_cr)
+        record.set_output(result.dct_y, result.dct_cb, result.dct_cr)
     if verbose:
         print_3x3_mcus(result.dct_y, result.dct_cb, result.dct_cr, "DCT")
 
@@ -58,9 +165,14 @@ def encode(
 
     # Step 3: Quantization
     logger.info("Applying quantization...")
-    result.quant_y = quantize(result.dct_y, quantization_table_lum)
-    result.quant_cb = quantize(result.dct_cb, quantization_table_chrom)
-    result.quant_cr = quantize(result.dct_cr, quantization_table_chrom)
+    with measure_stage(instrumentation, "quantize") as record:
+        quant_y = quantize(dct_y, quantization_table_lum)
+        quant_cb = quantize(dct_cb, quantization_table_chrom)
+        quant_cr = quantize(dct_cr, quantization_table_chrom)
+        result.quant_y = reuse_y.expand(quant_y)
+        result.quant_cb = reuse_cb.expand(quant_cb)
+        result.quant_cr = reuse_cr.expand(quant_cr)
+        record.set_output(result.quant_y, result.quant_cb, result.quant_cr)
     result.quantization_table_lum = quantization_table_lum
     result.quantization_table_chrom = quantization_table_chrom
     if verbose:
@@ -71,9 +183,11 @@ def encode(
 
     # Step 4: Zigzag ordering
     logger.info("Applying zigzag ordering...")
-    zigzag_y = zigzag(result.quant_y)
-    zigzag_cb = zigzag(result.quant_cb)
-    zigzag_cr = zigzag(result.quant_cr)
+    with measure_stage(instrumentation, "zigzag") as record:
+        zigzag_y = reuse_y.expand(zigzag(quant_y))
+        zigzag_cb = reuse_cb.expand(zigzag(quant_cb))
+        zigzag_cr = reuse_cr.expand(zigzag(quant_cr))
+        record.set_output(zigzag_y, zigzag_cb, zigzag_cr)
 
     # Step 5: Split DC and AC
     logger.info("Splitting DC and AC coefficients...")
@@ -89,47 +203,81 @@ def encode(
 
     # Step 6: DPCM encoding for DC
     logger.info("Applying DPCM to DC coefficients...")
-    result.dpcm_y = dpcm_encode(result.dc_y)
-    result.dpcm_cb = dpcm_encode(result.dc_cb)
-    result.dpcm_cr = dpcm_encode(result.dc_cr)
+    with measure_stage(instrumentation, "dpcm_encode") as record:
+        result.dpcm_y = dpcm_encode(result.dc_y)
+        result.dpcm_cb = dpcm_encode(result.dc_cb)
+        result.dpcm_cr = dpcm_encode(result.dc_cr)
 
     if last_encoding_stage == STAGE_DPCM:
         return result
 
-    # Step 7: RLE encoding for AC
+    # Step 7: RLE encoding for AC (tuple lists when stopping here, packed arrays for the scan writer)
     logger.info("Applying RLE to AC coefficients...")
-    result.rle_y = rle_encode_mcus(result.ac_y)
-    result.rle_cb = rle_encode_mcus(result.ac_cb)
-    result.rle_cr = rle_encode_mcus(result.ac_cr)
+    rle_encode = rle_encode_mcus if last_encoding_stage == STAGE_RLE else rle_encode_packed
+    with measure_stage(instrumentation, "rle_encode_mcus") as record:
+        result.rle_y = rle_encode(result.ac_y)
+        result.rle_cb = rle_encode(result.ac_cb)
+        result.rle_cr = rle_encode(result.ac_cr)
 
     if last_encoding_stage == STAGE_RLE:
         return result
 
+    huff_tables = STANDARD_TABLES
+    if last_encoding_stage in (STAGE_DC, STAGE_AC, STAGE_INTERLEAVER):
+        _encode_huffman_stages(result, last_encoding_stage, huff_tables, instrumentation)
+        return result
+
     # Step 8-10: Huffman encode + interleave
     logger.info("Huffman encoding and interleaving...")
-    huff_tables = {
-        "DC_Y": huffman_tables.DC_Y,
-        "AC_Y": huffman_tables.AC_Y,
-        "DC_CbCr": huffman_tables.DC_CbCr,
-        "AC_CbCr": huffman_tables.AC_CbCr
-    }
-    result.huffman_scan_bytes = build_scan_bytes_444(
-        result.dpcm_y, result.rle_y,
-        result.dpcm_cb, result.rle_cb,
-        result.dpcm_cr, result.rle_cr,
-        huff_tables
-    )
+    with measure_stage(instrumentation, "build_scan_bytes_444") as record:
+        result.huffman_scan_bytes = build_scan_bytes_444(
+            result.dpcm_y, result.rle_y,
+            result.dpcm_cb, result.rle_cb,
+            result.dpcm_cr, result.rle_cr,
+            huff_tables
+        )
+        record.set_output(result.huffman_scan_bytes)
 
     # Step 11: Build bitstream
     logger.info("Building JPEG bitstream...")
-    result.jpeg_bitstream = build_bitstream(
-        quantization_table_lum,
-        quantization_table_chrom,
-        img_height,
-        img_width,
-        huff_tables,
-        result.huffman_scan_bytes
-    )
+    with measure_stage(instrumentation, "build_bitstream") as record:
+        result.jpeg_bitstream = build_bitstream(
+            quantization_table_lum,
+            quantization_table_chrom,
+            img_height,
+            img_width,
+            huff_tables,
+            result.huffman_scan_bytes
+        )
+        record.set_output(result.jpeg_bitstream)
 
     logger.info("JPEG encoding completed successfully!")
     return result
+
+
+def _encode_huffman_stages(result: EncodingResult, last_encoding_stage: str, huff_tables, instrumentation) -> None:
+    """Staged Huffman coding (DC, AC, interleaved) into packed bit buffers with per-block bit offsets."""
+    logger.info("Huffman encoding DC coefficients...")
+    with measure_stage(instrumentation, "encode_dc_coefficients") as record:
+        result.encoded_dc_y = encode_dc_coefficients(result.dpcm_y, huff_tables["DC_Y"])
+        result.encoded_dc_cb = encode_dc_coefficients(result.dpcm_cb, huff_tables["DC_CbCr"])
+        result.encoded_dc_cr = encode_dc_coefficients(result.dpcm_cr, huff_tables["DC_CbCr"])
+        record.set_output(result.encoded_dc_y[0], result.encoded_dc_cb[0], result.encoded_dc_cr[0])
+    if last_encoding_stage == STAGE_DC:
+        return
+
+    logger.info("Huffman encoding AC coefficients...")
+    with measure_stage(instrumentation, "encode_ac_coefficients") as record:
+        result.encoded_ac_y = encode_ac_coefficients(result.rle_y, huff_tables["AC_Y"])
+        result.encoded_ac_cb = encode_ac_coefficients(result.rle_cb, huff_tables["AC_CbCr"])
+        result.encoded_ac_cr = encode_ac_coefficients(result.rle_cr, huff_tables["AC_CbCr"])
+        record.set_output(result.encoded_ac_y[0], result.encoded_ac_cb[0], result.encoded_ac_cr[0])
+    if last_encoding_stage == STAGE_AC:
+        return
+
+    logger.info("Interleaving MCUs...")
+    with measure_stage(instrumentation, "interleave_mcus") as record:
+        result.huffman_bitstream = interleave_mcus(result.encoded_dc_y, result.encoded_ac_y,
+                                                   result.encoded_dc_cb, result.encoded_ac_cb,
+                                                   result.encoded_dc_cr, result.encoded_ac_cr)
+        record.set_output(result.huffman_bitstream[0])
@@ -2,6 +2,19 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
-# Use Cython version for AC encoding
-from . import encode_ac_cy
-encode_ac_coefficients = encode_ac_cy.encode_ac_coefficients
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from .scan_writer_cy import encode_ac_packed
+
+
+def encode_ac_coefficients(rle: Union[List[List[Tuple[int, int]]], Tuple[np.ndarray, np.ndarray]],
+                           huffman_table) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Huffman encode the RLE AC coefficients of every block (tuple lists or packed (pairs, offsets)).
+
+    Returns:
+        (bits, offsets): packed uint8 bit buffer and int64 bit offsets of shape (n_blocks + 1,)
+    """
+    return encode_ac_packed(rle, huffman_table)
@@ -2,19 +2,19 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
-from typing import List
-from bitstring import BitArray
+from typing import List, Tuple, Union
 
-from util.bit_utils import bits_required, value_to_bits
-from .huffman import huffman_encode
+import numpy as np
 
+from .scan_writer_cy import encode_dc_packed
 
-def encode_dc_coefficients(dpcm: List[int], huffman_table) -> list[BitArray]:
-    """Huffman encode DC coefficients."""
-    encoded_dc = []
-    for dc_value in dpcm:
-        category = bits_required(dc_value)
-        huffman_code = huffman_encode(category, huffman_table)
-        dc_bits = value_to_bits(dc_value)
-        encoded_dc.append(huffman_code + dc_bits)
-    return encoded_dc
+
+def encode_dc_coefficients(dpcm: Union[List[int], np.ndarray], huffman_table) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Huffman encode DC coefficients.
+
+    Returns:
+        (bits, offsets): packed uint8 bit buffer and int64 bit offsets of shape (n_blocks + 1,);
+        block i owns bits offsets[i]:offsets[i + 1]
+    """
+    return encode_dc_packed(dpcm, huffman_table)
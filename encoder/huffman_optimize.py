@@ -0,0 +1,87 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Image-specific ("optimized") Huffman tables, built from the symbol statistics of a scan.
+
+Code lengths come from a Huffman tree over the symbol counts, limited to
+16 bits and kept clear of the all-ones code with the procedure of ITU T.81
+Annex K.2. Codes are assigned canonically in the order the DHT segment lists
+the symbols (by length, then by symbol), so the tables plug into the scan
+writer and build_huffman_tables like the standard ones.
+"""
+import heapq
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAX_CODE_LENGTH = 16
+
+# Magnitude category (bit length) of |value|, for every value of a baseline DPCM difference
+_CATEGORY = np.frexp(np.arange(4096))[1].astype(np.uint8)
+
+
+def dc_symbol_counts(dpcm) -> np.ndarray:
+    """Occurrences of every DC symbol (magnitude category of the DPCM difference), shape (256,)."""
+    sizes = _CATEGORY.take(np.abs(np.asarray(dpcm, dtype=np.int32)), mode="clip")
+    return np.bincount(sizes, minlength=256)
+
+
+def ac_symbol_counts(rle: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Occurrences of every AC symbol (run << 4 | size) of packed RLE pairs, shape (256,)."""
+    pairs = rle[0]
+    sizes = _CATEGORY.take(np.abs(pairs[:, 1].astype(np.int32)), mode="clip")
+    return np.bincount((pairs[:, 0] << 4) | sizes, minlength=256)
+
+
+def optimized_table(counts: np.ndarray) -> Dict[int, str]:
+    """
+    Huffman code table for symbol counts.
+
+    Args:
+        counts: Occurrences per symbol, shape (256,); symbols that never occur get no code
+
+    Returns:
+        {symbol: code bit string}, in DHT order (by code length, then symbol)
+    """
+    symbols = [int(symbol) for symbol in np.flatnonzero(counts)]
+    # A reserved symbol with the lowest count takes the longest code, so no real code is all ones
+    reserved = 256
+    heap = [(int(counts[symbol]), symbol, [symbol]) for symbol in symbols] + [(0, reserved, [reserved])]
+    heapq.heapify(heap)
+    lengths = dict.fromkeys(symbols + [reserved], 0)
+    while len(heap) > 1:
+        count_a, tie, group_a = heapq.heappop(heap)
+        count_b, _, group_b = heapq.heappop(heap)
+        for symbol in group_a + group_b:
+            lengths[symbol] += 1
+        heapq.heappush(heap, (count_a + count_b, tie, group_a + group_b))
+
+    bits = [0] * (max(lengths.values()) + 1)
+    for length in lengths.values():
+        bits[length] += 1
+    # Annex K.2 (Figure K.3): move pairs of codes longer than 16 bits up the tree
+    for length in range(len(bits) - 1, MAX_CODE_LENGTH, -1):
+        while bits[length] > 0:
+            shorter = length - 2
+            while bits[shorter] == 0:
+                shorter -= 1
+            bits[length] -= 2
+            bits[length - 1] += 1
+            bits[shorter + 1] += 2
+            bits[shorter] -= 1
+    order = sorted(lengths, key=lambda symbol: (lengths[symbol], symbol))
+    # Drop the reserved symbol, the last one of the longest length
+    order.pop()
+    bits[max(length for length, count in enumerate(bits) if count)] -= 1
+
+    table = {}
+    code = 0
+    position = 0
+    for length in range(1, min(len(bits), MAX_CODE_LENGTH + 1)):
+        for _ in range(bits[length]):
+            table[order[position]] = format(code, f"0{length}b")
+            code += 1
+            position += 1
+        code <<= 1
+    return table
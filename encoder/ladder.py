@@ -0,0 +1,89 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Quality ladders: several renditions of one image from a single colour conversion and DCT.
+
+Colour conversion, partitioning, block reuse, the DCT and the zigzag reordering
+(applied to the DCT coefficients and the quantization tables, quantization being
+elementwise) do not depend on the quality, so they run once; only quantization
+and entropy coding run per rendition. Each rendition is identical to
+encode(..., quality=q) of the same image.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from util import rgb_to_ycbcr
+from util.dct_basis import resolve_float_dtype
+from util.quantization_tables import get_quantization_tables
+from util.instrumentation import Instrumentation, active_instrumentation, measure_pipeline, measure_stage
+from .partitioning import partition
+from .block_reuse import find_block_reuse
+from .transform import transform
+from .quantization import quantize
+from .zigzag import zigzag
+from .coefficients import entropy_code
+from .bitstream_builder import build_bitstream
+
+
+def encode_ladder(
+    image: np.ndarray,
+    qualities: Sequence[Optional[int]],
+    float_dtype=None,
+    executor=None,
+    instrumentation: Optional[Instrumentation] = None
+) -> List[bytes]:
+    """
+    Encode an RGB image at several qualities.
+
+    Args:
+        image: RGB uint8 array of shape (height, width, 3)
+        qualities: Quality per rendition, 1-100 (None = unscaled Annex K tables)
+        float_dtype: Colour conversion and DCT precision (default float32, as encode())
+        executor: Optional concurrent.futures executor to encode the renditions in parallel
+            (a thread pool overlaps well: the RLE and scan writer kernels release the GIL)
+        instrumentation: Times the shared stages and the renditions (see encode())
+
+    Returns:
+        JPEG bytes per quality, in the order of qualities
+    """
+    if image.ndim != 3 or image.shape[2] != 3:
+        raise ValueError(f"Expected an RGB image of shape (height, width, 3), got {image.shape}")
+    img_height, img_width = image.shape[:2]
+    tables = [get_quantization_tables(quality) for quality in qualities]
+    float_dtype = resolve_float_dtype(float_dtype, False)
+    instrumentation = active_instrumentation(instrumentation)
+
+    with measure_pipeline(instrumentation, "encode_ladder", img_width * img_height):
+        with measure_stage(instrumentation, "rgb_to_ycbcr"):
+            ycbcr = rgb_to_ycbcr(image, float_dtype)
+        with measure_stage(instrumentation, "partition"):
+            mcus = [partition(ycbcr[:, :, c]) for c in range(3)]
+        with measure_stage(instrumentation, "block_reuse"):
+            reuses = [find_block_reuse(blocks) for blocks in mcus]
+        with measure_stage(instrumentation, "transform"):
+            dcts = [transform(reuse.select(blocks), float_dtype) for reuse, blocks in zip(reuses, mcus)]
+        with measure_stage(instrumentation, "zigzag"):
+            dcts = [zigzag(dct) for dct in dcts]
+
+        with measure_stage(instrumentation, "renditions") as record:
+            if executor is None:
+                renditions = [_rendition(dcts, reuses, lum, chrom, img_width, img_height) for lum, chrom in tables]
+            else:
+                futures = [executor.submit(_rendition, dcts, reuses, lum, chrom, img_width, img_height)
+                           for lum, chrom in tables]
+                renditions = [future.result() for future in futures]
+            record.set_output(*renditions)
+    return renditions
+
+
+def _rendition(dcts, reuses, quantization_table_lum, quantization_table_chrom, img_width, img_height) -> bytes:
+    """Quantize and entropy code the shared zigzag-ordered DCT coefficients with one pair of tables."""
+    zigzag_lum = zigzag(quantization_table_lum[None])[0]
+    zigzag_chrom = zigzag(quantization_table_chrom[None])[0]
+    zigzags = [reuse.expand(quantize(dct, table))
+               for dct, reuse, table in zip(dcts, reuses, (zigzag_lum, zigzag_chrom, zigzag_chrom))]
+    scan, huff_tables = entropy_code(zigzags)
+    return build_bitstream(quantization_table_lum, quantization_table_chrom, img_height, img_width,
+                           huff_tables, scan)
@@ -0,0 +1,209 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Motion-JPEG encoding: a session that only recomputes the blocks that changed.
+
+MJPEGEncoder keeps the pixels each block was last encoded from and the
+zigzagged quantized coefficients of every block. A new frame is compared with
+those reference pixels block by block; only changed blocks go through colour
+conversion, DCT, quantization and zigzag, then the whole frame is entropy coded
+from the merged coefficient buffers. With threshold=0 every frame is identical
+to encode() of rgb_to_ycbcr(frame) at the same float_dtype.
+"""
+from typing import BinaryIO, Dict, Iterable, Optional
+
+import numpy as np
+
+from util import rgb_to_ycbcr
+from util.dct_basis import resolve_float_dtype
+from util.quantization_tables import get_quantization_tables
+from .block_reuse import find_block_reuse
+from .transform import transform
+from .quantization import quantize
+from .zigzag import zigzag
+from .coefficients import entropy_code
+from .bitstream_builder import build_bitstream
+
+MJPEG_CONTAINERS = ("multipart", "concatenated")
+
+
+class MJPEGEncoder:
+    """
+    Encode a sequence of equally sized RGB frames, reusing unchanged blocks.
+
+    Args:
+        width: Frame width
+        height: Frame height
+        threshold: A block is re-encoded when a sample differs from its reference by
+            more than this (0 = any change; raise it for noisy camera sensors, the
+            reference is only updated when a block is re-encoded, so drift cannot add up)
+        float_dtype: Colour conversion and DCT precision (default float32, as encode())
+        quality: JPEG quality 1-100 (see encode())
+    """
+
+    def __init__(self, width: int, height: int, threshold: int = 0, float_dtype=None, quality=None):
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid frame size {width}x{height}")
+        if not 0 <= threshold < 255:
+            raise ValueError("threshold must be in [0, 255)")
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.float_dtype = resolve_float_dtype(float_dtype, False)
+        self._quant_tables = get_quantization_tables(quality)
+        self._blocks_y = (height + 7) // 8
+        self._blocks_x = (width + 7) // 8
+        self.frames = 0
+        self.blocks_recomputed = 0
+        self.last_changed_blocks = 0
+        self.reset()
+
+    @property
+    def blocks(self) -> int:
+        """Blocks per component and frame."""
+        return self._blocks_y * self._blocks_x
+
+    def reset(self) -> None:
+        """Forget the previous frame: the next frame is encoded in full (e.g. after a scene cut)."""
+        self._reference = None
+        self._coefficients = [np.zeros((self.blocks, 64), dtype=np.int16) for _ in range(3)]
+
+    def stats(self) -> Dict:
+        """Frames encoded, blocks recomputed and the share of blocks reused so far."""
+        total = self.frames * self.blocks
+        return {
+            "frames": self.frames,
+            "blocks": total,
+            "blocks_recomputed": self.blocks_recomputed,
+            "reuse_rate": 1.0 - self.blocks_recomputed / total if total else 0.0,
+            "last_changed_blocks": self.last_changed_blocks,
+        }
+
+    def encode_frame(self, rgb: np.ndarray) -> bytes:
+        """
+        Encode one frame.
+
+        Args:
+            rgb: RGB uint8 array of shape (height, width, 3)
+
+        Returns:
+            Baseline JPEG bytes
+        """
+        if rgb.shape != (self.height, self.width, 3):
+            raise ValueError(f"Expected a frame of shape {(self.height, self.width, 3)}, got {rgb.shape}")
+        frame = self._pad(np.asarray(rgb, dtype=np.uint8))
+
+        if self._reference is None:
+            changed = np.arange(self.blocks)
+            self._reference = frame.copy() if frame is rgb else frame
+        else:
+            changed = np.flatnonzero(self._changed_blocks(frame))
+        if changed.size:
+            self._update_blocks(frame, changed)
+
+        self.frames += 1
+        self.blocks_recomputed += changed.size
+        self.last_changed_blocks = changed.size
+        return self._entropy_code()
+
+    def _pad(self, rgb: np.ndarray) -> np.ndarray:
+        """Edge-pad to whole blocks, as partition() does."""
+        pad_h = self._blocks_y * 8 - self.height
+        pad_w = self._blocks_x * 8 - self.width
+        if pad_h or pad_w:
+            return np.pad(rgb, ((0, pad_h), (0, pad_w), (0, 0)), mode="edge")
+        return np.ascontiguousarray(rgb)
+
+    def _block_view(self, frame: np.ndarray) -> np.ndarray:
+        """(blocks_y, 8, blocks_x, 8, 3) view of a padded frame."""
+        return frame.reshape(self._blocks_y, 8, self._blocks_x, 8, 3)
+
+    def _changed_blocks(self, frame: np.ndarray) -> np.ndarray:
+        """Flat boolean mask of the blocks that differ from their reference pixels."""
+        rows = (self._blocks_y, 8, self._blocks_x, 24)
+        if self.threshold == 0:
+            differs = (frame != self._reference).reshape(rows)
+        else:
+            differs = (np.abs(frame.astype(np.int16) - self._reference) > self.threshold).reshape(rows)
+        return differs.any(axis=(1, 3)).reshape(-1)
+
+    def _update_blocks(self, frame: np.ndarray, changed: np.ndarray) -> None:
+        """Colour convert, transform, quantize and zigzag the changed blocks into the coefficient buffers."""
+        by, bx = np.divmod(changed, self._blocks_x)
+        pixels = self._block_view(frame)[by, :, bx]  # (k, 8, 8, 3)
+        if self._reference is not frame:
+            self._block_view(self._reference)[by, :, bx] = pixels
+
+        ycbcr = rgb_to_ycbcr(pixels.reshape(-1, 8, 3), self.float_dtype).reshape(-1, 8, 8, 3)
+        lum, chrom = self._quant_tables
+        tables = (lum, chrom, chrom)
+        for c in range(3):
+            mcus = ycbcr[..., c].astype(np.int16)
+            reuse = find_block_reuse(mcus)
+            coefficients = quantize(transform(reuse.select(mcus), self.float_dtype), tables[c])
+            self._coefficients[c][changed] = reuse.expand(zigzag(coefficients))
+
+    def _entropy_code(self) -> bytes:
+        scan, huff_tables = entropy_code(self._coefficients)
+        return build_bitstream(*self._quant_tables, self.height, self.width, huff_tables, scan)
+
+
+class MJPEGWriter:
+    """
+    Write JPEG frames as an MJPEG stream.
+
+    container "multipart" writes multipart/x-mixed-replace parts (the format
+    browsers and IP cameras use for MJPEG over HTTP; send content_type as the
+    response Content-Type), "concatenated" writes the JPEGs back to back (.mjpeg
+    files, readable by ffmpeg).
+    """
+
+    def __init__(self, fileobj: BinaryIO, container: str = "multipart", boundary: str = "jpegframe"):
+        if container not in MJPEG_CONTAINERS:
+            raise ValueError(f"Unknown MJPEG container '{container}', expected one of {MJPEG_CONTAINERS}")
+        self.fileobj = fileobj
+        self.container = container
+        self.boundary = boundary
+
+    @property
+    def content_type(self) -> str:
+        if self.container == "multipart":
+            return f"multipart/x-mixed-replace; boundary={self.boundary}"
+        return "video/x-motion-jpeg"
+
+    def write(self, jpeg: bytes) -> None:
+        if self.container == "multipart":
+            self.fileobj.write(f"--{self.boundary}\r\nContent-Type: image/jpeg\r\n"
+                               f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+            self.fileobj.write(jpeg)
+            self.fileobj.write(b"\r\n")
+        else:
+            self.fileobj.write(jpeg)
+
+
+def encode_mjpeg(frames: Iterable[np.ndarray], fileobj: BinaryIO, container: str = "multipart",
+                 threshold: int = 0, float_dtype=None, boundary: str = "jpegframe",
+                 quality=None) -> Optional[Dict]:
+    """
+    Encode RGB frames into an MJPEG stream.
+
+    Args:
+        frames: RGB uint8 frames of equal size
+        fileobj: Binary file or socket-like object to write to
+        container: "multipart" (multipart/x-mixed-replace) or "concatenated"
+        threshold: Change threshold per sample (see MJPEGEncoder)
+        float_dtype: Colour conversion and DCT precision
+        boundary: Multipart boundary
+        quality: JPEG quality 1-100 (see encode())
+
+    Returns:
+        Session statistics (MJPEGEncoder.stats()), None if there were no frames
+    """
+    writer = MJPEGWriter(fileobj, container, boundary)
+    session = None
+    for frame in frames:
+        if session is None:
+            session = MJPEGEncoder(frame.shape[1], frame.shape[0], threshold, float_dtype, quality)
+        writer.write(session.encode_frame(frame))
+    return session.stats() if session is not None else None
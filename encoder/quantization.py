@@ -6,7 +6,13 @@ import numpy as np
 
 
 def quantize(mcu_array: np.ndarray, quantization_table: np.ndarray) -> np.ndarray:
-    """Quantize DCT coefficients using quantization table."""
+    """Quantize DCT coefficients using quantization table (in the precision of floating point input)."""
+    if np.issubdtype(mcu_array.dtype, np.floating):
+        quantization_table = quantization_table.astype(mcu_array.dtype, copy=False)
     x = mcu_array / quantization_table
-    q = np.sign(x) * np.floor(np.abs(x) + 0.5)
+    # sign(x) * floor(|x| + 0.5), rounding half away from zero, in one temporary
+    q = np.abs(x)
+    q += 0.5
+    np.floor(q, out=q)
+    np.copysign(q, x, out=q)
     return q.astype(np.int16)
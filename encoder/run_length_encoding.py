@@ -8,3 +8,4 @@ from typing import List, Tuple
 # Use Cython optimized version
 from . import run_length_encoding_cy
 rle_encode_mcus = run_length_encoding_cy.rle_encode_mcus
+rle_encode_packed = run_length_encoding_cy.rle_encode_packed
@@ -2,6 +2,9 @@
 """
 Cython-optimized RLE (Run-Length Encoding) for JPEG AC coefficients
 Matches run_length_encoding.py logic but with Cython optimizations
+
+The run/value scan runs without the GIL into a packed (pairs, offsets) form;
+only building the per-MCU tuple lists needs it.
 """
 
 import numpy as np
@@ -10,6 +13,100 @@ cimport cython
 
 ctypedef np.int32_t INT32
 
+cdef enum:
+    # Worst case per block: 63 nonzero coefficients (ZRLs only precede nonzero ones) + EOB
+    MAX_PAIRS = 64
+
+
+ctypedef fused Coefficient:
+    short
+    INT32
+
+
+cdef Py_ssize_t _rle_block(const Coefficient* row, short* pairs) noexcept nogil:
+    """RLE of one block of 63 AC coefficients into (run, value) pairs, returns the pair count."""
+    cdef int last_nz = 62
+    cdef int z = 0
+    cdef int k
+    cdef Py_ssize_t count = 0
+
+    while last_nz >= 0 and row[last_nz] == 0:
+        last_nz -= 1
+    if last_nz < 0:
+        pairs[0] = 0  # komplett null -> nur EOB
+        pairs[1] = 0
+        return 1
+
+    for k in range(last_nz + 1):
+        if row[k] == 0:
+            z += 1
+            if z == 16:
+                pairs[2 * count] = 15  # ZRL
+                pairs[2 * count + 1] = 0
+                count += 1
+                z = 0
+        else:
+            pairs[2 * count] = z
+            pairs[2 * count + 1] = <short>row[k]
+            count += 1
+            z = 0
+
+    # EOB wenn trailing zeros existieren
+    if last_nz < 62:
+        pairs[2 * count] = 0
+        pairs[2 * count + 1] = 0
+        count += 1
+    return count
+
+
+cdef Py_ssize_t _rle_blocks(const Coefficient* ac, Py_ssize_t n, Py_ssize_t row_stride,
+                            short[:, ::1] pairs, Py_ssize_t[::1] offsets) noexcept nogil:
+    cdef Py_ssize_t m
+    cdef Py_ssize_t total = 0
+    offsets[0] = 0
+    for m in range(n):
+        total += _rle_block(ac + m * row_stride, &pairs[total, 0])
+        offsets[m + 1] = total
+    return total
+
+
+def rle_encode_packed(ac_coefficients_array):
+    """
+    RLE of (n_mcus, 63) AC coefficients in packed form, computed without the GIL.
+
+    int16 and int32 arrays whose rows are contiguous (e.g. zigzag[:, 1:]) are read in place,
+    anything else is converted to a contiguous int32 array first.
+
+    Returns:
+        (pairs, offsets): int16 array of shape (n_pairs, 2) holding (zero_run, ac_value),
+        and int64 offsets of shape (n_mcus + 1,); block m owns pairs[offsets[m]:offsets[m + 1]]
+    """
+    cdef const short[:, :] ac16
+    cdef const INT32[:, :] ac32
+    ac = ac_coefficients_array
+    if (not isinstance(ac, np.ndarray) or ac.dtype not in (np.int16, np.int32)
+            or ac.ndim != 2 or ac.strides[1] != ac.itemsize or ac.strides[0] % ac.itemsize):
+        ac = np.ascontiguousarray(ac, dtype=np.int32)
+    if ac.ndim != 2 or ac.shape[1] != 63:
+        raise ValueError(f"AC coefficients must have shape (n, 63), got {ac.shape}")
+    cdef Py_ssize_t n = ac.shape[0]
+    pairs = np.empty((n * MAX_PAIRS, 2), dtype=np.int16)
+    offsets = np.empty(n + 1, dtype=np.intp)
+    cdef short[:, ::1] pairs_view = pairs
+    cdef Py_ssize_t[::1] offsets_view = offsets
+    cdef Py_ssize_t total = 0
+    if n == 0:
+        offsets_view[0] = 0
+    elif ac.dtype == np.int16:
+        ac16 = ac
+        with nogil:
+            total = _rle_blocks(&ac16[0, 0], n, ac16.strides[0] // sizeof(short), pairs_view, offsets_view)
+    else:
+        ac32 = ac
+        with nogil:
+            total = _rle_blocks(&ac32[0, 0], n, ac32.strides[0] // sizeof(INT32), pairs_view, offsets_view)
+    return pairs[:total], offsets
+
 
 def rle_encode_mcus(ac_coefficients_array):
     """
@@ -17,50 +114,8 @@ def rle_encode_mcus(ac_coefficients_array):
     Takes array of shape (n_mcus, 63) and returns list of RLE-encoded MCUs
     Each MCU is list of (zero_run, ac_value) tuples
     """
-    
-    cdef np.ndarray[INT32, ndim=2] ac = np.asarray(ac_coefficients_array, dtype=np.int32)
-    
-    # Ensure integer dtype
-    if ac.dtype.kind not in ("i", "u"):
-        ac = ac.astype(np.int32, copy=False)
-
-    cdef int n_mcus = ac.shape[0]
-    result = [None] * n_mcus  # Schneller als append
-
-    cdef int m, last_nz, z, coeff
-    cdef list row, out
-
-    for m in range(n_mcus):
-        # 1) Einmal pro MCU nach Python-ints konvertieren
-        row = ac[m].tolist()   # Länge 63
-
-        # 2) last_nz schneller: while rückwärts
-        last_nz = 62
-        while last_nz >= 0 and row[last_nz] == 0:
-            last_nz -= 1
-
-        if last_nz < 0:
-            result[m] = [(0, 0)]  # komplett null -> nur EOB
-            continue
-
-        out = []
-        z = 0
-
-        # 3) Nur bis last_nz iterieren
-        for coeff in row[:last_nz + 1]:
-            if coeff == 0:
-                z += 1
-                if z == 16:
-                    out.append((15, 0))  # ZRL
-                    z = 0
-            else:
-                out.append((z, coeff))
-                z = 0
-
-        # 4) EOB wenn trailing zeros existieren
-        if last_nz < 62:
-            out.append((0, 0))
-
-        result[m] = out
-
-    return result
+    pairs, offsets = rle_encode_packed(ac_coefficients_array)
+    cdef list flat = list(zip(*pairs.T.tolist()))
+    cdef Py_ssize_t[::1] bounds = offsets
+    cdef Py_ssize_t m
+    return [flat[bounds[m]:bounds[m + 1]] for m in range(bounds.shape[0] - 1)]
@@ -3,4 +3,4 @@ Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
 # Use Cython-optimized version
-from .scan_writer_cy import build_scan_bytes_444
+from .scan_writer_cy import build_scan_bytes_444, build_scan_bytes
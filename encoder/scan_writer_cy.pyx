@@ -1,38 +1,58 @@
 # encoder/scan_writer_cy.pyx
 # cython: language_level=3
 # cython: boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+"""
+Huffman coding of an interleaved scan (4:4:4, or any sampling with build_scan_bytes).
 
-cdef class BitWriterCy:
-    cdef bytearray out
-    cdef unsigned long long buf
-    cdef int nbits
-
-    def __cinit__(self):
-        self.out = bytearray()
-        self.buf = 0
-        self.nbits = 0
-
-    cdef inline void write_bits(self, unsigned int code, int clen):
-        self.buf = (self.buf << clen) | code
-        self.nbits += clen
-        while self.nbits >= 8:
-            self.nbits -= 8
-            b = (self.buf >> self.nbits) & 0xFF
-            self.out.append(b)
-            # Byte stuffing
-            if b == 0xFF:
-                self.out.append(0x00)
-
-    cdef inline void flush_one(self):
-        cdef int r = self.nbits & 7
-        if r:
-            # pad with 1s to next byte boundary
-            self.write_bits((1 << (8 - r)) - 1, 8 - r)
-
-    def get_bytes(self):
-        return bytes(self.out)
-
-cdef inline int mag_size(int v):
+The bit writing runs without the GIL into a preallocated buffer, so scans of
+several images can be written concurrently from a thread pool. RLE data comes
+packed from rle_encode_packed (per-MCU tuple lists are packed first).
+
+The staged pipeline's Huffman stages (DC, AC, interleaved) use the same writer
+without byte stuffing: each is one packed bit buffer (uint8, MSB first) plus an
+int64 index of bit offsets, block i owning bits offsets[i]:offsets[i + 1].
+"""
+
+import numpy as np
+
+cdef enum:
+    NUM_TABLES = 4      # DC_Y, AC_Y, DC_CbCr, AC_CbCr
+    # Upper bound of bits per Huffman symbol: 16-bit code + 16 magnitude bits
+    MAX_SYMBOL_BITS = 32
+
+cdef struct CodeTables:
+    unsigned int codes[NUM_TABLES][256]
+    unsigned char lens[NUM_TABLES][256]
+
+cdef struct BitSink:
+    unsigned char* out
+    Py_ssize_t pos
+    unsigned long long buf
+    int nbits
+    bint stuff          # JPEG byte stuffing (scan data); off for packed stage buffers
+
+
+cdef inline void write_bits(BitSink* sink, unsigned int code, int clen) noexcept nogil:
+    cdef unsigned char b
+    sink.buf = (sink.buf << clen) | code
+    sink.nbits += clen
+    while sink.nbits >= 8:
+        sink.nbits -= 8
+        b = (sink.buf >> sink.nbits) & 0xFF
+        sink.out[sink.pos] = b
+        sink.pos += 1
+        # Byte stuffing
+        if b == 0xFF and sink.stuff:
+            sink.out[sink.pos] = 0x00
+            sink.pos += 1
+
+cdef inline void flush_one(BitSink* sink) noexcept nogil:
+    cdef int r = sink.nbits & 7
+    if r:
+        # pad with 1s to next byte boundary
+        write_bits(sink, (1 << (8 - r)) - 1, 8 - r)
+
+cdef inline int mag_size(int v) noexcept nogil:
     cdef int a = v if v >= 0 else -v
     cdef int s = 0
     while a:
@@ -40,20 +60,88 @@ cdef inline int mag_size(int v):
         s += 1
     return s
 
-cdef inline unsigned int neg_ampl(int v, int size):
+cdef inline unsigned int neg_ampl(int v, int size) noexcept nogil:
     # (2^size - 1 + v), v is negative
     return ((1 << size) - 1 + v)
 
-cdef inline void build_codes_lens(dict huff_tbl, list codes, list lens):
+cdef void build_codes_lens(dict huff_tbl, CodeTables* tables, int t):
     cdef int sym
     cdef object bitstr
+    for sym in range(256):
+        tables.codes[t][sym] = 0
+        tables.lens[t][sym] = 0
     for sym, bitstr in huff_tbl.items():
         if bitstr:
-            codes[sym] = int(bitstr, 2)
-            lens[sym]  = len(bitstr)
+            tables.codes[t][sym] = int(bitstr, 2)
+            tables.lens[t][sym] = len(bitstr)
+
+cdef inline void write_block(BitSink* sink, const CodeTables* tables, int dc, int ac,
+                             int diff, const short* pairs, Py_ssize_t count) noexcept nogil:
+    cdef Py_ssize_t p
+    cdef int size, sym, zr, v
+
+    # ---- DC ----
+    size = mag_size(diff)
+    write_bits(sink, tables.codes[dc][size], tables.lens[dc][size])
+    if size:
+        write_bits(sink, diff if diff > 0 else neg_ampl(diff, size), size)
+
+    # ---- AC ----
+    for p in range(count):
+        zr = pairs[2 * p]
+        v = pairs[2 * p + 1]
+        if v == 0:
+            sym = zr << 4
+            write_bits(sink, tables.codes[ac][sym], tables.lens[ac][sym])
         else:
-            codes[sym] = 0
-            lens[sym]  = 0
+            size = mag_size(v)
+            sym = (zr << 4) | size
+            write_bits(sink, tables.codes[ac][sym], tables.lens[ac][sym])
+            write_bits(sink, v if v > 0 else neg_ampl(v, size), size)
+
+cdef Py_ssize_t write_scan(BitSink* sink, const CodeTables* tables, Py_ssize_t n, const int* blocks_per_mcu,
+                           const int** dpcm, const short** pairs, const Py_ssize_t** offsets) noexcept nogil:
+    cdef Py_ssize_t i, b, start
+    cdef int c
+    for i in range(n):
+        for c in range(3):
+            # Y uses tables 0/1, Cb and Cr share 2/3; a component's blocks of an MCU are consecutive
+            for b in range(i * blocks_per_mcu[c], (i + 1) * blocks_per_mcu[c]):
+                start = offsets[c][b]
+                write_block(sink, tables, 0 if c == 0 else 2, 1 if c == 0 else 3,
+                            dpcm[c][b], pairs[c] + 2 * start, offsets[c][b + 1] - start)
+    flush_one(sink)
+    return sink.pos
+
+
+def pack_rle(rle):
+    """
+    Per-MCU (zero_run, ac_value) lists -> (pairs, offsets) as produced by rle_encode_packed.
+
+    An already packed (pairs, offsets) tuple is returned unchanged.
+    """
+    if isinstance(rle, tuple) and len(rle) == 2 and isinstance(rle[0], np.ndarray):
+        return rle
+    cdef Py_ssize_t n = len(rle)
+    cdef Py_ssize_t total = 0
+    cdef Py_ssize_t m, p
+    cdef int zr, v
+    offsets = np.empty(n + 1, dtype=np.intp)
+    cdef Py_ssize_t[::1] offset_view = offsets
+    offset_view[0] = 0
+    for m in range(n):
+        total += len(rle[m])
+        offset_view[m + 1] = total
+    pairs = np.empty((total, 2), dtype=np.int16)
+    cdef short[:, ::1] pair_view = pairs
+    p = 0
+    for block in rle:
+        for zr, v in block:
+            pair_view[p, 0] = zr
+            pair_view[p, 1] = v
+            p += 1
+    return pairs, offsets
+
 
 def build_scan_bytes_444(
     dpcm_y, rle_y,
@@ -64,81 +152,240 @@ def build_scan_bytes_444(
     """
     Same signature as Python build_scan_bytes_444(..., huff_tables)
     Returns already byte-stuffed scan bytes.
+
+    rle_* may be per-MCU tuple lists or packed (pairs, offsets) from
+    rle_encode_packed; the latter skips the only GIL-holding step.
     """
-    cdef BitWriterCy bw = BitWriterCy()
-    cdef Py_ssize_t n = len(dpcm_y)
-    cdef Py_ssize_t i
-    cdef int diff, zr, v, size, sym
+    return build_scan_bytes((dpcm_y, dpcm_cb, dpcm_cr), (rle_y, rle_cb, rle_cr), (1, 1, 1), huff_tables)
+
+
+def build_scan_bytes(dpcm, rle, blocks_per_mcu, huff_tables):
+    """
+    Huffman code an interleaved Y, Cb, Cr scan with any sampling.
+
+    Args:
+        dpcm: DPCM DC differences per component, blocks in scan order
+        rle: Per-block tuple lists or packed (pairs, offsets) per component, blocks in scan order
+        blocks_per_mcu: Blocks of each component per MCU (h * v), consecutive in dpcm and rle
+        huff_tables: DC_Y, AC_Y, DC_CbCr and AC_CbCr code tables
+
+    Returns:
+        Byte-stuffed scan bytes
+    """
+    cdef CodeTables tables
+    cdef BitSink sink
+    cdef const int* dpcm_ptrs[3]
+    cdef const short* pair_ptrs[3]
+    cdef const Py_ssize_t* offset_ptrs[3]
+    cdef int block_counts[3]
+    cdef const int[::1] dpcm_view
+    cdef const short[:, ::1] pair_view
+    cdef const Py_ssize_t[::1] offset_view
+    cdef unsigned char[::1] out_view
+    cdef Py_ssize_t n = len(dpcm[0]) // blocks_per_mcu[0]
+    cdef Py_ssize_t symbols = 0
+    cdef Py_ssize_t size, blocks
+    cdef int c
 
     # Build (code,lens) arrays once per call
-    cdef list dc_y_codes = [0]*256
-    cdef list dc_y_lens  = [0]*256
-    cdef list ac_y_codes = [0]*256
-    cdef list ac_y_lens  = [0]*256
-    cdef list dc_c_codes = [0]*256
-    cdef list dc_c_lens  = [0]*256
-    cdef list ac_c_codes = [0]*256
-    cdef list ac_c_lens  = [0]*256
-
-    build_codes_lens(huff_tables["DC_Y"],     dc_y_codes, dc_y_lens)
-    build_codes_lens(huff_tables["AC_Y"],     ac_y_codes, ac_y_lens)
-    build_codes_lens(huff_tables["DC_CbCr"],  dc_c_codes, dc_c_lens)
-    build_codes_lens(huff_tables["AC_CbCr"],  ac_c_codes, ac_c_lens)
+    build_codes_lens(huff_tables["DC_Y"], &tables, 0)
+    build_codes_lens(huff_tables["AC_Y"], &tables, 1)
+    build_codes_lens(huff_tables["DC_CbCr"], &tables, 2)
+    build_codes_lens(huff_tables["AC_CbCr"], &tables, 3)
 
-    for i in range(n):
-        # ---- Y DC ----
-        diff = dpcm_y[i]
-        size = mag_size(diff)
-        bw.write_bits(dc_y_codes[size], dc_y_lens[size])
-        if size:
-            bw.write_bits(diff if diff > 0 else neg_ampl(diff, size), size)
-
-        # ---- Y AC ----
-        for zr, v in rle_y[i]:
-            if v == 0:
-                sym = zr << 4
-                bw.write_bits(ac_y_codes[sym], ac_y_lens[sym])
-            else:
-                size = mag_size(v)
-                sym = (zr << 4) | size
-                bw.write_bits(ac_y_codes[sym], ac_y_lens[sym])
-                bw.write_bits(v if v > 0 else neg_ampl(v, size), size)
-
-        # ---- Cb DC ----
-        diff = dpcm_cb[i]
-        size = mag_size(diff)
-        bw.write_bits(dc_c_codes[size], dc_c_lens[size])
-        if size:
-            bw.write_bits(diff if diff > 0 else neg_ampl(diff, size), size)
-
-        # ---- Cb AC ----
-        for zr, v in rle_cb[i]:
-            if v == 0:
-                sym = zr << 4
-                bw.write_bits(ac_c_codes[sym], ac_c_lens[sym])
-            else:
-                size = mag_size(v)
-                sym = (zr << 4) | size
-                bw.write_bits(ac_c_codes[sym], ac_c_lens[sym])
-                bw.write_bits(v if v > 0 else neg_ampl(v, size), size)
-
-        # ---- Cr DC ----
-        diff = dpcm_cr[i]
-        size = mag_size(diff)
-        bw.write_bits(dc_c_codes[size], dc_c_lens[size])
-        if size:
-            bw.write_bits(diff if diff > 0 else neg_ampl(diff, size), size)
-
-        # ---- Cr AC ----
-        for zr, v in rle_cr[i]:
-            if v == 0:
-                sym = zr << 4
-                bw.write_bits(ac_c_codes[sym], ac_c_lens[sym])
-            else:
+    # Keep the packed arrays alive while their pointers are used
+    arrays = []
+    for c in range(3):
+        block_counts[c] = blocks_per_mcu[c]
+        blocks = n * block_counts[c]
+        component_dpcm = np.ascontiguousarray(dpcm[c], dtype=np.int32)
+        pairs, offsets = pack_rle(rle[c])
+        pairs = np.ascontiguousarray(pairs, dtype=np.int16)
+        offsets = np.ascontiguousarray(offsets, dtype=np.intp)
+        if len(component_dpcm) != blocks or len(offsets) != blocks + 1:
+            raise ValueError("DC and AC data of all components must cover the same number of MCUs")
+        arrays.append((component_dpcm, pairs, offsets))
+        dpcm_view = component_dpcm
+        pair_view = pairs
+        offset_view = offsets
+        dpcm_ptrs[c] = &dpcm_view[0] if blocks else NULL
+        pair_ptrs[c] = &pair_view[0, 0] if pairs.shape[0] else NULL
+        offset_ptrs[c] = &offset_view[0]
+        symbols += blocks + pairs.shape[0]
+
+    # Every symbol fits in MAX_SYMBOL_BITS; stuffing at most doubles the bytes
+    out = np.empty(2 * (symbols * MAX_SYMBOL_BITS // 8) + 2, dtype=np.uint8)
+    out_view = out
+    sink.out = &out_view[0]
+    sink.pos = 0
+    sink.buf = 0
+    sink.nbits = 0
+    sink.stuff = True
+    with nogil:
+        size = write_scan(&sink, &tables, n, block_counts, dpcm_ptrs, pair_ptrs, offset_ptrs)
+    return out[:size].tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Packed Huffman stages of the staged pipeline (no byte stuffing)
+# ---------------------------------------------------------------------------
+
+cdef inline void init_packed_sink(BitSink* sink, unsigned char* out) noexcept:
+    sink.out = out
+    sink.pos = 0
+    sink.buf = 0
+    sink.nbits = 0
+    sink.stuff = False
+
+cdef inline Py_ssize_t bit_position(const BitSink* sink) noexcept nogil:
+    return sink.pos * 8 + sink.nbits
+
+cdef inline void flush_zeros(BitSink* sink) noexcept nogil:
+    cdef int r = sink.nbits & 7
+    if r:
+        write_bits(sink, 0, 8 - r)
+
+cdef inline unsigned int peek_bits(const unsigned char* data, Py_ssize_t nbytes,
+                                   Py_ssize_t pos, int n) noexcept nogil:
+    """Next n (1..24) bits at bit position pos, zeros past the end."""
+    cdef Py_ssize_t byte = pos >> 3
+    cdef unsigned int word = 0
+    cdef int k
+    for k in range(4):
+        word <<= 8
+        if byte + k < nbytes:
+            word |= data[byte + k]
+    return (word << (pos & 7)) >> (32 - n)
+
+cdef inline void copy_bits(BitSink* sink, const unsigned char* data, Py_ssize_t nbytes,
+                           Py_ssize_t start, Py_ssize_t stop) noexcept nogil:
+    cdef int n
+    while start < stop:
+        n = 16 if stop - start > 16 else <int>(stop - start)
+        write_bits(sink, peek_bits(data, nbytes, start, n), n)
+        start += n
+
+
+def encode_dc_packed(dpcm, huffman_table):
+    """
+    Huffman code DPCM DC differences into a packed bit buffer.
+
+    Returns:
+        (bits, offsets): uint8 buffer and int64 bit offsets of shape (n_blocks + 1,)
+    """
+    cdef CodeTables tables
+    cdef BitSink sink
+    cdef unsigned char[::1] out_view
+    build_codes_lens(huffman_table, &tables, 0)
+    cdef const int[::1] diffs = np.ascontiguousarray(dpcm, dtype=np.int32)
+    cdef Py_ssize_t n = diffs.shape[0]
+    cdef Py_ssize_t i
+    cdef int diff, size
+    offsets = np.empty(n + 1, dtype=np.int64)
+    cdef long long[::1] offset_view = offsets
+    # Every difference takes at most a 16-bit code + 16 magnitude bits
+    out = np.empty(n * MAX_SYMBOL_BITS // 8 + 8, dtype=np.uint8)
+    out_view = out
+    init_packed_sink(&sink, &out_view[0])
+    with nogil:
+        for i in range(n):
+            offset_view[i] = bit_position(&sink)
+            diff = diffs[i]
+            size = mag_size(diff)
+            write_bits(&sink, tables.codes[0][size], tables.lens[0][size])
+            if size:
+                write_bits(&sink, diff if diff > 0 else neg_ampl(diff, size), size)
+        offset_view[n] = bit_position(&sink)
+        flush_zeros(&sink)
+    return out[:sink.pos].copy(), offsets
+
+
+def encode_ac_packed(rle, huffman_table):
+    """
+    Huffman code the AC (run, value) pairs of every block into a packed bit buffer.
+
+    rle may be per-MCU tuple lists or packed (pairs, offsets) from rle_encode_packed.
+
+    Returns:
+        (bits, offsets): uint8 buffer and int64 bit offsets of shape (n_blocks + 1,)
+    """
+    cdef CodeTables tables
+    cdef BitSink sink
+    cdef unsigned char[::1] out_view
+    build_codes_lens(huffman_table, &tables, 0)
+    pairs, rle_offsets = pack_rle(rle)
+    cdef const short[:, ::1] pair_view = np.ascontiguousarray(pairs, dtype=np.int16)
+    cdef const Py_ssize_t[::1] rle_view = np.ascontiguousarray(rle_offsets, dtype=np.intp)
+    cdef Py_ssize_t n = rle_view.shape[0] - 1
+    cdef Py_ssize_t i, p
+    cdef int size, sym, zr, v
+    offsets = np.empty(n + 1, dtype=np.int64)
+    cdef long long[::1] offset_view = offsets
+    out = np.empty(pair_view.shape[0] * MAX_SYMBOL_BITS // 8 + 8, dtype=np.uint8)
+    out_view = out
+    init_packed_sink(&sink, &out_view[0])
+    with nogil:
+        for i in range(n):
+            offset_view[i] = bit_position(&sink)
+            for p in range(rle_view[i], rle_view[i + 1]):
+                zr = pair_view[p, 0]
+                v = pair_view[p, 1]
                 size = mag_size(v)
                 sym = (zr << 4) | size
-                bw.write_bits(ac_c_codes[sym], ac_c_lens[sym])
-                bw.write_bits(v if v > 0 else neg_ampl(v, size), size)
+                write_bits(&sink, tables.codes[0][sym], tables.lens[0][sym])
+                if size:
+                    write_bits(&sink, v if v > 0 else neg_ampl(v, size), size)
+        offset_view[n] = bit_position(&sink)
+        flush_zeros(&sink)
+    return out[:sink.pos].copy(), offsets
+
+
+def interleave_packed(dc_y, ac_y, dc_cb, ac_cb, dc_cr, ac_cr):
+    """
+    Interleave packed DC/AC stages of Y, Cb and Cr into one 4:4:4 MCU stream.
+
+    Every argument is a packed (bits, offsets) stage from encode_dc_packed/encode_ac_packed.
+
+    Returns:
+        (bits, offsets): uint8 buffer and int64 bit offsets of every MCU, shape (n_mcus + 1,)
+    """
+    cdef BitSink sink
+    cdef unsigned char[::1] out_view
+    cdef const unsigned char* data_ptrs[6]
+    cdef Py_ssize_t data_sizes[6]
+    cdef const long long* offset_ptrs[6]
+    cdef const unsigned char[::1] data_view
+    cdef const long long[::1] index_view
+    cdef Py_ssize_t n = len(dc_y[1]) - 1
+    cdef Py_ssize_t total = 8
+    cdef Py_ssize_t i
+    cdef int s
+
+    # Keep the arrays alive while their pointers are used
+    arrays = []
+    for s, (bits, bit_offsets) in enumerate((dc_y, ac_y, dc_cb, ac_cb, dc_cr, ac_cr)):
+        bits = np.ascontiguousarray(bits, dtype=np.uint8)
+        bit_offsets = np.ascontiguousarray(bit_offsets, dtype=np.int64)
+        if len(bit_offsets) != n + 1:
+            raise ValueError("DC and AC data of all components must cover the same number of MCUs")
+        arrays.append((bits, bit_offsets))
+        data_view = bits
+        index_view = bit_offsets
+        data_ptrs[s] = &data_view[0] if bits.shape[0] else NULL
+        data_sizes[s] = bits.shape[0]
+        offset_ptrs[s] = &index_view[0]
+        total += bits.shape[0]
 
-    bw.flush_one()
-    return bw.get_bytes()
+    offsets = np.empty(n + 1, dtype=np.int64)
+    cdef long long[::1] offset_view = offsets
+    out = np.empty(total, dtype=np.uint8)
+    out_view = out
+    init_packed_sink(&sink, &out_view[0])
+    with nogil:
+        for i in range(n):
+            offset_view[i] = bit_position(&sink)
+            for s in range(6):
+                copy_bits(&sink, data_ptrs[s], data_sizes[s], offset_ptrs[s][i], offset_ptrs[s][i + 1])
+        offset_view[n] = bit_position(&sink)
+        flush_zeros(&sink)
+    return out[:sink.pos].copy(), offsets
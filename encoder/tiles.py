@@ -0,0 +1,232 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Tile pyramids (Deep Zoom / XYZ) for map and deep-zoom viewers.
+
+Tiles are MCU-aligned windows of a level, so every pixel goes through colour
+conversion and the DCT exactly once and no tile border is padded or processed
+twice. Each tile runs the pipeline on its own window (a 256x256 window stays in
+cache, a strip of a whole level does not, which makes the colour conversion
+about 2x slower) without encode()'s per-call work: the JPEG header of every
+tile geometry is built once and reused, and no result object, log line or
+stage record is created per tile. Tiles are byte-identical to encode() of the
+same window. Each lower level is the previous one reduced 2x2.
+"""
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from util import rgb_to_ycbcr
+from util.huffman_tables import STANDARD_TABLES
+from util.dct_basis import resolve_float_dtype
+from util.quantization_tables import get_quantization_tables
+from .partitioning import partition
+from .block_reuse import find_block_reuse
+from .transform import transform
+from .quantization import quantize
+from .zigzag import zigzag
+from .coefficients import entropy_code
+from .bitstream_builder import build_bitstream
+
+PYRAMID_LAYOUTS = ("dzi", "xyz")
+MANIFEST_NAME = "manifest.json"
+
+_EOI = b"\xff\xd9"
+
+
+def encode_pyramid(
+    image: np.ndarray,
+    output: str,
+    layout: str = "dzi",
+    tile_size: int = 256,
+    quality: Optional[int] = None,
+    name: str = "image",
+    background: Tuple[int, int, int] = (255, 255, 255),
+    float_dtype=None,
+    executor=None
+) -> Dict:
+    """
+    Cut an RGB image into a pyramid of JPEG tiles.
+
+    Layouts:
+        "dzi": Deep Zoom (OpenSeadragon): name.dzi plus name_files/<level>/<col>_<row>.jpeg,
+            levels from 1x1 pixel (0) to full size, edge tiles cropped to the image
+        "xyz": <z>/<x>/<y>.jpg (Leaflet, OpenLayers), zoom 0 fits in one tile,
+            edge tiles padded to full size with background
+
+    Args:
+        image: RGB uint8 array of shape (height, width, 3)
+        output: Directory to write to, or a path ending in .zip to write one archive
+        layout: "dzi" or "xyz"
+        tile_size: Tile width and height, a multiple of 8 so tiles are MCU-aligned
+        quality: JPEG quality 1-100 (see encode())
+        name: Base name of the .dzi file and tile directory (dzi layout)
+        background: RGB fill of padded edge tiles (xyz layout)
+        float_dtype: Colour conversion and DCT precision (default float32, as encode())
+        executor: Optional concurrent.futures executor to encode the tiles of a row in parallel
+
+    Returns:
+        The manifest (also written as manifest.json): image size, layout, tile size and per-level grid
+    """
+    if layout not in PYRAMID_LAYOUTS:
+        raise ValueError(f"Unknown pyramid layout '{layout}', expected one of {PYRAMID_LAYOUTS}")
+    if tile_size <= 0 or tile_size % 8:
+        raise ValueError(f"tile_size must be a positive multiple of 8, got {tile_size}")
+    if image.ndim != 3 or image.shape[2] != 3:
+        raise ValueError(f"Expected an RGB image of shape (height, width, 3), got {image.shape}")
+    height, width = image.shape[:2]
+    quantization_tables = get_quantization_tables(quality)
+    float_dtype = resolve_float_dtype(float_dtype, False)
+
+    longest = max(width, height)
+    if layout == "dzi":
+        top_level = max(longest - 1, 0).bit_length()  # ceil(log2(longest))
+    else:
+        top_level = max((longest + tile_size - 1) // tile_size - 1, 0).bit_length()
+
+    manifest = {
+        "layout": layout,
+        "width": width,
+        "height": height,
+        "tile_size": tile_size,
+        "format": "jpeg" if layout == "dzi" else "jpg",
+        "levels": [],
+    }
+    headers = {}  # (tile width, tile height) -> JPEG header up to the scan data
+    writer = _ZipWriter(output) if output.endswith(".zip") else _DirectoryWriter(output)
+    try:
+        level_image = np.ascontiguousarray(image, dtype=np.uint8)
+        for level in range(top_level, -1, -1):
+            if level != top_level:
+                level_image = _reduce(level_image)
+            level_height, level_width = level_image.shape[:2]
+            columns = (level_width + tile_size - 1) // tile_size
+            rows = (level_height + tile_size - 1) // tile_size
+            for row in range(rows):
+                strip = level_image[row * tile_size:(row + 1) * tile_size]
+                if layout == "xyz":
+                    strip = _pad_strip(strip, columns * tile_size, tile_size, background)
+                tiles = []
+                for column, x in enumerate(range(0, strip.shape[1], tile_size)):
+                    tile = strip[:, x:x + tile_size]
+                    geometry = (tile.shape[1], tile.shape[0])
+                    if geometry not in headers:
+                        headers[geometry] = jpeg_header(*geometry, quantization_tables)
+                    tiles.append((_tile_path(layout, name, level, column, row), tile, headers[geometry]))
+                _write_tiles(tiles, quantization_tables, float_dtype, executor, writer)
+            manifest["levels"].insert(0, {"level": level, "width": level_width, "height": level_height,
+                                          "columns": columns, "rows": rows})
+        if layout == "dzi":
+            writer.write(f"{name}.dzi", _dzi_descriptor(width, height, tile_size).encode("utf-8"))
+        import json
+
+        writer.write(MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+    finally:
+        writer.close()
+    return manifest
+
+
+def _write_tiles(tiles, quantization_tables, float_dtype, executor, writer) -> None:
+    """Encode (path, rgb window, header) tiles, in parallel with an executor, and write them in order."""
+    if executor is None:
+        for path, tile, header in tiles:
+            writer.write(path, encode_with_header(tile, header, quantization_tables, float_dtype))
+        return
+    futures = [(path, executor.submit(encode_with_header, tile, header, quantization_tables, float_dtype))
+               for path, tile, header in tiles]
+    for path, future in futures:
+        writer.write(path, future.result())
+
+
+def encode_with_header(rgb: np.ndarray, header: bytes, quantization_tables, float_dtype) -> bytes:
+    """
+    encode() of an RGB image with a prebuilt header (see jpeg_header): same stages, no per-call setup.
+
+    float_dtype must already be resolved (resolve_float_dtype).
+    """
+    lum, chrom = quantization_tables
+    ycbcr = rgb_to_ycbcr(rgb, float_dtype)
+    zigzags = []
+    for c, table in enumerate((lum, chrom, chrom)):
+        blocks = partition(ycbcr[:, :, c])
+        reuse = find_block_reuse(blocks)
+        zigzags.append(reuse.expand(zigzag(quantize(transform(reuse.select(blocks), float_dtype), table))))
+    scan, _ = entropy_code(zigzags)
+    return b"".join((header, scan, _EOI))
+
+
+def jpeg_header(width: int, height: int, quantization_tables) -> bytes:
+    """Every segment of a width x height JPEG before its scan data (SOI, APP0, DQT, SOF0, DHT, SOS)."""
+    return build_bitstream(*quantization_tables, height, width, STANDARD_TABLES, b"")[:-len(_EOI)]
+
+
+def _reduce(rgb: np.ndarray) -> np.ndarray:
+    """Halve an RGB image (2x2 box filter, rounded; odd edges are repeated)."""
+    height, width = rgb.shape[:2]
+    if height % 2 or width % 2:
+        rgb = np.pad(rgb, ((0, height % 2), (0, width % 2), (0, 0)), mode="edge")
+    total = rgb[0::2, 0::2].astype(np.uint16)
+    total += rgb[1::2, 0::2]
+    total += rgb[0::2, 1::2]
+    total += rgb[1::2, 1::2]
+    total += 2
+    total >>= 2
+    return total.astype(np.uint8)
+
+
+def _pad_strip(strip: np.ndarray, width: int, height: int, background) -> np.ndarray:
+    """Pad a strip to whole tiles with the background colour."""
+    if strip.shape[:2] == (height, width):
+        return strip
+    padded = np.empty((height, width, 3), dtype=np.uint8)
+    padded[...] = np.asarray(background, dtype=np.uint8)
+    padded[:strip.shape[0], :strip.shape[1]] = strip
+    return padded
+
+
+def _tile_path(layout: str, name: str, level: int, column: int, row: int) -> str:
+    if layout == "dzi":
+        return f"{name}_files/{level}/{column}_{row}.jpeg"
+    return f"{level}/{column}/{row}.jpg"
+
+
+def _dzi_descriptor(width: int, height: int, tile_size: int) -> str:
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="jpeg" Overlap="0" '
+            f'TileSize="{tile_size}">\n'
+            f'  <Size Width="{width}" Height="{height}"/>\n'
+            '</Image>\n')
+
+
+class _DirectoryWriter:
+    def __init__(self, root: str):
+        self.root = root
+        self._directories = set()
+
+    def write(self, path: str, data: bytes) -> None:
+        full_path = os.path.join(self.root, path)
+        directory = os.path.dirname(full_path)
+        if directory not in self._directories:
+            os.makedirs(directory, exist_ok=True)
+            self._directories.add(directory)
+        with open(full_path, "wb") as f:
+            f.write(data)
+
+    def close(self) -> None:
+        pass
+
+
+class _ZipWriter:
+    def __init__(self, path: str):
+        import zipfile
+
+        # JPEG tiles do not compress further: store them
+        self._archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED)
+
+    def write(self, path: str, data: bytes) -> None:
+        self._archive.writestr(path, data)
+
+    def close(self) -> None:
+        self._archive.close()
@@ -6,9 +6,12 @@ import numpy as np
 from . import transform_cy
 
 
-def transform(MCU_list: np.ndarray) -> np.ndarray:
+def transform(MCU_list: np.ndarray, float_dtype=np.float64, num_threads: int = 0) -> np.ndarray:
     """Apply DCT transform to MCU blocks using Cython.
 
-    Converts input blocks from spatial domain to DCT domain.
+    Converts input blocks from spatial domain to DCT domain with the native
+    kernel, which releases the GIL (and uses OpenMP threads when built with
+    JPEG_OPENMP=1; num_threads=1 forces a serial loop). float_dtype selects
+    the output precision.
     """
-    return transform_cy.transform(MCU_list)
+    return transform_cy.transform(MCU_list, float_dtype, num_threads)
@@ -1,137 +1,118 @@
 # cython: language_level=3, boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
 """
 Cython-optimized DCT (Discrete Cosine Transform)
-Matches transform.py exactly - same logic, same output
+
+Native 8x8 forward DCT on typed memoryviews. The block loop runs without the
+GIL, so several threads can transform concurrently; built with OpenMP
+(JPEG_OPENMP=1 python setup.py build_ext --inplace) it is also split across
+cores with prange.
 """
 
 import numpy as np
 cimport numpy as np
 cimport cython
+from cython cimport floating
+from cython.parallel cimport prange
+from libc.math cimport cos, sqrt, M_PI
 
-import ctypes
-from pathlib import Path
-import subprocess
-import sys
-
-ctypedef np.float64_t FLOAT64
 ctypedef np.ndarray ndarray
 
-# Load C library (same as Python version)
-def _build_dct_library():
-    """Loads libdct8x8 for Windows (.dll) or Linux/Mac (.so)."""
-    here = Path(__file__).resolve().parent
-    c_path = here / "dct8x8.c"
-
-    if sys.platform.startswith("linux") or sys.platform == "darwin":
-        so_path = here / "libdct8x8.so"
-        if (not so_path.exists()) or (c_path.stat().st_mtime > so_path.stat().st_mtime):
-            cmd = [
-                "gcc", "-O3", "-fPIC", "-shared",
-                "-o", str(so_path),
-                str(c_path),
-                "-lm",
-            ]
-            print("Baue C-DCT-Bibliothek:", " ".join(cmd))
-            subprocess.check_call(cmd)
-        return so_path
-    elif sys.platform == "win32":
-        dll_path = here / "libdct8x8.dll"
-        if dll_path.exists():
-            return dll_path
-        else:
-            return None  # Return None for fallback
-    else:
-        raise OSError(f"Plattform {sys.platform} nicht unterstützt")
-
-lib_path = _build_dct_library()
-_lib = None
-_use_c_lib = False
-
-if lib_path is not None:
-    try:
-        _lib = ctypes.CDLL(str(lib_path))
-        _lib.dct8x8.argtypes = [
-            ctypes.POINTER(ctypes.c_double),
-            ctypes.POINTER(ctypes.c_double),
-        ]
-        _lib.dct8x8.restype = None
-        _lib.dct8x8_batch.argtypes = [
-            ctypes.POINTER(ctypes.c_double),
-            ctypes.POINTER(ctypes.c_double),
-            ctypes.c_int
-        ]
-        _lib.dct8x8_batch.restype = None
-        _use_c_lib = True
-        print(f"[OK] C-Modul geladen: {lib_path.name}")
-    except Exception as e:
-        _lib = None
-        print(f"[!] C-Modul-Fehler, nutze scipy: {e}")
-
-
-def transform(ndarray MCU_list):
-    """Apply DCT transform - matches original transform.py exactly"""
-    cdef int n, i
-    cdef ndarray mcu_flat, shifted, out
-    cdef ndarray block, dct_block
-    
-    if _use_c_lib:
-        # 1) Reshape to (n*64) if input is (n, 8, 8)
-        
-        if MCU_list.ndim == 3:
-            n = MCU_list.shape[0]
-            mcu_flat = MCU_list.reshape(n, 64)
-        else:
-            mcu_flat = MCU_list
-            n = MCU_list.shape[0]
-        
-        # 2) Convert to float64 and shift by 128
-        shifted = mcu_flat.astype(np.float64, copy=False) - 128.0
-        shifted = np.ascontiguousarray(shifted)
-        
-        out = np.empty_like(shifted, dtype=np.float64)
-        
-        # 3) Call C library with batch processing
-        shifted_ptr = shifted.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
-        out_ptr = out.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
-        
-        _lib.dct8x8_batch(shifted_ptr, out_ptr, n)
-        
-        # Reshape back to input shape
-        if MCU_list.ndim == 3:
-            return out.reshape([MCU_list.shape[i] for i in range(MCU_list.ndim)])
-        else:
-            return out
+ctypedef fused pixel_t:
+    short
+    unsigned char
+    float
+    double
+
+# Orthonormal DCT-II basis split by symmetry, x[n] and x[7 - n] share |C[k][n]|:
+#   even rows k = 2m use s[n] = x[n] + x[7 - n]: _EVEN[m * 4 + n] = C[2m][n]
+#   odd rows k = 2m + 1 use d[n] = x[n] - x[7 - n]: _ODD[m * 4 + n] = C[2m + 1][n]
+cdef double _EVEN[16]
+cdef double _ODD[16]
+
+
+cdef void _init_basis():
+    cdef int m, n
+    for m in range(4):
+        for n in range(4):
+            _EVEN[m * 4 + n] = (sqrt(1.0 / 8) if m == 0 else sqrt(2.0 / 8)) * cos((2 * n + 1) * (2 * m) * M_PI / 16)
+            _ODD[m * 4 + n] = sqrt(2.0 / 8) * cos((2 * n + 1) * (2 * m + 1) * M_PI / 16)
+
+
+_init_basis()
+
+
+cdef inline void _dct1d(const double* x, Py_ssize_t in_stride, double* y, Py_ssize_t out_stride) noexcept nogil:
+    """8-point DCT-II of x[0], x[in_stride], ... into y[0], y[out_stride], ... (32 multiplications)."""
+    cdef double s[4]
+    cdef double d[4]
+    cdef double even, odd
+    cdef int m, n
+    for n in range(4):
+        s[n] = x[n * in_stride] + x[(7 - n) * in_stride]
+        d[n] = x[n * in_stride] - x[(7 - n) * in_stride]
+    for m in range(4):
+        even = 0.0
+        odd = 0.0
+        for n in range(4):
+            even = even + _EVEN[m * 4 + n] * s[n]
+            odd = odd + _ODD[m * 4 + n] * d[n]
+        y[2 * m * out_stride] = even
+        y[(2 * m + 1) * out_stride] = odd
+
+
+cdef inline void _dct8x8(pixel_t[:, ::1] src, floating[:, ::1] dst, Py_ssize_t b) noexcept nogil:
+    """Level shift (-128) and 2-D DCT of block b: rows, then columns."""
+    cdef double block[64]
+    cdef double rows[64]
+    cdef double coefficients[64]
+    cdef int i
+    cdef pixel_t* pixels = &src[b, 0]
+    cdef floating* out = &dst[b, 0]
+    for i in range(64):
+        block[i] = <double>pixels[i] - 128.0
+    for i in range(8):
+        _dct1d(block + i * 8, 1, rows + i * 8, 1)
+    for i in range(8):
+        _dct1d(rows + i, 8, coefficients + i, 8)
+    for i in range(64):
+        out[i] = <floating>coefficients[i]
+
+
+cdef void _dct_blocks(pixel_t[:, ::1] src, floating[:, ::1] dst, int num_threads) noexcept nogil:
+    cdef Py_ssize_t b
+    cdef Py_ssize_t n = src.shape[0]
+    if num_threads == 1:
+        for b in range(n):
+            _dct8x8(src, dst, b)
+    elif num_threads > 1:
+        for b in prange(n, schedule="static", num_threads=num_threads):
+            _dct8x8(src, dst, b)
     else:
-        # Fallback: scipy DCT - simple loop (matches original logic)
-        try:
-            from scipy.fftpack import dct
-            
-            # Handle both (n, 64) and (n, 8, 8) shapes
-            if MCU_list.ndim == 3:
-                n = MCU_list.shape[0]
-            else:
-                n = MCU_list.shape[0]
-            
-            shifted = MCU_list.astype(np.float64, copy=False) - 128.0
-            out = np.empty_like(shifted, dtype=np.float64)
-            
-            # Process each 8x8 block
-            for i in range(n):
-                if MCU_list.ndim == 3:
-                    block = shifted[i]  # Already (8, 8)
-                else:
-                    block = shifted[i].reshape(8, 8)
-                
-                # 2D DCT: apply 1D DCT to rows then columns
-                dct_block = dct(dct(block.T, axis=0, norm='ortho').T, axis=0, norm='ortho')
-                
-                if MCU_list.ndim == 3:
-                    out[i] = dct_block
-                else:
-                    out[i] = dct_block.ravel()
-            
-            return out
-        except ImportError:
-            # Pure NumPy fallback
-            shifted = MCU_list.astype(np.float64, copy=False) - 128.0
-            return shifted
+        for b in prange(n, schedule="static"):
+            _dct8x8(src, dst, b)
+
+
+def _run(pixel_t[:, ::1] src, floating[:, ::1] dst, int num_threads):
+    with nogil:
+        _dct_blocks(src, dst, num_threads)
+
+
+def transform(ndarray MCU_list, float_dtype=np.float64, int num_threads=0):
+    """
+    Level-shifted 2-D DCT of (n, 8, 8) or (n, 64) blocks, returned in the input shape.
+
+    Accepts int16, uint8, float32 and float64 blocks (others are converted to
+    float64); float_dtype (float32 or float64) selects the output, the sums are
+    always accumulated in double. num_threads: 0 = OpenMP default, 1 = serial.
+    """
+    out_dtype = np.dtype(float_dtype)
+    if out_dtype != np.float32 and out_dtype != np.float64:
+        raise ValueError(f"Unsupported DCT dtype {out_dtype}")
+    if MCU_list.dtype not in (np.int16, np.uint8, np.float32, np.float64):
+        MCU_list = MCU_list.astype(np.float64)
+
+    shape = [MCU_list.shape[i] for i in range(MCU_list.ndim)]
+    src = np.ascontiguousarray(MCU_list).reshape(-1, 64)
+    out = np.empty((src.shape[0], 64), dtype=out_dtype)
+    _run(src, out, num_threads)
+    return out.reshape(shape)
@@ -4,19 +4,21 @@ Copyright (c) 2026 Huy Hiep Nguyen
 """
 import numpy as np
 
+# Natural (row-major) index of every zigzag position
+ZIGZAG_ORDER = np.array([
+    0, 1, 8, 16, 9, 2, 3, 10,
+    17, 24, 32, 25, 18, 11, 4, 5,
+    12, 19, 26, 33, 40, 48, 41, 34,
+    27, 20, 13, 6, 7, 14, 21, 28,
+    35, 42, 49, 56, 57, 50, 43, 36,
+    29, 22, 15, 23, 30, 37, 44, 51,
+    58, 59, 52, 45, 38, 31, 39, 46,
+    53, 60, 61, 54, 47, 55, 62, 63
+])
+
 
 def zigzag(array: np.ndarray) -> np.ndarray:
     """Apply zigzag ordering to 8x8 blocks."""
-    zigzag_order = np.array([
-        0, 1, 8, 16, 9, 2, 3, 10,
-        17, 24, 32, 25, 18, 11, 4, 5,
-        12, 19, 26, 33, 40, 48, 41, 34,
-        27, 20, 13, 6, 7, 14, 21, 28,
-        35, 42, 49, 56, 57, 50, 43, 36,
-        29, 22, 15, 23, 30, 37, 44, 51,
-        58, 59, 52, 45, 38, 31, 39, 46,
-        53, 60, 61, 54, 47, 55, 62, 63
-    ])
     num_blocks = array.shape[0]
     flattened = array.reshape(num_blocks, 64)
-    return flattened[:, zigzag_order]
+    return flattened[:, ZIGZAG_ORDER]
@@ -2,15 +2,19 @@
 Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
+import sys
 from pathlib import Path
 
 import numpy as np
-import cv2
 from logging import DEBUG
 
 # Import application modules
-from util import parse_arguments, ycbcr_to_rgb, rgb_to_ycbcr, logger
+from util import parse_arguments, ycbcr_to_rgb, rgb_to_ycbcr, logger, EncodingResult
+from util.result_store import last_stage
+from util.dct_basis import resolve_float_dtype
+from util.encoding_stages import STAGE_JPEG
 from util.write_bitstream import write_bitstream_to_file
+from util.instrumentation import Instrumentation, JsonlExporter, PrometheusExporter
 from encoder import encode
 from decoder import decode
 
@@ -23,45 +27,77 @@ def main() -> int:
         Exit code (0 for success, 1 for error)
     """
     args = parse_arguments()
+    import cv2  # image I/O only, not needed by the encoder/decoder packages
 
     if args.verbose:
         logger.setLevel(DEBUG)
         for handler in logger.handlers:
             handler.setLevel(DEBUG)
 
-    if not Path(args.input).is_file():
-        logger.error(f"Input file '{args.input}' does not exist.")
-        return 1
-
-    # Read image using OpenCV (loads as BGR)
-    img_bgr = cv2.imread(args.input)
-    if img_bgr is None:
-        logger.error(f"Failed to load image: {args.input}")
-        return 1
-
-    # Convert BGR to RGB
-    pixel_array = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    img_height, img_width, _ = pixel_array.shape
-
-    logger.debug(f"Image {args.input} loaded - Width: {img_width}px, Height: {img_height}px")
-
-    # Convert from RGB to YCbCr
-    ycbcr_array = rgb_to_ycbcr(pixel_array)
-
-    # Split into separate Y, Cb, Cr channels
-    y_channel = ycbcr_array[:, :, 0]
-    cb_channel = ycbcr_array[:, :, 1]
-    cr_channel = ycbcr_array[:, :, 2]
-
-    # Run the encoding pipeline
-    encoding_result = encode(
-        y_channel,
-        cb_channel,
-        cr_channel,
-        img_width,
-        img_height,
-        args.last_encoding_stage,
-        args.verbose)
+    float_dtype = None if args.precision == "auto" else np.dtype(args.precision)
+
+    # Per-stage statistics (--stats): JSON lines are streamed, Prometheus counters printed at the end
+    instrumentation = None
+    prometheus = None
+    if args.stats:
+        instrumentation = Instrumentation(trace_memory=args.stats_memory, labels={"image": Path(args.input).name})
+        if args.stats == "jsonl":
+            instrumentation.callbacks.append(JsonlExporter(sys.stdout))
+        elif args.stats == "prometheus":
+            prometheus = PrometheusExporter()
+            instrumentation.callbacks.append(prometheus)
+
+    last_encoding_stage = args.last_encoding_stage
+    if args.load_result:
+        # Resume from saved stages: no image is read and nothing is re-encoded
+        encoding_result = EncodingResult.load(args.load_result)
+        last_encoding_stage = last_stage(encoding_result)
+        if last_encoding_stage is None:
+            logger.error(f"No encoding stage saved in {args.load_result}")
+            return 1
+        logger.info(f"Loaded '{last_encoding_stage}' stage result from {args.load_result}")
+    else:
+        if not Path(args.input).is_file():
+            logger.error(f"Input file '{args.input}' does not exist.")
+            return 1
+
+        # Read image using OpenCV (loads as BGR)
+        img_bgr = cv2.imread(args.input)
+        if img_bgr is None:
+            logger.error(f"Failed to load image: {args.input}")
+            return 1
+
+        # Convert BGR to RGB
+        pixel_array = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+        img_height, img_width, _ = pixel_array.shape
+
+        logger.debug(f"Image {args.input} loaded - Width: {img_width}px, Height: {img_height}px")
+
+        # Convert from RGB to YCbCr
+        ycbcr_array = rgb_to_ycbcr(pixel_array, resolve_float_dtype(
+            float_dtype, args.verbose or last_encoding_stage != STAGE_JPEG))
+
+        # Split into separate Y, Cb, Cr channels
+        y_channel = ycbcr_array[:, :, 0]
+        cb_channel = ycbcr_array[:, :, 1]
+        cr_channel = ycbcr_array[:, :, 2]
+
+        # Run the encoding pipeline
+        encoding_result = encode(
+            y_channel,
+            cb_channel,
+            cr_channel,
+            img_width,
+            img_height,
+            last_encoding_stage,
+            args.verbose,
+            float_dtype,
+            instrumentation,
+            quality=args.quality)
+
+        if args.save_result:
+            encoding_result.save(args.save_result)
+            logger.info(f"Encoding result saved to {args.save_result}")
 
     # Write JPEG file if we have a complete bitstream
     if encoding_result.jpeg_bitstream is not None:
@@ -70,7 +106,7 @@ def main() -> int:
     # If decoding is enabled, decode and save the image
     if not args.no_decode:
         # Decode to YCbCr array
-        ycbcr_array = decode(encoding_result, args.last_encoding_stage)
+        ycbcr_array = decode(encoding_result, last_encoding_stage, float_dtype, instrumentation)
 
         # Convert YCbCr to RGB
         decoded_image_rgb = ycbcr_to_rgb(ycbcr_array)
@@ -81,6 +117,12 @@ def main() -> int:
         cv2.imwrite(args.reconstructed, decoded_image_bgr)
         logger.info(f"Decoded image saved as {args.reconstructed}")
 
+    if args.stats == "table":
+        for stats in instrumentation.runs:
+            print(stats.format_table())
+    elif args.stats == "prometheus":
+        print(prometheus.render(), end="")
+
     return 0
 
 
@@ -0,0 +1,10 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+
+from .server import PRIORITY_CLASSES, ServiceConfig, ServiceError, CodecService, serve
+from .metrics import LatencyHistogram, ServiceMetrics
+
+__all__ = ['PRIORITY_CLASSES', 'ServiceConfig', 'ServiceError', 'CodecService', 'serve',
+           'LatencyHistogram', 'ServiceMetrics']
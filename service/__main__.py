@@ -0,0 +1,49 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+import argparse
+import asyncio
+
+from .server import ServiceConfig, serve
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command-line arguments.
+
+    Returns:
+        Parsed arguments namespace
+    """
+    defaults = ServiceConfig()
+    parser = argparse.ArgumentParser(
+        description="Serve JPEG encode/decode/thumbnail jobs over HTTP from a pre-warmed worker pool",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8089, help="TCP port")
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("-w", "--workers", type=int, default=defaults.workers, help="Worker processes")
+    parser.add_argument("--queue-size", type=int, default=defaults.queue_size,
+                        help="Maximum waiting jobs per priority class")
+    parser.add_argument("--max-pixels", type=int, default=defaults.max_pixels,
+                        help="Largest image a single request may carry")
+    parser.add_argument("--max-inflight-pixels", type=int, default=defaults.max_inflight_pixels,
+                        help="Pixel budget of all queued and running jobs")
+    parser.add_argument("--max-body-bytes", type=int, default=defaults.max_body_bytes,
+                        help="Largest accepted request body")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    config = ServiceConfig(workers=args.workers, queue_size=args.queue_size, max_pixels=args.max_pixels,
+                           max_inflight_pixels=args.max_inflight_pixels, max_body_bytes=args.max_body_bytes)
+    try:
+        asyncio.run(serve(config, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
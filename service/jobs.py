@@ -0,0 +1,144 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Codec jobs executed inside the service's worker processes.
+
+Every job takes the request body and a dict of string parameters and returns
+(body, content_type, headers). Jobs are module-level functions so they can be
+pickled to a process pool.
+"""
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+JobResult = Tuple[bytes, str, Dict[str, str]]
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def warm_up() -> int:
+    """Pool initializer: import the codec and run one tiny encode/decode so the first request is fast."""
+    import logging
+    from util import logger
+    logger.setLevel(logging.WARNING)
+
+    pixels = np.full((16, 16, 3), 128, dtype=np.uint8)
+    encode_job(pixels.tobytes(), {"width": "16", "height": "16"})
+    return 0
+
+
+def image_size(body: bytes, params: Dict[str, str]) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) of an encode request without decoding it, None if unknown.
+
+    Raw RGB requests carry their size in the width/height parameters; for PNG the
+    IHDR chunk is read.
+    """
+    if "width" in params or "height" in params:
+        try:
+            return int(params["width"]), int(params["height"])
+        except (KeyError, ValueError):
+            raise ValueError("Raw RGB input needs integer width and height parameters") from None
+    if body[:8] == _PNG_SIGNATURE and len(body) >= 24 and body[12:16] == b"IHDR":
+        return struct.unpack(">II", body[16:24])
+    return None
+
+
+def _load_rgb(body: bytes, params: Dict[str, str]) -> np.ndarray:
+    size = image_size(body, params)
+    if "width" in params:
+        width, height = size
+        if width <= 0 or height <= 0 or len(body) != width * height * 3:
+            raise ValueError(f"Raw RGB input must be width * height * 3 = {width * height * 3} bytes")
+        return np.frombuffer(body, dtype=np.uint8).reshape(height, width, 3)
+
+    import cv2  # only image file input needs OpenCV
+    bgr = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError("Could not decode the input image")
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+
+def _encode_rgb(rgb: np.ndarray, params: Dict[str, str]) -> bytes:
+    from util import rgb_to_ycbcr
+    from encoder import encode
+
+    float_dtype = _float_dtype(params)
+    ycbcr = rgb_to_ycbcr(rgb, float_dtype)
+    height, width, _ = rgb.shape
+    result = encode(ycbcr[:, :, 0], ycbcr[:, :, 1], ycbcr[:, :, 2], width, height, float_dtype=float_dtype)
+    return result.jpeg_bitstream
+
+
+def _float_dtype(params: Dict[str, str]):
+    precision = params.get("precision", "auto")
+    if precision not in ("auto", "float32", "float64"):
+        raise ValueError(f"Unknown precision '{precision}'")
+    return None if precision == "auto" else np.dtype(precision)
+
+
+def _rgb_response(rgb: np.ndarray, params: Dict[str, str]) -> JobResult:
+    """Return RGB pixels as raw bytes (default), PNG (format=png) or JPEG (format=jpeg)."""
+    height, width, _ = rgb.shape
+    headers = {"X-Width": str(width), "X-Height": str(height)}
+    output = params.get("format", "raw")
+    if output == "raw":
+        return np.ascontiguousarray(rgb).tobytes(), "application/octet-stream", headers
+    if output == "png":
+        import cv2
+        ok, png = cv2.imencode(".png", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if not ok:
+            raise ValueError("PNG encoding failed")
+        return png.tobytes(), "image/png", headers
+    if output == "jpeg":
+        return _encode_rgb(rgb, params), "image/jpeg", headers
+    raise ValueError(f"Unknown output format '{output}'")
+
+
+def encode_job(body: bytes, params: Dict[str, str]) -> JobResult:
+    """Raw RGB (width/height parameters) or an image file -> baseline JPEG."""
+    rgb = _load_rgb(body, params)
+    height, width, _ = rgb.shape
+    return _encode_rgb(rgb, params), "image/jpeg", {"X-Width": str(width), "X-Height": str(height)}
+
+
+def decode_job(body: bytes, params: Dict[str, str]) -> JobResult:
+    """JPEG -> RGB (format=raw|png)."""
+    from decoder import Decoder
+
+    upsampling = params.get("upsampling", "fancy")
+    rgb = Decoder(float_dtype=_float_dtype(params) or np.float32, upsampling=upsampling).decode(body)
+    return _rgb_response(rgb, params)
+
+
+def thumbnail_job(body: bytes, params: Dict[str, str]) -> JobResult:
+    """
+    JPEG -> thumbnail (format=jpeg|png|raw, default jpeg) with the longest side close to max_side.
+
+    The image is reconstructed with the scaled IDCT (1/8 .. 1/1), so only the
+    low-frequency coefficients are transformed; OpenCV then resizes the result
+    to exactly max_side.
+    """
+    from encoder.derive import derive_rgb
+
+    try:
+        max_side = int(params.get("max_side", "256"))
+    except ValueError:
+        raise ValueError("max_side must be an integer") from None
+    if max_side <= 0:
+        raise ValueError("max_side must be positive")
+
+    rgb, = derive_rgb(body, [max_side], params.get("upsampling", "fancy"))
+    params = dict(params)
+    params.setdefault("format", "jpeg")
+    return _rgb_response(rgb, params)
+
+
+# Endpoint name -> job function
+JOBS = {
+    "encode": encode_job,
+    "decode": decode_job,
+    "thumbnail": thumbnail_job,
+}
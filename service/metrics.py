@@ -0,0 +1,113 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+import bisect
+from typing import Dict, Optional, Sequence, Tuple
+
+# Latency bucket upper bounds in seconds (Prometheus "le" labels)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram in the Prometheus histogram layout."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile (upper bound of the bucket holding it; inf beyond the last bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _label_string(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class ServiceMetrics:
+    """
+    Request counters and latency histograms of the service, keyed by (endpoint, priority).
+
+    Three histograms are kept: time waiting in the queue, time in the worker and
+    total time including HTTP handling.
+    """
+
+    HISTOGRAMS = (
+        ("jpeg_service_queue_seconds", "Time requests waited for a worker"),
+        ("jpeg_service_work_seconds", "Time spent executing the job in a worker"),
+        ("jpeg_service_request_seconds", "Total request latency"),
+    )
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Dict[tuple, LatencyHistogram]] = {name: {} for name, _ in self.HISTOGRAMS}
+        self.responses: Dict[tuple, int] = {}
+        self.rejected: Dict[tuple, int] = {}
+
+    def observe(self, histogram: str, endpoint: str, priority: str, seconds: float) -> None:
+        key = (("endpoint", endpoint), ("priority", priority))
+        series = self.histograms[histogram]
+        if key not in series:
+            series[key] = LatencyHistogram(self.buckets)
+        series[key].observe(seconds)
+
+    def count_response(self, endpoint: str, status: int) -> None:
+        key = (("endpoint", endpoint), ("status", str(status)))
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def count_rejection(self, endpoint: str, reason: str) -> None:
+        key = (("endpoint", endpoint), ("reason", reason))
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """All metrics in the Prometheus text exposition format; gauges are added as-is."""
+        lines = []
+        for name, help_text in self.HISTOGRAMS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in self.histograms[name].items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = f'le="{bound:g}"'
+                    lines.append(f"{name}_bucket{_label_string(key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_label_string(key, le)} {histogram.count}")
+                lines.append(f"{name}_sum{_label_string(key)} {histogram.sum:.9g}")
+                lines.append(f"{name}_count{_label_string(key)} {histogram.count}")
+
+        for name, help_text, series in (
+                ("jpeg_service_responses_total", "Responses by status code", self.responses),
+                ("jpeg_service_rejected_total", "Requests refused by admission control", self.rejected)):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_label_string(key)} {value}")
+
+        typed = set()
+        for series, value in (gauges or {}).items():
+            name = series.split("{", 1)[0]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{series} {value:g}")
+        return "\n".join(lines) + "\n"
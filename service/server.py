@@ -0,0 +1,374 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Asyncio codec service: HTTP/1.1 on localhost or a Unix socket in front of a
+pre-warmed process pool.
+
+Endpoints:
+    POST /encode     raw RGB (?width=&height=) or PNG -> image/jpeg
+    POST /decode     JPEG -> raw RGB (?format=raw) or PNG (?format=png)
+    POST /thumbnail  JPEG -> JPEG/PNG/raw thumbnail (?max_side=256&format=jpeg)
+    GET  /metrics    Prometheus text (latency histograms, counters, queue gauges)
+    GET  /healthz    "ok"
+
+Query parameters are passed to the job (precision, upsampling, ...); the
+priority class comes from ?priority= or the X-Priority header.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from decoder.jpeg_parser import parse_jpeg_header
+from decoder.probe import DEFAULT_MAX_PIXELS
+from util import logger
+from .jobs import JOBS, JobResult, image_size, warm_up
+from .metrics import ServiceMetrics
+
+# Priority classes, most urgent first
+PRIORITY_CLASSES = ("interactive", "normal", "batch")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 415: "Unsupported Media Type",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+@dataclass
+class ServiceConfig:
+    """
+    Service limits.
+
+    Attributes:
+        workers: Worker processes (and concurrently running jobs)
+        queue_size: Maximum waiting jobs per priority class
+        max_pixels: Largest image a single request may encode or decode
+        max_inflight_pixels: Pixel budget of all queued and running jobs together
+        max_body_bytes: Largest accepted request body
+        chunk_size: Size of the chunks a response is streamed in
+    """
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    queue_size: int = 64
+    max_pixels: int = DEFAULT_MAX_PIXELS
+    max_inflight_pixels: int = 4 * DEFAULT_MAX_PIXELS
+    max_body_bytes: int = 256 << 20
+    chunk_size: int = 64 << 10
+
+
+class ServiceError(Exception):
+    """Request failure with an HTTP status (503 responses carry Retry-After)."""
+
+    def __init__(self, status: int, message: str, reason: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+@dataclass(order=True)
+class _Job:
+    rank: int
+    sequence: int
+    endpoint: str = field(compare=False)
+    priority: str = field(compare=False)
+    body: bytes = field(compare=False, repr=False)
+    params: Dict[str, str] = field(compare=False)
+    pixels: int = field(compare=False)
+    future: asyncio.Future = field(compare=False, repr=False)
+    enqueued: float = field(compare=False)
+
+
+class CodecService:
+    """
+    Scheduler between requests and the worker pool.
+
+    Jobs wait in one priority queue (interactive before normal before batch,
+    FIFO within a class). Admission control rejects a request before it is
+    queued if its image is larger than max_pixels (from the JPEG header, the
+    PNG IHDR or the raw size parameters), if its priority class already has
+    queue_size waiting jobs, or if it would push the queued plus running pixels
+    over max_inflight_pixels.
+    """
+
+    def __init__(self, config: Optional[ServiceConfig] = None, executor: Optional[Executor] = None):
+        self.config = config or ServiceConfig()
+        self.metrics = ServiceMetrics()
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatchers = []
+        self._sequence = itertools.count()
+        self._waiting = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._running = 0
+        self._inflight_pixels = 0
+        self._pool_restarts = 0
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+    async def start(self) -> None:
+        """Create and warm up the worker pool and start the dispatchers."""
+        if self._executor is None:
+            self._executor = self._create_pool()
+        await self._warm_up()
+
+        self._pool_lock = asyncio.Lock()
+        self._queue = asyncio.PriorityQueue()
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.config.workers)]
+
+    async def stop(self) -> None:
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.config.workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=warm_up)
+
+    async def _warm_up(self) -> None:
+        """One concurrent no-op job per worker spawns (and thereby warms) every process now."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, warm_up)
+                               for _ in range(self.config.workers)))
+        logger.info(f"{self.config.workers} workers ready in {time.perf_counter() - started:.2f}s")
+
+    async def _restart_pool(self, broken: Executor) -> None:
+        """Replace a pool broken by a dead worker, so later jobs do not fail as well."""
+        async with self._pool_lock:
+            if self._executor is not broken:
+                return  # another dispatcher already replaced it
+            logger.error("A worker process died, restarting the worker pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_pool()
+            self._pool_restarts += 1
+            await self._warm_up()
+
+    def request_pixels(self, endpoint: str, body: bytes, params: Dict[str, str]) -> int:
+        """Pixel count of a request, read from headers only (raises ServiceError if unknown)."""
+        try:
+            if endpoint == "encode":
+                size = image_size(body, params)
+                if size is None:
+                    raise ServiceError(415, "Encode input must be PNG or raw RGB with width/height")
+                width, height = size
+            else:
+                header = parse_jpeg_header(memoryview(body))
+                width, height = header.width, header.height
+        except ValueError as e:
+            raise ServiceError(400, str(e)) from None
+        return width * height
+
+    def admit(self, endpoint: str, priority: str, pixels: int) -> None:
+        """Raise ServiceError if the request must be refused now."""
+        if pixels > self.config.max_pixels:
+            self.metrics.count_rejection(endpoint, "too_large")
+            raise ServiceError(413, f"Image has {pixels} pixels, limit is {self.config.max_pixels}")
+        if self._waiting[priority] >= self.config.queue_size:
+            self.metrics.count_rejection(endpoint, "queue_full")
+            raise ServiceError(503, f"Queue for priority '{priority}' is full", "queue_full")
+        if self._inflight_pixels and self._inflight_pixels + pixels > self.config.max_inflight_pixels:
+            self.metrics.count_rejection(endpoint, "pixel_budget")
+            raise ServiceError(503, "Pixel budget exhausted", "pixel_budget")
+
+    async def submit(self, endpoint: str, body: bytes, params: Dict[str, str],
+                     priority: str = "normal") -> Tuple[JobResult, float, float]:
+        """
+        Admit, queue and run one job.
+
+        Returns:
+            (job result, seconds queued, seconds in the worker)
+        """
+        if endpoint not in JOBS:
+            raise ServiceError(404, f"Unknown endpoint '{endpoint}'")
+        if priority not in PRIORITY_CLASSES:
+            raise ServiceError(400, f"Unknown priority '{priority}', expected one of {PRIORITY_CLASSES}")
+        pixels = self.request_pixels(endpoint, body, params)
+        self.admit(endpoint, priority, pixels)
+
+        job = _Job(PRIORITY_CLASSES.index(priority), next(self._sequence), endpoint, priority, body, params,
+                   pixels, asyncio.get_running_loop().create_future(), time.perf_counter())
+        self._waiting[priority] += 1
+        self._inflight_pixels += pixels
+        self._queue.put_nowait(job)
+        try:
+            return await job.future
+        finally:
+            self._inflight_pixels -= pixels
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            self._waiting[job.priority] -= 1
+            if job.future.cancelled():
+                continue
+            started = time.perf_counter()
+            queued = started - job.enqueued
+            self._running += 1
+            executor = self._executor
+            try:
+                result = await loop.run_in_executor(executor, JOBS[job.endpoint], job.body, job.params)
+            except BrokenProcessPool as e:
+                logger.error(f"{job.endpoint} job failed: {e!r}")
+                error = ServiceError(500, f"Worker process died: {e}")
+                if self._owns_executor:
+                    await self._restart_pool(executor)
+            except ValueError as e:
+                error = ServiceError(400, str(e))
+            except Exception as e:
+                logger.error(f"{job.endpoint} job failed: {e!r}")
+                error = ServiceError(500, f"{type(e).__name__}: {e}")
+            else:
+                error = None
+            finally:
+                self._running -= 1
+
+            worked = time.perf_counter() - started
+            self.metrics.observe("jpeg_service_queue_seconds", job.endpoint, job.priority, queued)
+            self.metrics.observe("jpeg_service_work_seconds", job.endpoint, job.priority, worked)
+            if job.future.done():
+                continue
+            if error is None:
+                job.future.set_result((result, queued, worked))
+            else:
+                job.future.set_exception(error)
+
+    def gauges(self) -> Dict[str, float]:
+        gauges = {f'jpeg_service_queued{{priority="{priority}"}}': count
+                  for priority, count in self._waiting.items()}
+        gauges["jpeg_service_running"] = self._running
+        gauges["jpeg_service_inflight_pixels"] = self._inflight_pixels
+        gauges["jpeg_service_pool_restarts"] = self._pool_restarts
+        return gauges
+
+    # HTTP
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests (keep-alive) on one connection."""
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            await self._respond(writer, 400, b"Request header too large", keep_alive=False)
+            return False
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return False  # client closed the connection between requests
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self._respond(writer, 400, b"Malformed request line", keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+        url = urlsplit(target)
+        endpoint = url.path.strip("/")
+        params = dict(parse_qsl(url.query))
+        started = time.perf_counter()
+
+        if method == "GET" and endpoint == "healthz":
+            await self._respond(writer, 200, b"ok\n", keep_alive=keep_alive)
+            return keep_alive
+        if method == "GET" and endpoint == "metrics":
+            body = self.metrics.render(self.gauges()).encode()
+            await self._respond(writer, 200, body, "text/plain; version=0.0.4", keep_alive=keep_alive)
+            return keep_alive
+        if method != "POST":
+            await self._respond(writer, 405, b"Use POST for codec endpoints", keep_alive=False)
+            return False
+        if "transfer-encoding" in headers or "content-length" not in headers:
+            await self._respond(writer, 411, b"Content-Length required", keep_alive=False)
+            return False
+        length = headers["content-length"]
+        if not (length.isascii() and length.isdigit()):
+            await self._respond(writer, 400, b"Invalid Content-Length", keep_alive=False)
+            return False
+        length = int(length)
+        if length > self.config.max_body_bytes:
+            self.metrics.count_rejection(endpoint, "body_too_large")
+            await self._respond(writer, 413, b"Request body too large", keep_alive=False)
+            return False
+        body = await reader.readexactly(length)
+
+        priority = params.pop("priority", headers.get("x-priority", "normal"))
+        try:
+            (data, content_type, job_headers), queued, worked = await self.submit(endpoint, body, params, priority)
+        except ServiceError as e:
+            extra = {"Retry-After": "1"} if e.status == 503 else {}
+            self.metrics.count_response(endpoint, e.status)
+            await self._respond(writer, e.status, (str(e) + "\n").encode(), extra_headers=extra,
+                                keep_alive=keep_alive)
+            return keep_alive
+
+        job_headers = dict(job_headers)
+        job_headers["X-Queue-Seconds"] = f"{queued:.6f}"
+        job_headers["X-Work-Seconds"] = f"{worked:.6f}"
+        await self._respond(writer, 200, data, content_type, job_headers, keep_alive)
+        self.metrics.count_response(endpoint, 200)
+        self.metrics.observe("jpeg_service_request_seconds", endpoint, priority, time.perf_counter() - started)
+        return keep_alive
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, body: bytes,
+                       content_type: str = "text/plain", extra_headers: Optional[Dict[str, str]] = None,
+                       keep_alive: bool = True) -> None:
+        """Write a response, streaming the body in chunk_size pieces (chunked transfer encoding)."""
+        headers = {"Content-Type": content_type, "Transfer-Encoding": "chunked",
+                   "Connection": "keep-alive" if keep_alive else "close"}
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1"))
+
+        view = memoryview(body)
+        for start in range(0, len(view), self.config.chunk_size):
+            chunk = view[start:start + self.config.chunk_size]
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def serve(config: Optional[ServiceConfig] = None, host: str = "127.0.0.1", port: int = 8089,
+                unix_path: Optional[str] = None) -> None:
+    """Run the service until cancelled (TCP on host:port, or a Unix socket at unix_path)."""
+    service = CodecService(config)
+    await service.start()
+    try:
+        if unix_path:
+            server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port)
+            where = f"http://{host}:{port}"
+        logger.info(f"JPEG service listening on {where}")
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
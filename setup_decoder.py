@@ -14,6 +14,10 @@ cython_extensions = [
         # Note: Setuptools/Cython automatically detects the correct compiler 
         # (MSVC on Windows, GCC/Clang on Linux/Mac) so no manual C-build step is needed here.
     ),
+    Extension(
+        name="decoder.upsample_cy",
+        sources=["decoder/upsample.pyx"],
+    ),
 ]
 
 setup(
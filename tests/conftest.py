@@ -0,0 +1,56 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Shared fixtures: test images and JPEGs written by the encoder.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MONKEY_PATH = os.path.join(ROOT, "test-img", "monkey.tiff")
+
+# Lowest PSNR (dB) of monkey.tiff content encoded and decoded at the default quality
+MIN_PSNR = 25
+
+
+def encode_rgb(rgb: np.ndarray, **kwargs) -> bytes:
+    """Encode an RGB uint8 image with encoder.encode() and return the JPEG bytes."""
+    from encoder import encode
+    from util import rgb_to_ycbcr
+
+    ycbcr = rgb_to_ycbcr(rgb, kwargs.get("float_dtype"))
+    height, width, _ = rgb.shape
+    return encode(ycbcr[:, :, 0], ycbcr[:, :, 1], ycbcr[:, :, 2], width, height, **kwargs).jpeg_bitstream
+
+
+def psnr(reference: np.ndarray, image: np.ndarray) -> float:
+    """Peak signal-to-noise ratio of two uint8 images in dB."""
+    mse = np.mean((reference.astype(np.float64) - image.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+@pytest.fixture(scope="session")
+def monkey_rgb() -> np.ndarray:
+    """test-img/monkey.tiff as RGB uint8."""
+    cv2 = pytest.importorskip("cv2")
+    bgr = cv2.imread(MONKEY_PATH)
+    assert bgr is not None, f"Could not read {MONKEY_PATH}"
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+
+@pytest.fixture(scope="session")
+def small_rgb(monkey_rgb) -> np.ndarray:
+    """Odd-sized 77x53 crop, so partial MCUs are exercised."""
+    return np.ascontiguousarray(monkey_rgb[100:153, 200:277])
+
+
+@pytest.fixture(scope="session")
+def small_jpeg(small_rgb) -> bytes:
+    """small_rgb encoded by this encoder (baseline 4:4:4, standard tables)."""
+    return encode_rgb(small_rgb)
@@ -0,0 +1,122 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+decode_batch(): every slice must match a per-image decode, with and without resizing and normalisation.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from conftest import encode_rgb
+from decoder import Decoder, decode_batch
+from util.dct_basis import scaled_idct_size
+
+MEAN = (123.675, 116.28, 103.53)
+STD = (58.395, 57.12, 57.375)
+
+
+@pytest.fixture(scope="module")
+def jpegs(monkey_rgb):
+    """Six 96x128 JPEGs: our 4:4:4 encoder and libjpeg 4:2:0, different crops."""
+    cv2 = pytest.importorskip("cv2")
+    crops = [np.ascontiguousarray(monkey_rgb[y:y + 96, x:x + 128]) for y, x in
+             [(0, 0), (40, 300), (200, 100), (350, 380), (416, 0), (123, 257)]]
+    encoded = []
+    for i, crop in enumerate(crops):
+        if i % 2:
+            ok, buffer = cv2.imencode(".jpg", crop[..., ::-1], [
+                cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420])
+            encoded.append(buffer.tobytes())
+        else:
+            encoded.append(encode_rgb(crop))
+    return encoded
+
+
+def _resized(jpeg: bytes, width: int, height: int) -> np.ndarray:
+    """The reference for a batch slice of another size: scaled IDCT, then INTER_AREA."""
+    import cv2
+
+    decoded = Decoder().decode(jpeg, size=scaled_idct_size(128, 96, width, height))
+    if decoded.shape[:2] == (height, width):
+        return decoded
+    return cv2.resize(decoded, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def test_uint8_matches_decode(jpegs):
+    batch = decode_batch(jpegs)
+    assert batch.shape == (6, 96, 128, 3) and batch.dtype == np.uint8
+    for image, jpeg in zip(batch, jpegs):
+        np.testing.assert_array_equal(image, Decoder().decode(jpeg))
+
+
+def test_float32_normalisation(jpegs):
+    batch = decode_batch(jpegs, dtype=np.float32, mean=MEAN, std=STD)
+    assert batch.dtype == np.float32
+    for image, jpeg in zip(batch, jpegs):
+        expected = (Decoder().decode(jpeg) - np.asarray(MEAN)) / np.asarray(STD)
+        np.testing.assert_allclose(image, expected, rtol=1e-5, atol=1e-5)
+    # Without mean/std the float32 batch holds the pixel values
+    np.testing.assert_array_equal(decode_batch(jpegs, dtype=np.float32), decode_batch(jpegs))
+
+
+@pytest.mark.parametrize("size", [(64, 48), (32, 24), (50, 40), (16, 12), (200, 150)])
+def test_scaled_idct_and_resize(jpegs, size):
+    width, height = size
+    batch = decode_batch(jpegs, size=size)
+    assert batch.shape == (6, height, width, 3)
+    for image, jpeg in zip(batch, jpegs):
+        np.testing.assert_array_equal(image, _resized(jpeg, width, height))
+
+    normalised = decode_batch(jpegs, size=size, dtype=np.float32, mean=MEAN, std=STD)
+    for image, jpeg in zip(normalised, jpegs):
+        expected = (_resized(jpeg, width, height) - np.asarray(MEAN)) / np.asarray(STD)
+        np.testing.assert_allclose(image, expected, rtol=1e-5, atol=1e-5)
+
+
+def test_out_is_filled_in_place(jpegs):
+    out = np.zeros((6, 48, 64, 3), dtype=np.float32)
+    assert decode_batch(jpegs, out=out, mean=128.0) is out
+    np.testing.assert_allclose(out[3], Decoder().decode(jpegs[3], size=4) - 128.0)
+
+
+def test_thread_pool_matches_serial(jpegs):
+    serial = decode_batch(jpegs, size=(50, 40), dtype=np.float32, mean=MEAN, std=STD)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        for chunk_size in (None, 1, 4):
+            parallel = decode_batch(jpegs, size=(50, 40), dtype=np.float32, mean=MEAN, std=STD,
+                                    executor=executor, chunk_size=chunk_size)
+            np.testing.assert_array_equal(parallel, serial)
+        np.testing.assert_array_equal(decode_batch(jpegs, executor=executor), decode_batch(jpegs))
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"out": np.empty((5, 96, 128, 3), dtype=np.uint8)}, "out must be a C-contiguous array"),
+    ({"out": np.empty((6, 96, 128, 4), dtype=np.uint8)}, "out must be a C-contiguous array"),
+    ({"out": np.empty((6, 128, 96, 3), dtype=np.uint8).transpose(0, 2, 1, 3)}, "out must be a C-contiguous array"),
+    ({"out": np.empty((6, 96, 128, 3), dtype=np.uint8), "size": (64, 48)}, "does not match size"),
+    ({"out": np.empty((6, 96, 128, 3), dtype=np.float64)}, "Unsupported batch dtype"),
+    ({"dtype": np.int16}, "Unsupported batch dtype"),
+    ({"mean": 0.5}, "needs a float32 batch"),
+    ({"dtype": np.float32, "std": (1.0, 0.0, 1.0)}, "std must be non-zero"),
+    ({"size": (0, 10)}, "Batch size must be positive"),
+    ({"upsampling": "cubic"}, "upsampling"),
+])
+def test_invalid_arguments_raise(jpegs, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        decode_batch(jpegs, **kwargs)
+
+
+def test_empty_batch(jpegs):
+    with pytest.raises(ValueError, match="size is required"):
+        decode_batch([])
+    assert decode_batch([], size=(8, 8)).shape == (0, 8, 8, 3)
+
+
+def test_process_pool_needs_memmap(jpegs):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError, match="np.memmap"):
+            decode_batch(jpegs, executor=executor)
@@ -0,0 +1,100 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Block reuse: flat and repeated blocks must encode byte-identical to transforming every block.
+"""
+import sys
+
+import numpy as np
+import pytest
+
+from encoder import encode
+from encoder.block_reuse import BlockReuse, find_block_reuse
+from util import rgb_to_ycbcr
+
+
+def _flat_regions() -> np.ndarray:
+    # Screen-like: solid panels around a noisy picture, odd size so the edge blocks are padded
+    rng = np.random.default_rng(0)
+    rgb = np.empty((61, 75, 3), dtype=np.uint8)
+    rgb[:, :40] = (240, 240, 240)
+    rgb[:, 40:] = (30, 90, 200)
+    rgb[16:40, 8:56] = rng.integers(0, 256, (24, 48, 3))
+    return rgb
+
+
+def _repeated_tiles() -> np.ndarray:
+    rng = np.random.default_rng(1)
+    tile = rng.integers(0, 256, (16, 24, 3), dtype=np.uint8)
+    return np.ascontiguousarray(np.tile(tile, (4, 4, 1))[:61, :91])
+
+
+def _random() -> np.ndarray:
+    return np.random.default_rng(2).integers(0, 256, (53, 77, 3), dtype=np.uint8)
+
+
+def _encode(rgb: np.ndarray):
+    ycbcr = rgb_to_ycbcr(rgb)
+    height, width, _ = rgb.shape
+    return encode(ycbcr[:, :, 0], ycbcr[:, :, 1], ycbcr[:, :, 2], width, height)
+
+
+def _no_reuse(blocks: np.ndarray) -> BlockReuse:
+    n = blocks.shape[0]
+    return BlockReuse(None, None, n, 0, 0, n)
+
+
+def _expected_counts(blocks: np.ndarray):
+    """(flat, distinct) blocks counted with numpy."""
+    rows = blocks.reshape(len(blocks), 64)
+    flat = int((rows.min(axis=1) == rows.max(axis=1)).sum())
+    return flat, len(np.unique(rows, axis=0))
+
+
+@pytest.mark.parametrize("image, min_hit_rate", [(_flat_regions, 0.5), (_repeated_tiles, 0.8), (_random, 0.0)])
+def test_reuse_is_byte_identical_to_plain_transform(monkeypatch, image, min_hit_rate):
+    rgb = image()
+    reused = _encode(rgb)
+    with monkeypatch.context() as patch:
+        # encoder.encode is shadowed by the function in the package namespace
+        patch.setattr(sys.modules["encoder.encode"], "find_block_reuse", _no_reuse)
+        plain = _encode(rgb)
+    assert reused.jpeg_bitstream == plain.jpeg_bitstream
+    for name in ("dct_y", "dct_cb", "dct_cr", "quant_y", "quant_cb", "quant_cr"):
+        np.testing.assert_array_equal(getattr(reused, name), getattr(plain, name))
+
+    for component, blocks in zip(("y", "cb", "cr"), (reused.mcus_y, reused.mcus_cb, reused.mcus_cr)):
+        stats = reused.block_reuse[component]
+        assert stats["blocks"] == len(blocks)
+        if min_hit_rate == 0.0:
+            # Random content: the probe gives up and every block is transformed
+            assert stats["hit_rate"] == 0.0
+            continue
+        flat, distinct = _expected_counts(blocks)
+        assert (stats["flat_blocks"], stats["distinct_blocks"]) == (flat, distinct)
+        assert stats["hit_rate"] == pytest.approx(1.0 - distinct / len(blocks))
+        assert stats["hit_rate"] >= min_hit_rate
+
+
+def test_groups_map_every_block_to_an_identical_one():
+    rng = np.random.default_rng(3)
+    distinct = rng.integers(-128, 128, (5, 8, 8)).astype(np.int16)
+    distinct[:2] = [[7]], [[-3]]  # two flat levels
+    order = rng.integers(0, 5, 200)
+    blocks = distinct[order]
+    reuse = find_block_reuse(blocks)
+    assert reuse.distinct_blocks == len(set(order.tolist()))
+    assert reuse.flat_blocks == int((order < 2).sum())
+    assert reuse.repeated_blocks == int((order >= 2).sum()) - len(set(order[order >= 2].tolist()))
+    np.testing.assert_array_equal(reuse.expand(reuse.select(blocks)), blocks)
+
+
+def test_low_reuse_transforms_everything():
+    blocks = np.random.default_rng(4).integers(-128, 128, (64, 8, 8)).astype(np.int16)
+    blocks[1] = blocks[0]
+    reuse = find_block_reuse(blocks)
+    assert reuse.unique is None and reuse.inverse is None
+    assert reuse.select(blocks) is blocks
+    # Scanned in full (min_reuse_rate=0): the one repeat is still counted
+    assert find_block_reuse(blocks, min_reuse_rate=0.0).repeated_blocks == 1
@@ -0,0 +1,154 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+EncodeCache: keys, hits across both tiers, byte budgets and eviction order.
+"""
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import encode_rgb
+from encoder import EncodeCache
+
+
+def _entry(key: str, size: int) -> bytes:
+    return key.encode()[:1] * size
+
+
+def test_encode_hit_is_identical_and_skips_the_pipeline(small_rgb, small_jpeg):
+    cache = EncodeCache()
+    assert encode_rgb(small_rgb, cache=cache) == small_jpeg
+    stats = cache.stats
+    assert (stats.misses, stats.stores, stats.hits) == (1, 1, 0)
+
+    from encoder import encode
+    from util import rgb_to_ycbcr
+
+    ycbcr = rgb_to_ycbcr(small_rgb)
+    result = encode(ycbcr[:, :, 0], ycbcr[:, :, 1], ycbcr[:, :, 2], 77, 53, cache=cache)
+    assert result.jpeg_bitstream == small_jpeg
+    assert result.dct_y is None
+    assert cache.stats.memory_hits == 1
+
+
+def test_settings_that_change_the_output_change_the_key(small_rgb):
+    cache = EncodeCache()
+    outputs = {
+        encode_rgb(small_rgb, cache=cache),
+        encode_rgb(small_rgb, cache=cache, quality=30),
+        encode_rgb(small_rgb, cache=cache, float_dtype=np.float64),
+        encode_rgb(np.ascontiguousarray(small_rgb[::-1]), cache=cache),
+    }
+    assert cache.stats.misses == 4
+    assert len(outputs) >= 3  # float64 may round to the same bytes
+    # quality=50 and None use the same tables: same key
+    encode_rgb(small_rgb, cache=cache, quality=50)
+    assert cache.stats.hits == 1
+
+
+def test_staged_and_verbose_encodes_bypass_the_cache(small_rgb):
+    cache = EncodeCache()
+    encode_rgb(small_rgb, cache=cache, last_encoding_stage="DPCM")
+    assert cache.stats.misses == cache.stats.stores == 0
+
+
+def test_key_covers_shape_dtype_and_params():
+    cache = EncodeCache()
+    plane = np.arange(64, dtype=np.uint8).reshape(8, 8)
+    key = cache.key([plane], 8, 8, sampling="4:4:4")
+    assert key == cache.key([plane.copy()], 8, 8, sampling="4:4:4")
+    assert key != cache.key([plane.reshape(4, 16)], 8, 8, sampling="4:4:4")
+    assert key != cache.key([plane.astype(np.int16)], 8, 8, sampling="4:4:4")
+    assert key != cache.key([plane], 8, 8, sampling="4:2:0")
+    assert key != cache.key([plane], 8, 8, sampling="4:4:4", table=np.ones((8, 8)))
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EncodeCache(max_memory_bytes=300)
+    for key in "abc":
+        cache.put(key, _entry(key, 100))
+    cache.get("a")  # a is now the most recent
+    cache.put("d", _entry("d", 100))
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [_entry(key, 100) for key in "acd"]
+    stats = cache.stats
+    assert (stats.memory_evictions, stats.memory_bytes, stats.memory_entries) == (1, 300, 3)
+
+    # Larger than the whole budget: not kept, nothing else evicted
+    cache.put("e", _entry("e", 301))
+    assert cache.get("e") is None
+    assert cache.stats.memory_entries == 3
+
+
+def test_disk_tier_is_shared_and_promoted(tmp_path):
+    writer = EncodeCache(directory=str(tmp_path))
+    writer.put("a", b"jpeg")
+    reader = EncodeCache(directory=str(tmp_path))
+    assert reader.stats.disk_bytes == 4
+    assert reader.get("a") == b"jpeg"
+    assert reader.get("a") == b"jpeg"
+    stats = reader.stats
+    assert (stats.disk_hits, stats.memory_hits, stats.misses) == (1, 1, 0)
+    # Written atomically: no temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg"]
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    cache = EncodeCache(max_memory_bytes=0, directory=str(tmp_path), max_disk_bytes=350)
+    for age, key in enumerate("abc"):
+        cache.put(key, _entry(key, 100))
+        # Distinct modification times, a oldest
+        os.utime(tmp_path / f"{key}.jpg", (1000 + age, 1000 + age))
+    cache.get("a")  # refreshed: now the newest
+    cache.put("d", _entry("d", 100))
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg", "c.jpg", "d.jpg"]
+    stats = cache.stats
+    assert (stats.disk_evictions, stats.disk_bytes) == (1, 300)
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = EncodeCache(directory=str(tmp_path))
+    cache.put("a", b"jpeg")
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+    assert cache.get("a") is None
+    stats = cache.stats
+    assert (stats.memory_bytes, stats.memory_entries, stats.disk_bytes) == (0, 0, 0)
+
+
+def test_clear_without_directory_leaves_the_working_directory_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "photo.jpg").write_bytes(b"jpeg")
+    cache = EncodeCache()
+    cache.put("a", b"jpeg")
+    cache.clear()
+    assert os.listdir(tmp_path) == ["photo.jpg"]
+
+
+def test_concurrent_use_keeps_counters_consistent(tmp_path):
+    cache = EncodeCache(max_memory_bytes=2000, directory=str(tmp_path), max_disk_bytes=4000)
+
+    def work(thread):
+        for i in range(200):
+            key = f"{(thread * 7 + i) % 60:02d}"
+            if cache.get(key) is None:
+                cache.put(key, _entry(key, 100))
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats
+    assert stats.hits + stats.misses == 8 * 200
+    assert stats.memory_bytes == 100 * stats.memory_entries <= 2000
+    disk_bytes = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert stats.disk_bytes == disk_bytes <= 4000
+
+
+def test_negative_budgets_raise():
+    with pytest.raises(ValueError):
+        EncodeCache(max_memory_bytes=-1)
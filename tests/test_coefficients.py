@@ -0,0 +1,67 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+decode_coefficients() and encode_coefficients() must round-trip losslessly.
+"""
+import numpy as np
+import pytest
+
+from decoder import decode_coefficients, decode_jpeg
+from encoder import encode_coefficients
+
+
+def _roundtrip(jpeg: bytes, **kwargs):
+    source = decode_coefficients(jpeg)
+    encoded = encode_coefficients(source.coefficients, source.quant_tables, source.sampling_factors,
+                                  width=source.width, height=source.height, **kwargs)
+    return source, encoded, decode_coefficients(encoded)
+
+
+def test_our_jpeg_is_rewritten_byte_identical(small_jpeg):
+    _, encoded, _ = _roundtrip(small_jpeg)
+    assert encoded == small_jpeg
+
+
+@pytest.mark.parametrize("sampling", ["444", "422", "420"])
+@pytest.mark.parametrize("huffman", ["standard", "optimized"])
+def test_libjpeg_coefficients_roundtrip(small_rgb, sampling, huffman):
+    cv2 = pytest.importorskip("cv2")
+    ok, buffer = cv2.imencode(".jpg", small_rgb[..., ::-1], [
+        cv2.IMWRITE_JPEG_PROGRESSIVE, 1,
+        cv2.IMWRITE_JPEG_SAMPLING_FACTOR, getattr(cv2, f"IMWRITE_JPEG_SAMPLING_FACTOR_{sampling}")])
+    source, encoded, decoded = _roundtrip(buffer.tobytes(), huffman=huffman)
+    assert not decoded.progressive
+    assert decoded.sampling_factors == source.sampling_factors
+    for a, b in zip(decoded.coefficients, source.coefficients):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(decode_jpeg(encoded), decode_jpeg(buffer.tobytes()))
+
+
+def test_optimized_tables_are_smaller(monkey_rgb):
+    from conftest import encode_rgb
+
+    jpeg = encode_rgb(np.ascontiguousarray(monkey_rgb[:256, :256]))
+    _, optimized, decoded = _roundtrip(jpeg, huffman="optimized")
+    assert len(optimized) < len(jpeg)
+    np.testing.assert_array_equal(decoded.coefficients[0], decode_coefficients(jpeg).coefficients[0])
+
+
+def test_zigzag_input_matches_natural_order(small_jpeg):
+    natural = decode_coefficients(small_jpeg)
+    zigzag = decode_coefficients(small_jpeg, zigzag=True)
+    assert encode_coefficients(zigzag.coefficients, zigzag.quant_tables, zigzag=True,
+                               width=77, height=53) == small_jpeg
+    assert encode_coefficients(natural.coefficients, natural.quant_tables, width=77, height=53) == small_jpeg
+
+
+def test_out_of_range_coefficients_raise(small_jpeg):
+    source = decode_coefficients(small_jpeg)
+    ac = [blocks.copy() for blocks in source.coefficients]
+    ac[1][0, 0, 1] = 1024
+    with pytest.raises(ValueError, match="AC coefficients"):
+        encode_coefficients(ac, source.quant_tables)
+    dc = [blocks.copy() for blocks in source.coefficients]
+    dc[0][0, 1, 0] = dc[0][0, 0, 0] + 2048
+    with pytest.raises(ValueError, match="DC differences"):
+        encode_coefficients(dc, source.quant_tables)
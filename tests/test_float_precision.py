@@ -0,0 +1,58 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+float32 precision mode: quality must match the float64 path on test-img/monkey.tiff.
+"""
+import numpy as np
+import pytest
+
+from conftest import MIN_PSNR, encode_rgb, psnr
+from decoder import Decoder, decode_jpeg
+from util.color_conversion import ycbcr_to_rgb
+
+# Largest PSNR difference (dB) allowed between the float32 and float64 paths
+MAX_PSNR_DIFFERENCE = 0.01
+
+
+@pytest.fixture(scope="module")
+def monkey_psnr(monkey_rgb):
+    """PSNR against the original of encode + decode at every (encoder, decoder) precision."""
+    results = {}
+    for encode_dtype in (np.float32, np.float64):
+        jpeg = encode_rgb(monkey_rgb, float_dtype=encode_dtype)
+        for decode_dtype in (np.float32, np.float64):
+            ycbcr = decode_jpeg(jpeg, float_dtype=decode_dtype)
+            assert ycbcr.dtype == decode_dtype
+            results[encode_dtype, decode_dtype] = psnr(monkey_rgb, ycbcr_to_rgb(ycbcr))
+    return results
+
+
+def test_float32_round_trip_matches_float64(monkey_psnr):
+    reference = monkey_psnr[np.float64, np.float64]
+    assert reference > MIN_PSNR
+    assert abs(monkey_psnr[np.float32, np.float32] - reference) < MAX_PSNR_DIFFERENCE
+
+
+@pytest.mark.parametrize("encode_dtype", [np.float32, np.float64])
+def test_decoder_precision_does_not_change_quality(monkey_psnr, encode_dtype):
+    assert abs(monkey_psnr[encode_dtype, np.float32] - monkey_psnr[encode_dtype, np.float64]) < MAX_PSNR_DIFFERENCE
+
+
+def test_decoder_object_float32_matches_float64(monkey_rgb):
+    jpeg = encode_rgb(monkey_rgb)
+    rgb32 = Decoder(float_dtype=np.float32).decode(jpeg)
+    rgb64 = Decoder(float_dtype=np.float64).decode(jpeg)
+    assert np.abs(rgb32.astype(np.int16) - rgb64).max() <= 1
+    assert abs(psnr(monkey_rgb, rgb32) - psnr(monkey_rgb, rgb64)) < MAX_PSNR_DIFFERENCE
+
+
+def test_colour_conversion_defaults_to_float32(monkey_rgb):
+    from util import rgb_to_ycbcr
+
+    default = rgb_to_ycbcr(monkey_rgb)
+    np.testing.assert_array_equal(default, rgb_to_ycbcr(monkey_rgb, np.float32))
+    # Truncation to uint8 may land one step lower in float32, never further
+    difference = default.astype(np.int16) - rgb_to_ycbcr(monkey_rgb, np.float64)
+    assert np.abs(difference).max() <= 1
+    assert np.count_nonzero(difference) < 1e-3 * difference.size
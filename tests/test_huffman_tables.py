@@ -0,0 +1,66 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Malformed DHT segments must raise ValueError, never crash the scan decoder.
+"""
+import pytest
+
+from decoder import Decoder, decode_coefficients, decode_jpeg
+
+
+def _dht_offsets(jpeg: bytes):
+    """Offsets of the table class/id byte of every DHT segment."""
+    offsets = []
+    pos = jpeg.find(b"\xff\xc4")
+    while pos >= 0:
+        offsets.append(pos + 4)
+        pos = jpeg.find(b"\xff\xc4", pos + 2)
+    return offsets
+
+
+def _decoders():
+    return [decode_coefficients, lambda data: Decoder().decode(data), decode_jpeg]
+
+
+@pytest.mark.parametrize("table", range(4))
+def test_oversubscribed_code_lengths_raise(small_jpeg, table):
+    corrupt = bytearray(small_jpeg)
+    # Three 1-bit codes where only two exist: the lookahead fill would run past its arrays
+    corrupt[_dht_offsets(small_jpeg)[table] + 1] = 3
+    for decode in _decoders():
+        with pytest.raises(ValueError):
+            decode(bytes(corrupt))
+
+
+def test_dc_symbol_above_category_11_raises(small_jpeg):
+    corrupt = bytearray(small_jpeg)
+    offset = _dht_offsets(small_jpeg)[0]
+    assert corrupt[offset] >> 4 == 0  # DC table
+    corrupt[offset + 17] = 12  # first symbol
+    for decode in _decoders():
+        with pytest.raises(ValueError, match="DC Huffman table"):
+            decode(bytes(corrupt))
+
+
+def test_random_dht_corruption_raises_value_error(small_jpeg):
+    import random
+
+    rng = random.Random(0)
+    offsets = _dht_offsets(small_jpeg)
+    for _ in range(300):
+        corrupt = bytearray(small_jpeg)
+        corrupt[rng.choice(offsets) + 1 + rng.randrange(28)] = rng.randrange(256)
+        try:
+            decode_coefficients(bytes(corrupt))
+        except ValueError:
+            pass
+
+
+@pytest.mark.parametrize("mcus_x, mcus_y", [(0, 1), (1, 0), (-1, 4)])
+def test_empty_mcu_grid_raises(small_jpeg, mcus_x, mcus_y):
+    from decoder.huffman_decode import ScanDecoderCy
+
+    # rows_done divides by mcus_x with C division: the kernel must refuse the grid up front
+    with pytest.raises(ValueError, match="MCU grid"):
+        ScanDecoderCy(small_jpeg, 0, [None], [None], mcus_x, mcus_y)
@@ -0,0 +1,37 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Quality ladders: every rendition must be identical to encode() at its quality.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from conftest import encode_rgb
+from encoder import encode_ladder
+
+QUALITIES = [1, 10, 50, None, 75, 90, 100]
+
+
+@pytest.mark.parametrize("float_dtype", [None, np.float64])
+def test_every_rung_matches_encode(small_rgb, float_dtype):
+    renditions = encode_ladder(small_rgb, QUALITIES, float_dtype=float_dtype)
+    assert len(renditions) == len(QUALITIES)
+    for quality, jpeg in zip(QUALITIES, renditions):
+        assert jpeg == encode_rgb(small_rgb, quality=quality, float_dtype=float_dtype), quality
+
+
+def test_executor_keeps_order(monkey_rgb):
+    rgb = np.ascontiguousarray(monkey_rgb[:120, :200])
+    qualities = [95, 30, 60]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        parallel = encode_ladder(rgb, qualities, executor=executor)
+    assert parallel == encode_ladder(rgb, qualities)
+    assert parallel == [encode_rgb(rgb, quality=quality) for quality in qualities]
+
+
+def test_non_rgb_input_raises(small_rgb):
+    with pytest.raises(ValueError, match="Expected an RGB image"):
+        encode_ladder(small_rgb[..., 0], [75])
@@ -0,0 +1,94 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+MJPEG sessions: partially changed frames must match a full encode(), and both containers must frame them.
+"""
+import io
+
+import numpy as np
+import pytest
+
+from conftest import encode_rgb
+from encoder import MJPEGEncoder, encode_mjpeg
+
+
+def _frames(rgb: np.ndarray):
+    """The source, then a changed rectangle, then a change confined to the padded edge blocks."""
+    second = rgb.copy()
+    second[10:20, 30:41] = 255 - second[10:20, 30:41]
+    third = second.copy()
+    third[-3:, -2:] = 0
+    return [rgb, second, third]
+
+
+@pytest.mark.parametrize("float_dtype", [None, np.float64])
+@pytest.mark.parametrize("quality", [None, 90])
+def test_threshold_zero_matches_encode(small_rgb, float_dtype, quality):
+    session = MJPEGEncoder(77, 53, float_dtype=float_dtype, quality=quality)
+    changed = []
+    for frame in _frames(small_rgb):
+        assert session.encode_frame(frame) == encode_rgb(frame, float_dtype=float_dtype, quality=quality)
+        changed.append(session.last_changed_blocks)
+    # 10x11 pixels at (10, 30) touch block rows 1-2 and columns 3-5; the corner touches one block
+    assert changed == [session.blocks, 6, 1]
+    stats = session.stats()
+    assert stats["frames"] == 3
+    assert stats["blocks_recomputed"] == session.blocks + 7
+    assert stats["reuse_rate"] == pytest.approx(1.0 - (session.blocks + 7) / (3 * session.blocks))
+
+
+def test_threshold_skips_small_changes(small_rgb):
+    session = MJPEGEncoder(77, 53, threshold=3)
+    first = session.encode_frame(small_rgb)
+
+    # Sensor noise within the threshold: nothing is recomputed, the frame is unchanged
+    rng = np.random.default_rng(0)
+    noisy = np.clip(small_rgb + rng.integers(-3, 4, small_rgb.shape), 0, 255).astype(np.uint8)
+    assert session.encode_frame(noisy) == first
+    assert session.last_changed_blocks == 0
+
+    # One block changes by more than the threshold: only it takes the new pixels
+    moved = noisy.copy()
+    moved[17, 25] = small_rgb[17, 25] ^ 0x80
+    reference = small_rgb.copy()
+    reference[16:24, 24:32] = moved[16:24, 24:32]
+    assert session.encode_frame(moved) == encode_rgb(reference)
+    assert session.last_changed_blocks == 1
+
+    # reset() encodes the next frame in full
+    session.reset()
+    assert session.encode_frame(moved) == encode_rgb(moved)
+    assert session.last_changed_blocks == session.blocks
+
+
+def test_multipart_framing(small_rgb):
+    frames = _frames(small_rgb)
+    stream = io.BytesIO()
+    stats = encode_mjpeg(frames, stream, boundary="frame42")
+    assert stats["frames"] == 3
+
+    data = stream.getvalue()
+    for frame in frames:
+        jpeg = encode_rgb(frame)
+        header = f"--frame42\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+        assert data.startswith(header + jpeg + b"\r\n")
+        data = data[len(header) + len(jpeg) + 2:]
+    assert data == b""
+
+
+def test_concatenated_framing(small_rgb):
+    frames = _frames(small_rgb)
+    stream = io.BytesIO()
+    encode_mjpeg(frames, stream, container="concatenated", threshold=0)
+    assert stream.getvalue() == b"".join(encode_rgb(frame) for frame in frames)
+
+
+def test_invalid_arguments_raise(small_rgb):
+    assert encode_mjpeg([], io.BytesIO()) is None
+    with pytest.raises(ValueError, match="Unknown MJPEG container"):
+        encode_mjpeg([small_rgb], io.BytesIO(), container="avi")
+    with pytest.raises(ValueError, match="threshold"):
+        MJPEGEncoder(77, 53, threshold=255)
+    with pytest.raises(ValueError, match="Expected a frame of shape"):
+        MJPEGEncoder(77, 53).encode_frame(small_rgb[:, :-1])
@@ -0,0 +1,196 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Header parsing: probe(), decompression-bomb limits and malformed headers.
+"""
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from decoder import (Decoder, DecodeLimits, JpegLimitError, decode_batch, decode_coefficients, decode_into,
+                     decode_jpeg, iter_decode_rows, probe)
+
+
+def _limited_decoders(limits):
+    return [
+        lambda data: decode_jpeg(data, limits=limits),
+        lambda data: decode_coefficients(data, limits=limits),
+        lambda data: Decoder(limits=limits).decode(data),
+        lambda data: list(iter_decode_rows(data, limits=limits)),
+        lambda data: decode_into(data, np.empty((53, 77, 3), dtype=np.uint8), limits=limits),
+    ]
+
+
+def test_probe_baseline(small_jpeg):
+    info = probe(small_jpeg)
+    assert (info.width, info.height) == (77, 53)
+    assert info.num_components == 3
+    assert info.sampling_factors == [(1, 1)] * 3
+    assert not info.progressive
+    assert info.restart_interval == 0
+    assert info.file_size == len(small_jpeg)
+
+
+def test_probe_progressive_subsampled(small_rgb):
+    cv2 = pytest.importorskip("cv2")
+    ok, buffer = cv2.imencode(".jpg", small_rgb[..., ::-1],
+                              [cv2.IMWRITE_JPEG_PROGRESSIVE, 1, cv2.IMWRITE_JPEG_RST_INTERVAL, 3,
+                               cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420])
+    info = probe(buffer.tobytes())
+    assert info.progressive
+    assert info.restart_interval == 3
+    assert info.sampling_factors == [(2, 2), (1, 1), (1, 1)]
+
+
+def test_fingerprints_follow_tables(small_rgb, small_jpeg):
+    from conftest import encode_rgb
+
+    same = probe(encode_rgb(small_rgb[::-1].copy()))
+    other_quality = probe(encode_rgb(small_rgb, quality=30))
+    info = probe(small_jpeg)
+    assert info.quant_fingerprint == same.quant_fingerprint
+    assert info.huffman_fingerprint == same.huffman_fingerprint
+    assert info.quant_fingerprint != other_quality.quant_fingerprint
+    assert info.huffman_fingerprint == other_quality.huffman_fingerprint
+
+
+def test_probe_ignores_scan_data(small_jpeg):
+    from dataclasses import replace
+
+    # Everything after the SOS header can be missing or garbage
+    scan_start = small_jpeg.find(b"\xff\xda") + 14
+    garbage = small_jpeg[:scan_start] + b"\x00" * 10
+    assert probe(garbage) == replace(probe(small_jpeg), file_size=len(garbage))
+
+
+@pytest.mark.parametrize("limits", [DecodeLimits(max_pixels=77 * 53 - 1), DecodeLimits(max_bytes=100)])
+def test_limits_raise_before_decoding(small_jpeg, limits):
+    with pytest.raises(JpegLimitError):
+        probe(small_jpeg, limits)
+    # Only the header is valid: a decode that got past the limit check would fail differently
+    header_only = small_jpeg[:small_jpeg.find(b"\xff\xda") + 14]
+    for decode in _limited_decoders(limits):
+        with pytest.raises(JpegLimitError):
+            decode(header_only)
+
+
+def test_limits_at_the_boundary_pass(small_jpeg):
+    limits = DecodeLimits(max_pixels=77 * 53, max_bytes=len(small_jpeg))
+    for decode in _limited_decoders(limits):
+        decode(small_jpeg)
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "SOI"),
+    (b"\x89PNG\r\n\x1a\n", "SOI"),
+    (b"\xff\xd8\xff\xd9", "No image data"),
+    (b"\xff\xd8\xff\xda\x00\x08\x01\x01\x00\x00\x3f\x00", "SOS before SOF"),
+    (b"\xff\xd8\xff\xc3\x00\x0b\x08\x00\x10\x00\x10\x01\x01\x11\x00", "Unsupported JPEG process"),
+    (b"\xff\xd8\xff\xc0\x00\x0b\x0c\x00\x10\x00\x10\x01\x01\x11\x00", "precision"),
+    (b"\xff\xd8\xff\xdb\x00\x43\x00", "Truncated segment"),
+    (b"\xff\xd8\x00\x00\x00\x00", "Expected marker"),
+])
+def test_malformed_headers_raise(data, message):
+    with pytest.raises(ValueError, match=message):
+        probe(data)
+
+
+def test_corrupt_or_truncated_headers_raise_value_error(small_jpeg):
+    rng = random.Random(0)
+    header_end = small_jpeg.find(b"\xff\xda") + 14
+    for _ in range(500):
+        corrupt = bytearray(small_jpeg)
+        if rng.random() < 0.5:
+            corrupt[rng.randrange(2, header_end)] = rng.randrange(256)
+        else:
+            del corrupt[rng.randrange(header_end):]
+        for decode in (probe, decode_coefficients, decode_jpeg):
+            try:
+                decode(bytes(corrupt))
+            except ValueError:
+                pass
+
+
+def _sof(jpeg: bytes):
+    """(offset, length) of the SOF0 segment."""
+    offset = jpeg.find(b"\xff\xc0")
+    return offset, int.from_bytes(jpeg[offset + 2:offset + 4], "big")
+
+
+def _zero_width(jpeg: bytes) -> bytes:
+    offset, _ = _sof(jpeg)
+    return jpeg[:offset + 7] + b"\x00\x00" + jpeg[offset + 9:]
+
+
+def _overrunning_components(jpeg: bytes) -> bytes:
+    # Nf = 40 in a segment holding 3 components: the next segments would be read as components
+    offset, _ = _sof(jpeg)
+    return jpeg[:offset + 9] + b"\x28" + jpeg[offset + 10:]
+
+
+def _repeated_sof(jpeg: bytes) -> bytes:
+    offset, length = _sof(jpeg)
+    segment = jpeg[offset:offset + 2 + length]
+    return jpeg[:offset] + segment + segment + jpeg[offset + 2 + length:]
+
+
+_FRAME_DECODERS = {
+    "probe": probe,
+    "decode_jpeg": decode_jpeg,
+    "Decoder": lambda data: Decoder().decode(data),
+    "decode_coefficients": decode_coefficients,
+    "decode_batch": lambda data: decode_batch([data]),
+}
+
+
+@pytest.mark.parametrize("corrupt, message", [
+    (_overrunning_components, "does not match 40 components"),
+    (_repeated_sof, "more than one SOF"),
+])
+def test_malformed_sof_raises(small_jpeg, corrupt, message):
+    data = corrupt(small_jpeg)
+    for decode in _FRAME_DECODERS.values():
+        with pytest.raises(ValueError, match=message):
+            decode(data)
+
+
+def test_zero_width_raises(small_jpeg, tmp_path):
+    # The scan decoder once divided by the zero MCU grid width in native code (SIGFPE): run the
+    # decoders in a child process so a regression fails this test instead of killing the runner
+    path = tmp_path / "zero_width.jpg"
+    path.write_bytes(_zero_width(small_jpeg))
+    script = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+sys.path.insert(0, {os.path.join(ROOT, "tests")!r})
+from test_probe import _FRAME_DECODERS
+data = open({str(path)!r}, "rb").read()
+for name, decode in _FRAME_DECODERS.items():
+    try:
+        decode(data)
+    except ValueError as e:
+        print(name, "ValueError", e)
+    else:
+        print(name, "decoded")
+"""
+    child = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=120)
+    assert child.returncode == 0, child.stderr
+    lines = [line for line in child.stdout.splitlines() if " ValueError " in line or " decoded" in line]
+    assert lines == [f"{name} ValueError Invalid image size 0x53" for name in _FRAME_DECODERS]
+
+
+def test_check_limits_rejects_empty_frames():
+    from decoder.jpeg_parser import FrameComponent, JpegHeader
+    from decoder.probe import check_limits
+
+    component = FrameComponent(component_id=1, h=1, v=1, quant_table_id=0)
+    with pytest.raises(ValueError, match="Invalid image size"):
+        check_limits(JpegHeader(width=0, height=8, components=[component]), 100)
+    with pytest.raises(ValueError, match="without components"):
+        check_limits(JpegHeader(width=8, height=8), 100)
@@ -0,0 +1,85 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Progressive decoding: spectral selection and successive approximation refinement must
+rebuild exactly the coefficients of the equivalent baseline file.
+"""
+import numpy as np
+import pytest
+
+from decoder import decode_coefficients, decode_jpeg
+
+SAMPLINGS = ["444", "422", "420"]
+
+
+def _cv2_jpeg(rgb: np.ndarray, sampling: str, progressive: bool, restart_interval: int = 0) -> bytes:
+    """rgb encoded by libjpeg (through OpenCV) at quality 85."""
+    cv2 = pytest.importorskip("cv2")
+    factor = getattr(cv2, f"IMWRITE_JPEG_SAMPLING_FACTOR_{sampling}")
+    ok, buffer = cv2.imencode(".jpg", rgb[..., ::-1], [
+        cv2.IMWRITE_JPEG_QUALITY, 85, cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive),
+        cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factor, cv2.IMWRITE_JPEG_RST_INTERVAL, restart_interval])
+    assert ok
+    return buffer.tobytes()
+
+
+def _scan_params(jpeg: bytes):
+    """(Ss, Se, Ah, Al) of every scan."""
+    params = []
+    pos = jpeg.find(b"\xff\xda")
+    while pos >= 0:
+        count = jpeg[pos + 4]
+        ss, se, a = jpeg[pos + 5 + 2 * count:pos + 8 + 2 * count]
+        params.append((ss, se, a >> 4, a & 0x0F))
+        pos = jpeg.find(b"\xff\xda", pos + 2)
+    return params
+
+
+@pytest.mark.parametrize("sampling", SAMPLINGS)
+@pytest.mark.parametrize("restart_interval", [0, 5])
+def test_refinement_matches_baseline_coefficients(monkey_rgb, sampling, restart_interval):
+    rgb = np.ascontiguousarray(monkey_rgb[:101, :133])
+    progressive = _cv2_jpeg(rgb, sampling, True, restart_interval)
+    # libjpeg's default script refines DC and AC by successive approximation
+    assert any(ah for _, _, ah, _ in _scan_params(progressive))
+    expected = decode_coefficients(_cv2_jpeg(rgb, sampling, False))
+    actual = decode_coefficients(progressive)
+    assert actual.progressive and not expected.progressive
+    for a, e in zip(actual.coefficients, expected.coefficients):
+        np.testing.assert_array_equal(a, e)
+
+
+def test_scan_callbacks_track_refinement(monkey_rgb):
+    rgb = np.ascontiguousarray(monkey_rgb[:101, :133])
+    jpeg = _cv2_jpeg(rgb, "420", True)
+    progress = []
+    final = decode_jpeg(jpeg, on_scan=lambda scan: progress.append(
+        (scan.spectral_start, scan.spectral_end, scan.approx_high, scan.approx_low,
+         list(scan.spectral_extent), scan.preview_size, scan.render().shape)))
+
+    assert [p[:4] for p in progress] == _scan_params(jpeg)
+    extents = np.array([p[4] for p in progress])
+    assert (np.diff(extents, axis=0) >= 0).all()
+    assert extents[-1].tolist() == [63, 63, 63]
+    # DC-only scans preview at 1/8 scale, the full image once all luma coefficients arrived
+    assert progress[0][5] == 1 and progress[0][6] == (13, 17, 3)
+    assert progress[-1][5] == 8 and progress[-1][6] == (101, 133, 3)
+    np.testing.assert_allclose(final, decode_jpeg(_cv2_jpeg(rgb, "420", False)), atol=1e-3)
+
+
+def test_truncated_file_keeps_complete_scans(monkey_rgb):
+    rgb = np.ascontiguousarray(monkey_rgb[:101, :133])
+    jpeg = _cv2_jpeg(rgb, "444", True)
+    starts = [pos for pos in range(len(jpeg)) if jpeg.startswith(b"\xff\xda", pos)]
+    assert _scan_params(jpeg)[:2] == [(0, 0, 0, 1), (1, 5, 0, 2)]
+    # Cut inside the third scan: DC (point transform 1) and luma AC 1-5 (point transform 2) are kept
+    progress = []
+    decode_jpeg(jpeg[:starts[2] + 40], on_scan=progress.append)
+    assert len(progress) == 2
+    partial = decode_coefficients(jpeg[:starts[2] + 40], zigzag=True).coefficients[0].astype(np.int32)
+    full = decode_coefficients(jpeg, zigzag=True).coefficients[0].astype(np.int32)
+    # DC is an arithmetic shift, AC a division rounding towards zero (ITU T.81 G.1.1.1.1)
+    np.testing.assert_array_equal(partial[..., 0], full[..., 0] >> 1 << 1)
+    np.testing.assert_array_equal(partial[..., 1:6], np.sign(full[..., 1:6]) * (np.abs(full[..., 1:6]) >> 2 << 2))
+    assert not partial[..., 6:].any()
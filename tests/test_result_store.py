@@ -0,0 +1,78 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Saved encoding results: every stage must decode exactly as before saving, from memory-mapped arrays.
+"""
+import mmap
+
+import numpy as np
+import pytest
+
+from decoder import decode
+from encoder import encode
+from util import EncodingResult, rgb_to_ycbcr
+from util.encoding_stages import ALL_STAGES, STAGE_JPEG
+from util.result_store import last_stage
+
+
+def _encode(rgb: np.ndarray, stage: str) -> EncodingResult:
+    ycbcr = rgb_to_ycbcr(rgb)
+    height, width, _ = rgb.shape
+    return encode(ycbcr[:, :, 0], ycbcr[:, :, 1], ycbcr[:, :, 2], width, height, last_encoding_stage=stage)
+
+
+def _stage_values(result: EncodingResult):
+    """Every populated field of a result, with the packed (bits/pairs, offsets) stages unpacked."""
+    for name, value in vars(result).items():
+        if isinstance(value, tuple):
+            for i, part in enumerate(value):
+                yield f"{name}[{i}]", part
+        elif isinstance(value, np.ndarray):
+            yield name, value
+
+
+@pytest.mark.parametrize("stage", ALL_STAGES)
+def test_save_load_decode_is_exact(small_rgb, tmp_path, stage):
+    result = _encode(small_rgb, stage)
+    assert last_stage(result) == stage
+    expected = decode(result, stage)
+
+    result.save(str(tmp_path / "result"))
+    loaded = EncodingResult.load(str(tmp_path / "result"))
+    assert last_stage(loaded) == stage
+    assert (loaded.img_width, loaded.img_height) == (77, 53)
+    assert loaded.block_reuse == result.block_reuse
+
+    # Nothing is read eagerly: the arrays are mapped, the JPEG bytes too
+    values = dict(_stage_values(loaded))
+    assert values
+    for name, value in values.items():
+        assert isinstance(value, np.memmap), name
+        assert not value.flags.writeable, name
+    if stage == STAGE_JPEG:
+        assert isinstance(loaded.jpeg_bitstream, mmap.mmap)
+        assert bytes(loaded.jpeg_bitstream) == result.jpeg_bitstream
+
+    decoded = decode(loaded, stage)
+    assert decoded.dtype == expected.dtype
+    np.testing.assert_array_equal(decoded, expected)
+
+    in_memory = EncodingResult.load(str(tmp_path / "result"), mmap_mode=None)
+    assert not any(isinstance(value, np.memmap) for _, value in _stage_values(in_memory))
+    np.testing.assert_array_equal(decode(in_memory, stage), expected)
+
+
+def test_saving_again_replaces_the_stage(small_rgb, tmp_path):
+    path = str(tmp_path / "result")
+    _encode(small_rgb, "DCT").save(path)
+    _encode(small_rgb, STAGE_JPEG).save(path)
+    assert last_stage(EncodingResult.load(path)) == STAGE_JPEG
+
+
+def test_missing_or_foreign_directory_raises(tmp_path):
+    with pytest.raises(ValueError, match="manifest.json missing"):
+        EncodingResult.load(str(tmp_path))
+    (tmp_path / "manifest.json").write_text('{"format_version": 99}')
+    with pytest.raises(ValueError, match="Unsupported encoding result format 99"):
+        EncodingResult.load(str(tmp_path))
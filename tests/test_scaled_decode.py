@@ -0,0 +1,57 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Scaled IDCT decodes (1/2, 1/4, 1/8), in particular of subsampled chroma.
+"""
+import numpy as np
+import pytest
+
+from decoder import Decoder
+from decoder.idct import idct_scaled
+
+cv2 = pytest.importorskip("cv2")
+
+SAMPLING = {"4:4:4": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444, "4:2:2": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+            "4:2:0": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420}
+
+
+def _libjpeg(rgb: np.ndarray, sampling: str) -> bytes:
+    params = [cv2.IMWRITE_JPEG_QUALITY, 90, cv2.IMWRITE_JPEG_SAMPLING_FACTOR, SAMPLING[sampling]]
+    return cv2.imencode(".jpg", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), params)[1].tobytes()
+
+
+def _chroma_error(jpeg: bytes, size: int) -> np.ndarray:
+    """Mean absolute Cr/Cb error of a scaled decode against an area-resized full decode."""
+    full = Decoder().decode(jpeg)
+    small = Decoder().decode(jpeg, size=size)
+    reference = cv2.resize(full, (small.shape[1], small.shape[0]), interpolation=cv2.INTER_AREA)
+    small, reference = (cv2.cvtColor(image, cv2.COLOR_RGB2YCrCb).astype(np.float64) for image in (small, reference))
+    return np.abs(small - reference).mean(axis=(0, 1))[1:]
+
+
+@pytest.mark.parametrize("sampling", ["4:2:2", "4:2:0"])
+def test_subsampled_chroma_keeps_detail_at_one_eighth(monkey_rgb, sampling):
+    jpeg = _libjpeg(np.ascontiguousarray(monkey_rgb[:509, :503]), sampling)
+    # One chroma DC per 16x16 area (IDCT at the luma scale, then upsampled) gave about 3.6
+    assert _chroma_error(jpeg, 1).max() < 2.0
+
+
+@pytest.mark.parametrize("sampling", list(SAMPLING))
+@pytest.mark.parametrize("size", [1, 2, 4])
+def test_scaled_decode_shape(monkey_rgb, sampling, size):
+    rgb = np.ascontiguousarray(monkey_rgb[:101, :99])
+    out = Decoder().decode(_libjpeg(rgb, sampling), size=size)
+    assert out.shape == ((101 * size + 7) // 8, (99 * size + 7) // 8, 3)
+
+
+def test_rectangular_idct_matches_separable_square_ones():
+    rng = np.random.default_rng(0)
+    blocks = rng.normal(size=(5, 8, 8)) * 50
+    tall = idct_scaled(blocks, 4, 2)
+    assert tall.shape == (5, 4, 2)
+    # A flat block stays flat with the same level at any size
+    flat = np.zeros((1, 8, 8))
+    flat[0, 0, 0] = 80.0
+    assert np.allclose(idct_scaled(flat, 4, 8), idct_scaled(flat, 8)[:, :4, :])
+    assert np.allclose(idct_scaled(flat, 2, 1), 10.0)
@@ -0,0 +1,89 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Codec service: HTTP request validation and recovery from dead workers.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from service import CodecService, ServiceConfig, ServiceError
+from service import jobs
+
+
+def _kill_worker(body, params):
+    """Job that takes its worker process down, like a native crash."""
+    os._exit(1)
+
+
+async def _request(service: CodecService, raw: bytes) -> bytes:
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    return response
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"", b"\xc2\xb2"])
+def test_invalid_content_length_is_400(length):
+    async def run():
+        service = CodecService(ServiceConfig(workers=1), executor=ThreadPoolExecutor(1))
+        await service.start()
+        try:
+            return await _request(service, b"POST /decode HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+        finally:
+            await service.stop()
+
+    assert asyncio.run(run()).startswith(b"HTTP/1.1 400 ")
+
+
+def test_missing_content_length_is_411():
+    async def run():
+        service = CodecService(ServiceConfig(workers=1), executor=ThreadPoolExecutor(1))
+        await service.start()
+        try:
+            return await _request(service, b"POST /decode HTTP/1.1\r\n\r\n")
+        finally:
+            await service.stop()
+
+    assert asyncio.run(run()).startswith(b"HTTP/1.1 411 ")
+
+
+def test_body_limit_checked_before_reading():
+    async def run():
+        service = CodecService(ServiceConfig(workers=1, max_body_bytes=10), executor=ThreadPoolExecutor(1))
+        await service.start()
+        try:
+            # The body is never sent: the response must not wait for it
+            return await asyncio.wait_for(
+                _request(service, b"POST /decode HTTP/1.1\r\nContent-Length: 1000\r\n\r\n"), 10)
+        finally:
+            await service.stop()
+
+    assert asyncio.run(run()).startswith(b"HTTP/1.1 413 ")
+
+
+def test_pool_restarts_after_worker_death(monkeypatch, small_jpeg):
+    monkeypatch.setitem(jobs.JOBS, "crash", _kill_worker)
+
+    async def run():
+        service = CodecService(ServiceConfig(workers=1))
+        await service.start()
+        try:
+            with pytest.raises(ServiceError) as error:
+                await service.submit("crash", small_jpeg, {})
+            assert error.value.status == 500
+            data, content_type, _ = (await service.submit("decode", small_jpeg, {"format": "raw"}))[0]
+            assert service.gauges()["jpeg_service_pool_restarts"] == 1
+            return data
+        finally:
+            await service.stop()
+
+    assert len(asyncio.run(run())) == 77 * 53 * 3
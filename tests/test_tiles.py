@@ -0,0 +1,167 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Tile pyramids: level and tile geometry, manifest, tile contents and directory/zip output.
+"""
+import json
+import math
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+from conftest import MIN_PSNR, encode_rgb, psnr
+from decoder import decode_jpeg, probe
+from encoder import encode_pyramid
+from util import ycbcr_to_rgb
+
+TILE_SIZE = 128
+
+
+@pytest.fixture(scope="module")
+def source(monkey_rgb) -> np.ndarray:
+    """300x450: edge tiles are cropped in both directions and levels have odd sizes."""
+    return np.ascontiguousarray(monkey_rgb[:300, :450])
+
+
+@pytest.fixture(scope="module", params=["dzi", "xyz"])
+def pyramid(request, source, tmp_path_factory):
+    """(layout, manifest, output directory) of the source cut into a pyramid."""
+    output = str(tmp_path_factory.mktemp(request.param))
+    manifest = encode_pyramid(source, output, layout=request.param, tile_size=TILE_SIZE, name="monkey")
+    return request.param, manifest, output
+
+
+def _tile_path(layout, level, column, row):
+    if layout == "dzi":
+        return os.path.join("monkey_files", str(level), f"{column}_{row}.jpeg")
+    return os.path.join(str(level), str(column), f"{row}.jpg")
+
+
+def _reduce(rgb: np.ndarray) -> np.ndarray:
+    """2x2 mean, rounded, edges repeated: the reference for one level down."""
+    height, width = rgb.shape[:2]
+    padded = np.pad(rgb, ((0, height % 2), (0, width % 2), (0, 0)), mode="edge").astype(np.uint16)
+    total = padded[0::2, 0::2] + padded[1::2, 0::2] + padded[0::2, 1::2] + padded[1::2, 1::2]
+    return ((total + 2) >> 2).astype(np.uint8)
+
+
+def _decode(jpeg: bytes) -> np.ndarray:
+    return ycbcr_to_rgb(decode_jpeg(jpeg))
+
+
+def test_level_and_tile_geometry(pyramid):
+    layout, manifest, output = pyramid
+    if layout == "dzi":
+        # Deep Zoom: level 0 is 1x1, the top level is full size (450 -> 2^9)
+        expected_levels = 10
+    else:
+        # XYZ: zoom 0 is a single tile (4 columns at full size -> 2 zooms out)
+        expected_levels = 3
+    assert [level["level"] for level in manifest["levels"]] == list(range(expected_levels))
+
+    for level in manifest["levels"]:
+        scale = 2 ** (expected_levels - 1 - level["level"])
+        assert (level["width"], level["height"]) == (math.ceil(450 / scale), math.ceil(300 / scale))
+        assert level["columns"] == math.ceil(level["width"] / TILE_SIZE)
+        assert level["rows"] == math.ceil(level["height"] / TILE_SIZE)
+        for row in range(level["rows"]):
+            for column in range(level["columns"]):
+                with open(os.path.join(output, _tile_path(layout, level["level"], column, row)), "rb") as f:
+                    info = probe(f.read())
+                if layout == "dzi":
+                    expected = (min(TILE_SIZE, level["width"] - column * TILE_SIZE),
+                                min(TILE_SIZE, level["height"] - row * TILE_SIZE))
+                else:
+                    expected = (TILE_SIZE, TILE_SIZE)
+                assert (info.width, info.height) == expected
+    assert manifest["levels"][0]["columns"] == manifest["levels"][0]["rows"] == 1
+
+
+def test_manifest_is_written(pyramid):
+    layout, manifest, output = pyramid
+    with open(os.path.join(output, "manifest.json")) as f:
+        assert json.load(f) == manifest
+    assert (manifest["layout"], manifest["width"], manifest["height"], manifest["tile_size"]) == \
+        (layout, 450, 300, TILE_SIZE)
+    assert manifest["format"] == ("jpeg" if layout == "dzi" else "jpg")
+    if layout == "dzi":
+        with open(os.path.join(output, "monkey.dzi")) as f:
+            descriptor = f.read()
+        assert 'TileSize="128"' in descriptor and 'Overlap="0"' in descriptor
+        assert '<Size Width="450" Height="300"/>' in descriptor
+    else:
+        assert not os.path.exists(os.path.join(output, "monkey.dzi"))
+
+
+def test_edge_tile_matches_source(pyramid, source):
+    layout, manifest, output = pyramid
+    top = manifest["levels"][-1]
+    column, row = top["columns"] - 1, top["rows"] - 1
+    with open(os.path.join(output, _tile_path(layout, top["level"], column, row)), "rb") as f:
+        jpeg = f.read()
+    crop = np.ascontiguousarray(source[row * TILE_SIZE:, column * TILE_SIZE:])
+    height, width = crop.shape[:2]
+    if layout == "dzi":
+        expected = crop
+    else:
+        # Padded with the (white) background to a full tile
+        expected = np.full((TILE_SIZE, TILE_SIZE, 3), 255, dtype=np.uint8)
+        expected[:height, :width] = crop
+    assert jpeg == encode_rgb(expected)
+    decoded = _decode(jpeg)
+    assert psnr(crop, decoded[:height, :width]) > MIN_PSNR
+    if layout == "xyz":
+        assert decoded[height + 8:, :].min() >= 250 and decoded[:, width + 8:].min() >= 250
+
+
+def test_lower_level_is_reduced_source(pyramid, source):
+    layout, manifest, output = pyramid
+    reduced = _reduce(source)
+    level = manifest["levels"][-2]
+    assert (level["width"], level["height"]) == (reduced.shape[1], reduced.shape[0])
+    with open(os.path.join(output, _tile_path(layout, level["level"], 0, 0)), "rb") as f:
+        assert f.read() == encode_rgb(np.ascontiguousarray(reduced[:TILE_SIZE, :TILE_SIZE]))
+
+
+@pytest.mark.parametrize("layout", ["dzi", "xyz"])
+def test_zip_matches_directory(small_rgb, tmp_path, layout):
+    directory = tmp_path / "tiles"
+    archive = tmp_path / "tiles.zip"
+    manifest = encode_pyramid(small_rgb, str(directory), layout=layout, tile_size=32)
+    assert encode_pyramid(small_rgb, str(archive), layout=layout, tile_size=32) == manifest
+
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, directory).replace(os.sep, "/")] = f.read()
+    with zipfile.ZipFile(archive) as zf:
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+        assert {name: zf.read(name) for name in zf.namelist()} == files
+    tiles = sum(level["columns"] * level["rows"] for level in manifest["levels"])
+    assert len(files) == tiles + (2 if layout == "dzi" else 1)
+
+
+def test_executor_output_is_identical(small_rgb, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        encode_pyramid(small_rgb, str(tmp_path / "parallel.zip"), tile_size=32, executor=executor)
+    encode_pyramid(small_rgb, str(tmp_path / "serial.zip"), tile_size=32)
+    with zipfile.ZipFile(tmp_path / "parallel.zip") as parallel, zipfile.ZipFile(tmp_path / "serial.zip") as serial:
+        assert parallel.namelist() == serial.namelist()
+        assert all(parallel.read(name) == serial.read(name) for name in serial.namelist())
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"layout": "tms"}, "Unknown pyramid layout"),
+    ({"tile_size": 100}, "multiple of 8"),
+    ({"tile_size": 0}, "multiple of 8"),
+])
+def test_invalid_arguments_raise(small_rgb, tmp_path, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        encode_pyramid(small_rgb, str(tmp_path), **kwargs)
@@ -0,0 +1,45 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Frames the decoder does not support (grayscale, CMYK) must be rejected with a clear ValueError.
+"""
+import numpy as np
+import pytest
+
+from decoder import Decoder, decode_coefficients, decode_into, decode_jpeg, iter_decode_rows
+
+
+def _decoders():
+    return [
+        decode_jpeg,
+        decode_coefficients,
+        lambda data: Decoder().decode(data),
+        lambda data: list(iter_decode_rows(data)),
+        lambda data: decode_into(data, np.empty((53, 77, 3), dtype=np.uint8)),
+    ]
+
+
+@pytest.mark.parametrize("progressive", [False, True])
+def test_grayscale_raises_component_count(small_rgb, progressive):
+    cv2 = pytest.importorskip("cv2")
+    gray = cv2.cvtColor(small_rgb, cv2.COLOR_RGB2GRAY)
+    ok, buffer = cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)])
+    assert ok
+    for decode in _decoders():
+        with pytest.raises(ValueError, match="Unsupported component count 1"):
+            decode(buffer.tobytes())
+
+
+def test_four_components_raise_component_count(small_jpeg):
+    # Declare a fourth component in the SOF0 header: the frame check must run before anything unpacks it
+    sof = small_jpeg.find(b"\xff\xc0")
+    length = int.from_bytes(small_jpeg[sof + 2:sof + 4], "big")
+    segment = bytearray(small_jpeg[sof:sof + 2 + length])
+    segment[9] = 4
+    segment += b"\x04\x11\x01"
+    segment[2:4] = (length + 3).to_bytes(2, "big")
+    corrupt = small_jpeg[:sof] + bytes(segment) + small_jpeg[sof + 2 + length:]
+    for decode in _decoders():
+        with pytest.raises(ValueError, match="Unsupported component count 4"):
+            decode(corrupt)
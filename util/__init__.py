@@ -6,10 +6,20 @@ Copyright (c) 2026 Huy Hiep Nguyen
 from .encoding_result import EncodingResult
 from .color_conversion import ycbcr_to_rgb, rgb_to_ycbcr
 from .utilities import print_3x3_mcus
-from .cli import parse_arguments
 from .logger import logger
+from .instrumentation import Instrumentation, collect_stats
+from .executor import set_default_executor
 from . import quantization_tables
 from . import huffman_tables
 
 __all__ = ['EncodingResult', 'ycbcr_to_rgb', 'rgb_to_ycbcr', 'print_3x3_mcus',
-           'parse_arguments', 'logger', 'quantization_tables', 'huffman_tables']
+           'parse_arguments', 'logger', 'quantization_tables', 'huffman_tables',
+           'Instrumentation', 'collect_stats', 'set_default_executor']
+
+
+def __getattr__(name):
+    # argparse is only needed by the CLI, keep it out of library imports
+    if name == 'parse_arguments':
+        from .cli import parse_arguments
+        return parse_arguments
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
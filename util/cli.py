@@ -54,6 +54,54 @@ def parse_arguments() -> argparse.Namespace:
         help="Enable verbose output"
     )
 
+    parser.add_argument(
+        "-p", "--precision",
+        type=str,
+        choices=["auto", "float32", "float64"],
+        default="auto",
+        help="Floating-point precision of colour conversion and DCT/IDCT "
+             "(auto: float32, float64 for verbose or staged runs)"
+    )
+
+    parser.add_argument(
+        "-q", "--quality",
+        type=int,
+        default=None,
+        help="JPEG quality 1-100 (scales the standard quantization tables; default: unscaled tables, as quality 50)"
+    )
+
+    parser.add_argument(
+        "--stats",
+        type=str,
+        nargs="?",
+        const="table",
+        choices=["table", "jsonl", "prometheus"],
+        default=None,
+        help="Print per-stage timing statistics of encode/decode in the given format"
+    )
+
+    parser.add_argument(
+        "--stats-memory",
+        action="store_true",
+        help="Also trace allocated bytes per stage with --stats (slower)"
+    )
+
+    parser.add_argument(
+        "--save-result",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Save every encoding stage to DIR (arrays as .npy, memory-mapped when loaded)"
+    )
+
+    parser.add_argument(
+        "--load-result",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Decode a result saved with --save-result from its stage instead of encoding the input"
+    )
+
     parser.add_argument(
         "--no-decode",
         action="store_true",
@@ -4,29 +4,34 @@ Copyright (c) 2026 Huy Hiep Nguyen
 """
 import numpy as np
 
+from .dct_basis import resolve_float_dtype
 
-def rgb_to_ycbcr(pixel_array: np.ndarray) -> np.ndarray:
-    """Convert RGB image to YCbCr color space (JPEG standard)."""
+
+def rgb_to_ycbcr(pixel_array: np.ndarray, float_dtype=None) -> np.ndarray:
+    """Convert RGB image to YCbCr color space (JPEG standard), computing in float_dtype (default float32)."""
+    float_dtype = resolve_float_dtype(float_dtype, debug=False)
     conv_matrix = np.array([
         [0.299, 0.587, 0.114],
         [-0.168736, -0.331264, 0.5],
         [0.5, -0.418688, -0.081312]
-    ])
+    ], dtype=float_dtype)
 
-    rgb_float = pixel_array.astype(np.float64)
+    rgb_float = pixel_array.astype(float_dtype)
     h, w, c = rgb_float.shape
     rgb_flat = rgb_float.reshape(-1, 3)
 
     # Vectorized conversion: Y/Cb/Cr = rgb @ matrix^T + offset
-    ycbcr_flat = rgb_flat @ conv_matrix.T + np.array([0, 128, 128])
+    ycbcr_flat = rgb_flat @ conv_matrix.T
+    ycbcr_flat += np.array([0, 128, 128], dtype=float_dtype)
 
     ycbcr = ycbcr_flat.reshape(h, w, 3).astype(np.uint8)
     return ycbcr
 
 
 def ycbcr_to_rgb(ycbcr_array: np.ndarray) -> np.ndarray:
-    """Convert YCbCr image back to RGB color space."""
-    ycbcr_centered = ycbcr_array.copy().astype(np.float64)
+    """Convert YCbCr image back to RGB color space (computing in the input precision for float32 input, else float64)."""
+    float_dtype = np.float32 if ycbcr_array.dtype == np.float32 else np.float64
+    ycbcr_centered = ycbcr_array.astype(float_dtype)
     ycbcr_centered[:, :, 1] -= 128  # Center Cb around 0
     ycbcr_centered[:, :, 2] -= 128  # Center Cr around 0
 
@@ -35,7 +40,7 @@ def ycbcr_to_rgb(ycbcr_array: np.ndarray) -> np.ndarray:
         [1.0, 0.0, 1.402],
         [1.0, -0.34414, -0.71414],
         [1.0, 1.772, 0.0]
-    ])
+    ], dtype=float_dtype)
 
     rgb_image = np.dot(ycbcr_centered, conversion_matrix.T)
     rgb_image = np.clip(rgb_image, 0, 255).astype(np.uint8)
@@ -0,0 +1,54 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+from functools import lru_cache
+from typing import Optional, Tuple
+import numpy as np
+
+
+def _orthonormal_dct_matrix(size: int = 8) -> np.ndarray:
+    k = np.arange(size).reshape(size, 1)
+    n = np.arange(size).reshape(1, size)
+    matrix = np.sqrt(2 / size) * np.cos((2 * n + 1) * k * np.pi / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+# Orthonormal 8-point DCT-II basis: DCT_MATRIX[k, n]
+DCT_MATRIX = _orthonormal_dct_matrix()
+
+
+# Output sizes of the scaled IDCT (1/8, 1/4, 1/2 and full scale)
+SCALED_IDCT_SIZES = (1, 2, 4, 8)
+
+
+def scaled_idct_size(width: int, height: int, target_width: int, target_height: int) -> int:
+    """Smallest scaled IDCT size (1, 2, 4, 8) whose output covers the target (8 = full size)."""
+    for size in SCALED_IDCT_SIZES:
+        if (width * size + 7) // 8 >= target_width and (height * size + 7) // 8 >= target_height:
+            return size
+    return 8
+
+
+@lru_cache(maxsize=None)
+def dct_matrices(dtype, size: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (C, C^T) of the size-point DCT basis as C-contiguous arrays of the given float dtype."""
+    matrix = _orthonormal_dct_matrix(size).astype(dtype)
+    return matrix, np.ascontiguousarray(matrix.T)
+
+
+def resolve_float_dtype(float_dtype: Optional[np.dtype], debug: bool) -> np.dtype:
+    """
+    Pick the floating-point precision of the pixel pipeline.
+
+    An explicit float_dtype wins. Otherwise production runs use float32 (8-bit JPEG
+    samples do not need more, and it halves memory traffic) and debug/staged runs
+    keep float64 so intermediate stages can be inspected at full precision.
+    """
+    if float_dtype is not None:
+        dtype = np.dtype(float_dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported float dtype: {dtype}")
+        return dtype
+    return np.dtype(np.float64 if debug else np.float32)
@@ -3,7 +3,7 @@ Author: Huy Hiep Nguyen
 Copyright (c) 2026 Huy Hiep Nguyen
 """
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple, Union
 import numpy as np
 
 
@@ -67,23 +67,33 @@ class EncodingResult:
         rle_y: RLE-encoded AC tuples for Y
         rle_cb: RLE-encoded AC tuples for Cb
         rle_cr: RLE-encoded AC tuples for Cr
+        (complete JPEG encodes keep them packed as (pairs, offsets), see rle_encode_packed)
 
         # Stage 8: Huffman encoding (DC coefficients)
         encoded_dc_y: Huffman-encoded DC coefficients for Y
         encoded_dc_cb: Huffman-encoded DC coefficients for Cb
         encoded_dc_cr: Huffman-encoded DC coefficients for Cr
+        (packed as (bits, offsets): uint8 bit buffer, MSB first, and int64 bit offsets
+        of shape (num_mcus + 1,), block i owning bits offsets[i]:offsets[i + 1])
 
         # Stage 8: Huffman encoding (AC coefficients)
         encoded_ac_y: Huffman-encoded AC coefficients for Y
         encoded_ac_cb: Huffman-encoded AC coefficients for Cb
         encoded_ac_cr: Huffman-encoded AC coefficients for Cr
+        (packed (bits, offsets) per block, as the DC stage)
 
         # Stage 9: Huffman encoding (interleaved bitstream)
-        huffman_bitstream: Huffman-encoded bitstream (BitArray)
+        huffman_bitstream: Interleaved Huffman-encoded MCUs, packed (bits, offsets) per MCU
 
         # Stage 10: JPEG file
         jpeg_bitstream: Final JPEG file bytes
         output_file: Path where JPEG file was written
+
+        # Block reuse (flat and repeated blocks transformed once)
+        block_reuse: Per component ("y", "cb", "cr") block counts and hit rate
+
+        # Instrumentation
+        stats: Per-stage timings (util.instrumentation.PipelineStats) if instrumentation was enabled
     """
     img_width: int
     img_height: int
@@ -121,21 +131,40 @@ class EncodingResult:
     dpcm_cr: Optional[List] = None
 
     # RLE stage (AC coefficients)
-    rle_y: Optional[List] = None
-    rle_cb: Optional[List] = None
-    rle_cr: Optional[List] = None
+    rle_y: Optional[Union[List, Tuple[np.ndarray, np.ndarray]]] = None
+    rle_cb: Optional[Union[List, Tuple[np.ndarray, np.ndarray]]] = None
+    rle_cr: Optional[Union[List, Tuple[np.ndarray, np.ndarray]]] = None
 
-    # Huffman encoding stage (DC coefficients)
-    encoded_dc_y: Optional[List] = None
-    encoded_dc_cb: Optional[List] = None
-    encoded_dc_cr: Optional[List] = None
+    # Huffman encoding stage (DC coefficients), packed (bits, offsets)
+    encoded_dc_y: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    encoded_dc_cb: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    encoded_dc_cr: Optional[Tuple[np.ndarray, np.ndarray]] = None
 
-    # Huffman encoding stage (AC coefficients)
-    encoded_ac_y: Optional[List] = None
-    encoded_ac_cb: Optional[List] = None
-    encoded_ac_cr: Optional[List] = None
+    # Huffman encoding stage (AC coefficients), packed (bits, offsets)
+    encoded_ac_y: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    encoded_ac_cb: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    encoded_ac_cr: Optional[Tuple[np.ndarray, np.ndarray]] = None
 
     # Huffman stage
-    huffman_bitstream: Optional[object] = None  # BitArray
+    huffman_bitstream: Optional[Tuple[np.ndarray, np.ndarray]] = None  # packed (bits, MCU offsets)
     jpeg_bitstream: Optional[bytes] = None
     output_file: Optional[str] = None
+
+    # Block reuse
+    block_reuse: Optional[Dict] = None
+
+    # Instrumentation
+    stats: Optional[object] = None  # PipelineStats
+
+    def save(self, path: str) -> None:
+        """Save every populated stage to a directory (see util.result_store)."""
+        from .result_store import save_result
+
+        save_result(self, path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "EncodingResult":
+        """Load a result saved with save(), arrays memory-mapped (see util.result_store)."""
+        from .result_store import load_result
+
+        return load_result(path, mmap_mode)
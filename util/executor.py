@@ -0,0 +1,54 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Executor used by the asyncio API (encode_async, decode_async).
+"""
+import functools
+from contextvars import copy_context
+from typing import Any, Callable, Optional
+
+_default_executor = None
+
+
+def set_default_executor(executor) -> None:
+    """
+    Set the executor of encode_async/decode_async calls without an explicit executor.
+
+    Args:
+        executor: concurrent.futures.Executor, or None for the event loop's default thread pool
+    """
+    global _default_executor
+    _default_executor = executor
+
+
+def get_default_executor():
+    """Executor configured with set_default_executor(), None = the event loop's default."""
+    return _default_executor
+
+
+async def run_in_executor(func: Callable, *args, executor=None, **kwargs) -> Any:
+    """
+    Await func(*args, **kwargs) on an executor without blocking the event loop.
+
+    Thread pools run the call in a copy of the current context, so an active
+    collect_stats() also records calls made from coroutines. Process pools get
+    the plain call (func and its arguments must be picklable).
+
+    Args:
+        func: Function to run
+        executor: Executor to use; defaults to get_default_executor()
+
+    Returns:
+        Result of func
+    """
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+
+    if executor is None:
+        executor = _default_executor
+    if isinstance(executor, ProcessPoolExecutor):
+        call = functools.partial(func, *args, **kwargs)
+    else:
+        call = functools.partial(copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
@@ -362,3 +362,11 @@ AC_CbCr = {
     249: '1111111111111101',
     250: '1111111111111110'
 }
+
+# The Annex K tables under the names the scan writer and build_bitstream expect
+STANDARD_TABLES = {
+    "DC_Y": DC_Y,
+    "AC_Y": AC_Y,
+    "DC_CbCr": DC_CbCr,
+    "AC_CbCr": AC_CbCr,
+}
@@ -0,0 +1,315 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+
+@dataclass
+class StageRecord:
+    """
+    Measurements of one pipeline stage.
+
+    Attributes:
+        name: Stage name (e.g. "transform", "entropy_decode")
+        wall_seconds: Elapsed wall-clock time
+        cpu_seconds: CPU time of the process during the stage
+        alloc_bytes: Peak bytes allocated during the stage (None unless memory tracing is on)
+        output_bytes: Size of the stage output (None if not reported)
+    """
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    alloc_bytes: Optional[int] = None
+    output_bytes: Optional[int] = None
+
+    def set_output(self, *outputs) -> None:
+        """Report the stage output(s); arrays count their nbytes, buffers their length."""
+        total = 0
+        for output in outputs:
+            size = output_nbytes(output)
+            if size is None:
+                return
+            total += size
+        self.output_bytes = total
+
+
+@dataclass
+class PipelineStats:
+    """
+    Stage records of one encode() or decode call.
+
+    Attributes:
+        pipeline: "encode" or "decode"
+        stages: Records in execution order
+        labels: Free-form labels (e.g. image class) copied from the Instrumentation
+        pixels: Number of image pixels, if known
+    """
+    pipeline: str
+    stages: List[StageRecord] = field(default_factory=list)
+    labels: Dict[str, str] = field(default_factory=dict)
+    pixels: Optional[int] = None
+
+    @property
+    def wall_seconds(self) -> float:
+        return sum(stage.wall_seconds for stage in self.stages)
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(stage.cpu_seconds for stage in self.stages)
+
+    def set_pixels(self, pixels: int) -> None:
+        self.pixels = pixels
+
+    def to_dict(self) -> Dict:
+        return {
+            "pipeline": self.pipeline,
+            "labels": dict(self.labels),
+            "pixels": self.pixels,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "stages": [asdict(stage) for stage in self.stages],
+        }
+
+    def format_table(self) -> str:
+        """Human-readable per-stage table (used by --stats)."""
+        lines = [f"{self.pipeline} stats" + (f" {self.labels}" if self.labels else "")]
+        lines.append(f"  {'stage':<22} {'wall ms':>10} {'cpu ms':>10} {'alloc MB':>10} {'output MB':>10}")
+        for stage in self.stages:
+            alloc = "-" if stage.alloc_bytes is None else f"{stage.alloc_bytes / (1 << 20):.2f}"
+            output = "-" if stage.output_bytes is None else f"{stage.output_bytes / (1 << 20):.2f}"
+            lines.append(f"  {stage.name:<22} {stage.wall_seconds * 1e3:>10.2f} {stage.cpu_seconds * 1e3:>10.2f} "
+                         f"{alloc:>10} {output:>10}")
+        total = f"  {'total':<22} {self.wall_seconds * 1e3:>10.2f} {self.cpu_seconds * 1e3:>10.2f}"
+        if self.pixels:
+            total += f"   ({self.pixels / 1e6 / max(self.wall_seconds, 1e-12):.2f} MP/s)"
+        lines.append(total)
+        return "\n".join(lines)
+
+
+def output_nbytes(output) -> Optional[int]:
+    """Size in bytes of an array, buffer or sequence of those (None for anything else)."""
+    if isinstance(output, np.ndarray):
+        return output.nbytes
+    if isinstance(output, (bytes, bytearray)):
+        return len(output)
+    if isinstance(output, memoryview):
+        return output.nbytes
+    if isinstance(output, (list, tuple)) and output and isinstance(output[0], np.ndarray):
+        return sum(item.nbytes for item in output if isinstance(item, np.ndarray))
+    return None
+
+
+class Instrumentation:
+    """
+    Collects per-stage wall time, CPU time, allocations and output sizes.
+
+    Pass it to encode()/decode_jpeg()/Decoder, or activate it for a block with
+    collect_stats(). Every finished pipeline is appended to runs and handed to
+    the callbacks (e.g. a PrometheusExporter or JsonlExporter). Allocation
+    tracking uses tracemalloc and is off by default because it slows down
+    Python-level allocations considerably.
+
+    Example:
+        with collect_stats(labels={"content": "photo"}) as stats:
+            result = encode(y, cb, cr, width, height)
+        print(result.stats.format_table())
+    """
+
+    def __init__(self, trace_memory: bool = False, labels: Optional[Dict[str, str]] = None,
+                 callbacks: Iterable[Callable[[PipelineStats], None]] = ()):
+        self.trace_memory = trace_memory
+        self.labels = dict(labels or {})
+        self.callbacks = list(callbacks)
+        self.runs: List[PipelineStats] = []
+        self._current: Optional[PipelineStats] = None
+
+    @property
+    def last(self) -> Optional[PipelineStats]:
+        """Most recently finished pipeline."""
+        return self.runs[-1] if self.runs else None
+
+    @contextmanager
+    def pipeline(self, name: str, pixels: Optional[int] = None) -> Iterator[PipelineStats]:
+        """Group the stages recorded inside the block into one PipelineStats."""
+        outer = self._current
+        stats = PipelineStats(name, labels=dict(self.labels), pixels=pixels)
+        self._current = stats
+        if self.trace_memory:
+            import tracemalloc
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            yield stats
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._current = outer
+        self.runs.append(stats)
+        for callback in self.callbacks:
+            callback(stats)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageRecord]:
+        """Measure the block as one stage of the current pipeline."""
+        record = StageRecord(name)
+        if self.trace_memory:
+            import tracemalloc
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            if tracing:
+                record.alloc_bytes = max(tracemalloc.get_traced_memory()[1] - alloc_start, 0)
+            if self._current is not None:
+                self._current.stages.append(record)
+
+
+class _NullRecord:
+    """Stand-in for StageRecord and PipelineStats when instrumentation is disabled."""
+    __slots__ = ()
+
+    def set_output(self, *outputs) -> None:
+        pass
+
+    def set_pixels(self, pixels: int) -> None:
+        pass
+
+
+class _NullStage:
+    """Reusable no-op context manager, keeping disabled instrumentation allocation-free."""
+    __slots__ = ()
+    _record = _NullRecord()
+
+    def __enter__(self) -> _NullRecord:
+        return self._record
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NULL_STAGE = _NullStage()
+_ACTIVE: ContextVar[Optional[Instrumentation]] = ContextVar("jpeg_instrumentation", default=None)
+
+
+def active_instrumentation(instrumentation: Optional[Instrumentation] = None) -> Optional[Instrumentation]:
+    """The given instrumentation, else the one activated by collect_stats() (or None)."""
+    return instrumentation if instrumentation is not None else _ACTIVE.get()
+
+
+def measure_stage(instrumentation: Optional[Instrumentation], name: str):
+    """instrumentation.stage(name), or a shared no-op context manager when instrumentation is None."""
+    return _NULL_STAGE if instrumentation is None else instrumentation.stage(name)
+
+
+def measure_pipeline(instrumentation: Optional[Instrumentation], name: str, pixels: Optional[int] = None):
+    """instrumentation.pipeline(name), or a shared no-op context manager when instrumentation is None."""
+    return _NULL_STAGE if instrumentation is None else instrumentation.pipeline(name, pixels)
+
+
+@contextmanager
+def collect_stats(instrumentation: Optional[Instrumentation] = None, **kwargs) -> Iterator[Instrumentation]:
+    """
+    Activate instrumentation for every encode/decode call inside the block.
+
+    Args:
+        instrumentation: Instance to activate; a new Instrumentation(**kwargs) by default
+
+    Returns:
+        The active Instrumentation
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation(**kwargs)
+    token = _ACTIVE.set(instrumentation)
+    try:
+        yield instrumentation
+    finally:
+        _ACTIVE.reset(token)
+
+
+def _label_string(labels: Dict[str, str]) -> str:
+    parts = []
+    for key, value in sorted(labels.items()):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class PrometheusExporter:
+    """
+    Pipeline callback aggregating stage counters in the Prometheus text exposition format.
+
+    Counters are kept per (pipeline, stage, labels), so stages can be compared
+    across image classes by labelling the Instrumentation accordingly.
+    """
+
+    _METRICS = (
+        ("jpeg_stage_calls_total", "Number of times the stage ran"),
+        ("jpeg_stage_wall_seconds_total", "Wall-clock time spent in the stage"),
+        ("jpeg_stage_cpu_seconds_total", "CPU time spent in the stage"),
+        ("jpeg_stage_alloc_bytes_total", "Peak bytes allocated by the stage, summed over calls"),
+        ("jpeg_stage_output_bytes_total", "Bytes produced by the stage"),
+    )
+
+    def __init__(self):
+        self._counters: Dict[tuple, List[float]] = {}
+
+    def __call__(self, stats: PipelineStats) -> None:
+        base = tuple(sorted(stats.labels.items()))
+        for stage in stats.stages:
+            key = (("pipeline", stats.pipeline), ("stage", stage.name)) + base
+            counters = self._counters.setdefault(key, [0, 0.0, 0.0, None, None])
+            counters[0] += 1
+            counters[1] += stage.wall_seconds
+            counters[2] += stage.cpu_seconds
+            # Byte counters only appear for stages that report them
+            if stage.alloc_bytes is not None:
+                counters[3] = (counters[3] or 0) + stage.alloc_bytes
+            if stage.output_bytes is not None:
+                counters[4] = (counters[4] or 0) + stage.output_bytes
+
+    def render(self) -> str:
+        """Current counters as Prometheus text."""
+        lines = []
+        for index, (metric, help_text) in enumerate(self._METRICS):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for key, counters in self._counters.items():
+                if counters[index] is not None:
+                    lines.append(f"{metric}{_label_string(dict(key))} {counters[index]:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the counters to a file (e.g. for the node_exporter textfile collector)."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+
+
+class JsonlExporter:
+    """Pipeline callback appending one JSON object per finished pipeline to a file or stream."""
+
+    def __init__(self, target: Union[str, "object"]):
+        self.target = target
+
+    def __call__(self, stats: PipelineStats) -> None:
+        import json
+        line = json.dumps(stats.to_dict()) + "\n"
+        if isinstance(self.target, str):
+            with open(self.target, "a", encoding="utf-8") as f:
+                f.write(line)
+        else:
+            self.target.write(line)
@@ -39,3 +39,28 @@ quantization_table_chrom = np.array([[17, 18, 24, 47, 99, 99, 99, 99],
 #                                    [val, val, val, val, val, val, val, val]])
 
 # quantization_table_chrom = quantization_table_lum
+
+
+def scale_quantization_table(table: np.ndarray, quality: int) -> np.ndarray:
+    """
+    Scale a quantization table to a quality setting (IJG/libjpeg formula).
+
+    Args:
+        table: Base 8x8 table
+        quality: 1-100, 50 returns the base table unchanged
+
+    Returns:
+        Scaled table, clipped to the baseline range 1-255
+    """
+    if not 1 <= quality <= 100:
+        raise ValueError(f"quality must be in 1-100, got {quality}")
+    scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+    return np.clip((table * scale + 50) // 100, 1, 255)
+
+
+def get_quantization_tables(quality=None):
+    """(luminance, chrominance) tables for a quality setting; None selects the Annex K tables."""
+    if quality is None:
+        return quantization_table_lum, quantization_table_chrom
+    return (scale_quantization_table(quantization_table_lum, quality),
+            scale_quantization_table(quantization_table_chrom, quality))
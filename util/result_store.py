@@ -0,0 +1,177 @@
+"""
+Author: Huy Hiep Nguyen
+Copyright (c) 2026 Huy Hiep Nguyen
+
+Save and load EncodingResult stages, so staged decodes can be resumed without re-encoding.
+
+A result is stored as a directory: manifest.json (image size, stage, block
+reuse statistics) plus one uncompressed .npy file per array. Loading maps the
+arrays read-only (np.load(mmap_mode="r")), so only the pages a decode touches
+are read. RLE stages are stored packed ((pairs, offsets), see rle_encode_packed),
+DPCM stages as int32 arrays, and the Huffman stages in their packed
+(bits, offsets) form; the JPEG and scan bytes are kept as raw files and
+mapped with mmap.
+"""
+import mmap
+import os
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+
+from .encoding_result import EncodingResult
+from .encoding_stages import (
+    STAGE_JPEG, STAGE_INTERLEAVER, STAGE_AC, STAGE_DC, STAGE_RLE, STAGE_DPCM,
+    STAGE_ZIGZAG, STAGE_QUANT, STAGE_DCT, STAGE_MCUS
+)
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+_COMPONENTS = ("y", "cb", "cr")
+_ARRAY_FIELDS = ("mcus", "dct", "quant", "dc", "ac")
+_TABLE_FIELDS = ("quantization_table_lum", "quantization_table_chrom")
+_RAW_FIELDS = {"jpeg_bitstream": "jpeg.jpg", "huffman_scan_bytes": "scan.bin"}
+
+# Field that marks each stage as reached, most complete first
+_STAGE_FIELDS = (
+    (STAGE_JPEG, "jpeg_bitstream"),
+    (STAGE_INTERLEAVER, "huffman_bitstream"),
+    (STAGE_AC, "encoded_ac_y"),
+    (STAGE_DC, "encoded_dc_y"),
+    (STAGE_RLE, "rle_y"),
+    (STAGE_DPCM, "dpcm_y"),
+    (STAGE_ZIGZAG, "ac_y"),
+    (STAGE_QUANT, "quant_y"),
+    (STAGE_DCT, "dct_y"),
+    (STAGE_MCUS, "mcus_y"),
+)
+
+
+def last_stage(result: EncodingResult) -> Optional[str]:
+    """Most complete encoding stage present in a result (None if it holds no stage)."""
+    return next((stage for stage, name in _STAGE_FIELDS if getattr(result, name) is not None), None)
+
+
+def save_result(result: EncodingResult, path: str) -> None:
+    """
+    Save every populated stage of an EncodingResult to a directory.
+
+    Args:
+        result: Result of encode() at any stage
+        path: Directory to write (created if missing, existing stage files are replaced)
+    """
+    import json
+
+    os.makedirs(path, exist_ok=True)
+    arrays = {}
+    for prefix in _ARRAY_FIELDS:
+        for component in _COMPONENTS:
+            arrays[f"{prefix}_{component}"] = getattr(result, f"{prefix}_{component}")
+    for name in _TABLE_FIELDS:
+        arrays[name] = getattr(result, name)
+    for component in _COMPONENTS:
+        dpcm = getattr(result, f"dpcm_{component}")
+        if dpcm is not None:
+            arrays[f"dpcm_{component}"] = np.asarray(dpcm, dtype=np.int32)
+        rle = getattr(result, f"rle_{component}")
+        if rle is not None:
+            arrays[f"rle_{component}_pairs"], arrays[f"rle_{component}_offsets"] = _pack_rle(rle)
+        for kind in ("dc", "ac"):
+            encoded = getattr(result, f"encoded_{kind}_{component}")
+            if encoded is not None:
+                arrays[f"encoded_{kind}_{component}_bits"], arrays[f"encoded_{kind}_{component}_offsets"] = encoded
+    if result.huffman_bitstream is not None:
+        arrays["huffman_bitstream_bits"], arrays["huffman_bitstream_offsets"] = result.huffman_bitstream
+
+    files = []
+    for name, array in arrays.items():
+        if array is not None:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+            files.append(name)
+    raw_files = []
+    for name, file_name in _RAW_FIELDS.items():
+        data = getattr(result, name, None)
+        if data is not None:
+            with open(os.path.join(path, file_name), "wb") as f:
+                f.write(data)
+            raw_files.append(name)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "img_width": result.img_width,
+        "img_height": result.img_height,
+        "stage": last_stage(result),
+        "arrays": files,
+        "raw": raw_files,
+        "block_reuse": result.block_reuse,
+        "output_file": result.output_file,
+    }
+    with open(os.path.join(path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_result(path: str, mmap_mode: Optional[str] = "r") -> EncodingResult:
+    """
+    Load an EncodingResult saved with save_result().
+
+    Args:
+        path: Directory written by save_result()
+        mmap_mode: np.load mmap mode of the arrays ("r" maps them read-only, None reads them into memory)
+
+    Returns:
+        EncodingResult holding the saved stages; decode(result, last_stage(result)) resumes from them
+    """
+    import json
+
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.isfile(manifest_path):
+        raise ValueError(f"No saved encoding result in '{path}' ({MANIFEST_NAME} missing)")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported encoding result format {manifest.get('format_version')} in '{path}'")
+
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in manifest["arrays"]}
+    result = EncodingResult(img_width=manifest["img_width"], img_height=manifest["img_height"],
+                            block_reuse=manifest["block_reuse"], output_file=manifest["output_file"])
+    for prefix in _ARRAY_FIELDS:
+        for component in _COMPONENTS:
+            setattr(result, f"{prefix}_{component}", arrays.get(f"{prefix}_{component}"))
+    for name in _TABLE_FIELDS:
+        setattr(result, name, arrays.get(name))
+    for component in _COMPONENTS:
+        setattr(result, f"dpcm_{component}", arrays.get(f"dpcm_{component}"))
+        if f"rle_{component}_pairs" in arrays:
+            setattr(result, f"rle_{component}",
+                    (arrays[f"rle_{component}_pairs"], arrays[f"rle_{component}_offsets"]))
+        for kind in ("dc", "ac"):
+            key = f"encoded_{kind}_{component}"
+            if f"{key}_bits" in arrays:
+                setattr(result, key, (arrays[f"{key}_bits"], arrays[f"{key}_offsets"]))
+    if "huffman_bitstream_bits" in arrays:
+        result.huffman_bitstream = (arrays["huffman_bitstream_bits"], arrays["huffman_bitstream_offsets"])
+    for name in manifest["raw"]:
+        file_path = os.path.join(path, _RAW_FIELDS[name])
+        if mmap_mode is None or os.path.getsize(file_path) == 0:
+            with open(file_path, "rb") as f:
+                setattr(result, name, f.read())
+        else:
+            with open(file_path, "rb") as f:
+                # The mapping stays valid after the file is closed
+                setattr(result, name, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return result
+
+
+def _pack_rle(rle):
+    """(pairs, offsets) of an RLE stage given as per-block tuple lists or already packed."""
+    if isinstance(rle, tuple):
+        return rle
+    lengths = np.fromiter((len(block) for block in rle), dtype=np.intp, count=len(rle))
+    offsets = np.zeros(len(rle) + 1, dtype=np.intp)
+    np.cumsum(lengths, out=offsets[1:])
+    values = chain.from_iterable(chain.from_iterable(rle))
+    pairs = np.fromiter(values, dtype=np.int16, count=2 * int(offsets[-1])).reshape(-1, 2)
+    return pairs, offsets
+